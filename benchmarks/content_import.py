@@ -0,0 +1,153 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-item latency of content import against a stubbed gzr.
+
+The stub sleeps for --startup seconds to stand in for ruby boot, gem load and
+login. Compare the legacy per-folder pools with the shared import pool:
+
+    python benchmarks/content_import.py --folders 20 --files 10 --startup 0.2
+"""
+
+import argparse
+import logging
+import os
+import stat
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from looker_deployer.commands import deploy_content
+from looker_deployer.utils import content_results
+
+STUB_GZR = """#!{python}
+import time
+time.sleep({startup})
+"""
+
+INI = """[bench]
+base_url=https://localhost:19999
+client_id=abc
+client_secret=xyz
+verify_ssl=True
+"""
+
+
+class StubFolder:
+    def __init__(self, folder_id):
+        self.id = folder_id
+
+
+class StubSDK:
+    """Answers folder lookups locally so only the import path is measured"""
+
+    def search_folders(self, name=None, parent_id=None):
+        return [StubFolder("1")]
+
+    def all_folders(self, fields=None):
+        return []
+
+    def create_folder(self, body):
+        return StubFolder("1")
+
+
+def build_tree(root, folders, files):
+    base = os.path.join(root, "Shared")
+    for i in range(folders):
+        folder = os.path.join(base, f"Folder {i}")
+        os.makedirs(folder)
+        for j in range(files):
+            kind = "Look" if j % 2 else "Dashboard"
+            with open(os.path.join(folder, f"{kind}_{i}_{j}.json"), "w") as f:
+                f.write("{}")
+    return base + os.sep
+
+
+def legacy_deploy_space(s, sdk, env, ini, target_base):
+    """The pre-pool behaviour: two three-worker pools per folder, folders in series"""
+    files = [f for f in os.listdir(s) if os.path.isfile(os.path.join(s, f))]
+    children = [os.path.join(s, d) + os.sep for d in os.listdir(s) if os.path.isdir(os.path.join(s, d))]
+    a, b, c = s.partition(target_base)
+    space_id = deploy_content.build_spaces("".join([b, c.rpartition(os.sep)[0]]).split(os.sep), sdk)
+    for content_type, prefix in (("look", "Look"), ("dashboard", "Dashboard")):
+        paths = [os.path.join(s, f) for f in files if f.startswith(prefix)]
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            list(pool.map(deploy_content.import_content, repeat(content_type), paths, repeat(space_id), repeat(env), repeat(ini)))
+    for child in children:
+        legacy_deploy_space(child, sdk, env, ini, target_base)
+
+
+def run(mode, tree, ini):
+    durations = []
+    import_content = deploy_content.import_content
+
+    def timed_import(*args, **kwargs):
+        start = time.perf_counter()
+        import_content(*args, **kwargs)
+        durations.append(time.perf_counter() - start)
+
+    deploy_content.import_content = timed_import
+    try:
+        start = time.perf_counter()
+        if mode == "legacy":
+            legacy_deploy_space(tree, StubSDK(), "bench", ini, "Shared")
+        else:
+            deploy_content.send_content(StubSDK(), "bench", ini, spaces=[tree], recursive=True, target_base="Shared")
+        wall = time.perf_counter() - start
+    finally:
+        deploy_content.import_content = import_content
+
+    return wall, durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folders", type=int, default=20, help="number of folders in the synthetic tree")
+    parser.add_argument("--files", type=int, default=10, help="content files per folder")
+    parser.add_argument("--startup", type=float, default=0.2, help="seconds the stub gzr sleeps per invocation")
+    args = parser.parse_args()
+
+    deploy_content.logger.setLevel(logging.ERROR)
+    # per-item measures and run summaries would bury the table
+    content_results.logger.setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as d:
+        bin_dir = os.path.join(d, "bin")
+        os.makedirs(bin_dir)
+        gzr = os.path.join(bin_dir, "gzr")
+        with open(gzr, "w") as f:
+            f.write(STUB_GZR.format(python=sys.executable, startup=args.startup))
+        os.chmod(gzr, os.stat(gzr).st_mode | stat.S_IEXEC)
+        os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+
+        ini = os.path.join(d, "looker.ini")
+        with open(ini, "w") as f:
+            f.write(INI)
+
+        tree = build_tree(os.path.join(d, "content"), args.folders, args.files)
+        items = args.folders * args.files
+
+        print(f"{'mode':<8} {'items':>6} {'wall s':>8} {'ms/item':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for mode in ("legacy", "pool"):
+            wall, durations = run(mode, tree, ini)
+            durations.sort()
+            p50 = statistics.median(durations) * 1000
+            p95 = durations[int(len(durations) * 0.95) - 1] * 1000
+            print(f"{mode:<8} {items:>6} {wall:>8.2f} {wall / items * 1000:>8.1f} {p50:>8.1f} {p95:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
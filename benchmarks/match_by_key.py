@@ -0,0 +1,73 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Matching every source object against a target collection of the same size.
+
+Compares the linear match_by_key scan with a KeyIndex built once per collection.
+The linear scan is quadratic, so it is only run on a sample of --probes lookups
+and scaled up:
+
+    python benchmarks/match_by_key.py --sizes 10000 100000
+"""
+
+import argparse
+import logging
+import random
+import time
+from looker_sdk import models40 as models
+from looker_deployer.utils import match_by_key as match
+
+
+def build_groups(size):
+    return [models.Group(id=str(i), name=f"Group {i}") for i in range(size)]
+
+
+def time_scan(target, probes):
+    start = time.perf_counter()
+    for probe in probes:
+        match.match_by_key(target, probe, "name")
+    return time.perf_counter() - start
+
+
+def time_index(target, source):
+    start = time.perf_counter()
+    index = match.KeyIndex(target, "name")
+    for item in source:
+        index.match(item)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="collection sizes to match")
+    parser.add_argument("--probes", type=int, default=200, help="lookups to time for the linear scan")
+    args = parser.parse_args()
+
+    match.logger.setLevel(logging.ERROR)
+    rng = random.Random(0)
+
+    print(f"{'size':>8} {'scan s (est)':>13} {'index s':>9} {'speedup':>9}")
+    for size in args.sizes:
+        target = build_groups(size)
+        source = build_groups(size)
+        rng.shuffle(source)
+
+        probes = source[:args.probes]
+        scan = time_scan(target, probes) * size / len(probes)
+        index = time_index(target, source)
+        print(f"{size:>8} {scan:>13.2f} {index:>9.3f} {scan / index:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
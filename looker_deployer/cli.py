@@ -13,10 +13,15 @@
 # limitations under the License.
 
 import argparse
+import os
 from looker_deployer.commands import deploy_boards, deploy_code, deploy_connections
 from looker_deployer.commands import deploy_content, deploy_content_export
 from looker_deployer.commands import deploy_permission_sets, deploy_model_sets, deploy_roles, deploy_groups, deploy_group_in_group, deploy_role_to_group, deploy_user_attributes
+from looker_deployer.commands import deploy_sync
 from looker_deployer import version as pkg
+from looker_deployer.utils import get_client
+from looker_deployer.utils.deploy_ledger import LEDGER_DIR
+from looker_deployer.utils.token_cache import TOKEN_CACHE_ENV, TokenCache
 
 loc = "looker.ini"
 
@@ -25,6 +30,11 @@ def main():
 
     parser = argparse.ArgumentParser()
     parser.add_argument("-v", "--version", action="store_true", help="print version and exit"),
+    parser.add_argument(
+        "--token-cache",
+        default=os.environ.get(TOKEN_CACHE_ENV),
+        help="directory to keep encrypted API tokens in between runs (needs looker-deployer[token-cache])"
+    )
     subparsers = parser.add_subparsers()
     setup_board_subparser(subparsers)
     setup_code_subparser(subparsers)
@@ -37,11 +47,14 @@ def main():
     setup_group_in_group_subparser(subparsers)
     setup_role_to_group_subparser(subparsers)
     setup_user_attributes_subparser(subparsers)
+    setup_sync_subparser(subparsers)
     args = parser.parse_args()
     if args.version:
         print(pkg.__version__)
         parser.exit(0)
     else:
+        if args.token_cache:
+            get_client.registry.token_cache = TokenCache(args.token_cache)
         try:
             args.func(args)
         except AttributeError:
@@ -49,11 +62,53 @@ def main():
             parser.exit(1)
 
 
+def setup_target_arguments(subparser):
+    subparser.add_argument(
+        "--parallel-targets",
+        type=int,
+        default=1,
+        help="how many target environments to deploy to at once"
+    )
+    subparser.add_argument(
+        "--save-source-snapshot",
+        help="file to save every source read of the run to, for later runs with --load-source-snapshot"
+    )
+    subparser.add_argument(
+        "--load-source-snapshot",
+        help="read the source from a saved snapshot file instead of the source instance"
+    )
+
+
+def setup_write_arguments(subparser):
+    subparser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="how many create/update/delete calls to run at once against each target"
+    )
+    subparser.add_argument(
+        "--max-requests-per-second",
+        type=float,
+        help="cap on write calls and fanned-out lookups per second per target instance"
+    )
+
+
+def setup_plan_argument(subparser):
+    subparser.add_argument(
+        "--plan",
+        action="store_true",
+        help="log what would be created, updated or deleted in each target without making any changes"
+    )
+
+
 def setup_board_subparser(subparsers):
     boards_subparser = subparsers.add_parser("boards")
     boards_subparser.add_argument("--source", required=True, help="which environment to source the board from")
     boards_subparser.add_argument("--target", required=True, nargs="+", help="which target environment(s) to deploy to")
-    boards_subparser.add_argument("--board", required=True, help="which board to deploy")
+    board_selection = boards_subparser.add_mutually_exclusive_group(required=True)
+    board_selection.add_argument("--board", nargs="+", help="which board(s) to deploy, by title")
+    board_selection.add_argument("--board-pattern", help="regex pattern to select which boards are deployed, by title")
+    board_selection.add_argument("--all", dest="all_boards", action="store_true", help="deploy every board in the source")
     boards_subparser.add_argument("--ini", default=loc, help="ini file to parse for credentials")
     boards_subparser.add_argument(
         "--allow-partial",
@@ -65,7 +120,19 @@ def setup_board_subparser(subparsers):
         help="if updating title, the old title to replace in target environments"
     )
 
+    boards_subparser.add_argument(
+        "--reconcile",
+        action="store_true",
+        help="update existing boards in place, only writing the sections and items that changed"
+    )
+    boards_subparser.add_argument(
+        "--workers",
+        type=int,
+        default=3,
+        help="how many boards to deploy to each target at once"
+    )
     boards_subparser.add_argument("--debug", action="store_true", help="set logger to debug for more verbosity")
+    setup_target_arguments(boards_subparser)
     boards_subparser.set_defaults(func=deploy_boards.main)
 
 
@@ -95,6 +162,9 @@ def setup_connections_subparser(subparsers):
         help="should passwords be set from the ini file?"
     )
     connections_subparser.add_argument("--debug", action="store_true", help="set logger to debug for more verbosity")
+    setup_write_arguments(connections_subparser)
+    setup_plan_argument(connections_subparser)
+    setup_target_arguments(connections_subparser)
     connections_subparser.set_defaults(func=deploy_connections.main)
 
 
@@ -108,6 +178,23 @@ def setup_content_subparser(subparsers):
     export_subparser.add_argument("--ini", default=loc, help="ini file to parse for credentials")
     export_subparser.add_argument("--debug", action="store_true", help="set logger to debug for more verbosity")
     export_subparser.add_argument("--local-target", required=True, help="Local directory to store content")
+    export_subparser.add_argument(
+        "--engine",
+        choices=["gzr", "native"],
+        default="gzr",
+        help="export with gzr or with the built-in Looker SDK engine"
+    )
+    export_subparser.add_argument(
+        "--workers",
+        type=int,
+        default=3,
+        help="number of folders, dashboards and looks to export concurrently"
+    )
+    export_subparser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only export content that changed since the export manifest in --local-target was written"
+    )
     export_content_group = export_subparser.add_argument_group()
     export_content_group.add_argument("--folders", nargs="+", help="Folders to fully export")
     export_content_group.add_argument("--dashboards", nargs="+", help="Dashboards to export")
@@ -119,6 +206,28 @@ def setup_content_subparser(subparsers):
     import_subparser.add_argument("--debug", action="store_true", help="set logger to debug for more verbosity")
     import_subparser.add_argument("--recursive", action="store_true", help="Should folders deploy recursively")
     import_subparser.add_argument("--target-folder", help="override the default target folder with a custom path")
+    import_subparser.add_argument(
+        "--engine",
+        choices=["gzr", "native"],
+        default="gzr",
+        help="import with gzr or with the built-in Looker SDK engine"
+    )
+    import_subparser.add_argument(
+        "--workers",
+        type=int,
+        default=3,
+        help="number of folders and content files to deploy concurrently"
+    )
+    import_subparser.add_argument(
+        "--ledger-dir",
+        default=LEDGER_DIR,
+        help="directory of per environment ledgers recording which content files were already imported"
+    )
+    import_subparser.add_argument(
+        "--force-all",
+        action="store_true",
+        help="import every content file, even those the ledger shows as already imported unchanged"
+    )
     import_content_group = import_subparser.add_mutually_exclusive_group(required=True)
     import_content_group.add_argument("--folders", nargs="+", help="Folders to fully deploy")
     import_content_group.add_argument("--dashboards", nargs="+", help="Dashboards to deploy")
@@ -134,6 +243,9 @@ def setup_permission_sets_subparser(subparsers):
     permission_sets_subparser.add_argument("--pattern", help="regex pattern to filter which permission sets are deployed")
     permission_sets_subparser.add_argument("--delete", action="store_true", help="enables the ability for explicit deletes of permission sets in target")
     permission_sets_subparser.add_argument("--debug", action="store_true", help="set logger to debug for more verbosity")
+    setup_write_arguments(permission_sets_subparser)
+    setup_plan_argument(permission_sets_subparser)
+    setup_target_arguments(permission_sets_subparser)
     permission_sets_subparser.set_defaults(func=deploy_permission_sets.main)
 
 
@@ -145,6 +257,9 @@ def setup_model_sets_subparser(subparsers):
     model_sets_subparser.add_argument("--pattern", help="regex pattern to filter which model sets are deployed")
     model_sets_subparser.add_argument("--delete", action="store_true", help="enables the ability for explicit deletes of model sets in target")
     model_sets_subparser.add_argument("--debug", action="store_true", help="set logger to debug for more verbosity")
+    setup_write_arguments(model_sets_subparser)
+    setup_plan_argument(model_sets_subparser)
+    setup_target_arguments(model_sets_subparser)
     model_sets_subparser.set_defaults(func=deploy_model_sets.main)
 
 
@@ -156,6 +271,9 @@ def setup_roles_subparser(subparsers):
     roles_subparser.add_argument("--pattern", help="regex pattern to filter which roles are deployed")
     roles_subparser.add_argument("--delete", action="store_true", help="enables the ability for explicit deletes of roles in target")
     roles_subparser.add_argument("--debug", action="store_true", help="set logger to debug for more verbosity")
+    setup_write_arguments(roles_subparser)
+    setup_plan_argument(roles_subparser)
+    setup_target_arguments(roles_subparser)
     roles_subparser.set_defaults(func=deploy_roles.main)
 
 
@@ -167,6 +285,9 @@ def setup_groups_subparser(subparsers):
     groups_subparser.add_argument("--pattern", help="regex pattern to filter which groups are deployed")
     groups_subparser.add_argument("--delete", action="store_true", help="enables the ability for explicit deletes of groups in target")
     groups_subparser.add_argument("--debug", action="store_true", help="set logger to debug for more verbosity")
+    setup_write_arguments(groups_subparser)
+    setup_plan_argument(groups_subparser)
+    setup_target_arguments(groups_subparser)
     groups_subparser.set_defaults(func=deploy_groups.main)
 
 
@@ -177,6 +298,9 @@ def setup_group_in_group_subparser(subparsers):
     group_in_group_subparser.add_argument("--target", nargs="+", required=True, help="which target environment(s) to deploy to")
     group_in_group_subparser.add_argument("--pattern", help="regex pattern to filter which group in group are deployed")
     group_in_group_subparser.add_argument("--debug", action="store_true", help="set logger to debug for more verbosity")
+    setup_write_arguments(group_in_group_subparser)
+    setup_plan_argument(group_in_group_subparser)
+    setup_target_arguments(group_in_group_subparser)
     group_in_group_subparser.set_defaults(func=deploy_group_in_group.main)
 
 
@@ -187,6 +311,9 @@ def setup_role_to_group_subparser(subparsers):
     role_to_group_subparser.add_argument("--target", nargs="+", required=True, help="which target environment(s) to deploy to")
     role_to_group_subparser.add_argument("--pattern", help="regex pattern to filter which role to groups are deployed")
     role_to_group_subparser.add_argument("--debug", action="store_true", help="set logger to debug for more verbosity")
+    setup_write_arguments(role_to_group_subparser)
+    setup_plan_argument(role_to_group_subparser)
+    setup_target_arguments(role_to_group_subparser)
     role_to_group_subparser.set_defaults(func=deploy_role_to_group.main)
 
 
@@ -198,4 +325,33 @@ def setup_user_attributes_subparser(subparsers):
     user_attributes_subparser.add_argument("--pattern", help="regex pattern to filter which user attributess are deployed")
     user_attributes_subparser.add_argument("--delete", action="store_true", help="enables the ability for explicit deletes of user attributes in target")
     user_attributes_subparser.add_argument("--debug", action="store_true", help="set logger to debug for more verbosity")
+    setup_write_arguments(user_attributes_subparser)
+    setup_plan_argument(user_attributes_subparser)
+    setup_target_arguments(user_attributes_subparser)
     user_attributes_subparser.set_defaults(func=deploy_user_attributes.main)
+
+
+def setup_sync_subparser(subparsers):
+    sync_subparser = subparsers.add_parser("sync")
+    sync_subparser.add_argument("--source", required=True, help="which environment to source the role admin objects from")
+    sync_subparser.add_argument("--ini", default=loc, help="ini file to parse for credentials")
+    sync_subparser.add_argument("--target", nargs="+", required=True, help="which target environment(s) to deploy to")
+    sync_subparser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=list(deploy_sync.STAGES),
+        default=list(deploy_sync.STAGES),
+        help="which stages to run, in dependency order (default: all)"
+    )
+    sync_subparser.add_argument("--delete", action="store_true", help="enables the ability for explicit deletes of objects in target")
+    sync_subparser.add_argument(
+        "--parallel-stages",
+        type=int,
+        default=3,
+        help="how many independent stages to run at once against each target"
+    )
+    sync_subparser.add_argument("--debug", action="store_true", help="set logger to debug for more verbosity")
+    setup_write_arguments(sync_subparser)
+    setup_plan_argument(sync_subparser)
+    setup_target_arguments(sync_subparser)
+    sync_subparser.set_defaults(func=deploy_sync.main)
@@ -13,12 +13,24 @@
 # limitations under the License.
 
 import logging
+import re
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
 from looker_sdk import models40 as models
 from looker_deployer.utils import deploy_logging
-from looker_deployer.utils.get_client import get_client
+from looker_deployer.utils.executor import instance_key
+from looker_deployer.utils.plan import Plan, diff
+from looker_deployer.utils.source_snapshot import get_source, save_source
+from looker_deployer.utils.targets import deploy_to_targets
 
 logger = deploy_logging.get_logger(__name__)
 
+# positions are set through the parent's item_order, not on each item
+ITEM_ORDER_FIELDS = ("order", "board_section_id")
+
+CATALOG_PAGE_SIZE = 500
+
 
 class MultipleAssetsFoundError(Exception):
     """Exception raised if multiple assets are found"""
@@ -45,10 +57,58 @@ class TargetContentNotFound(Exception):
         return f"{self.message} -> dashes: {self.missing_dashes}, looks: {self.missing_looks}"
 
 
-def match_dashboard_id(source_dashboard_id, source_sdk, target_sdk):
+class ContentCatalog:
+    """Every dashboard slug and look title on an instance, listed once with paged searches"""
+
+    def __init__(self, sdk, page_size=CATALOG_PAGE_SIZE):
+        self.sdk = sdk
+        self.page_size = page_size
+        self.dashboards = None
+        self.looks = None
+        self.lock = threading.Lock()
+
+    def search_all(self, search, fields):
+        results = []
+        offset = 0
+        while True:
+            page = search(fields=fields, limit=self.page_size, offset=offset, sorts="id")
+            results.extend(page)
+            if len(page) < self.page_size:
+                return results
+            offset += self.page_size
+
+    def load_dashboards(self):
+        with self.lock:
+            if self.dashboards is None:
+                dashboards = {}
+                for dash in self.search_all(self.sdk.search_dashboards, "id,slug"):
+                    dashboards.setdefault(dash.slug, []).append(dash)
+                logger.debug("Dashboard catalog loaded", extra={"dashboards": len(dashboards)})
+                self.dashboards = dashboards
+        return self.dashboards
+
+    def load_looks(self):
+        with self.lock:
+            if self.looks is None:
+                looks = {}
+                for look in self.search_all(self.sdk.search_looks, "id,title,folder_id"):
+                    # title searches are case insensitive, so the catalog is too
+                    looks.setdefault((look.title or "").lower(), []).append(look)
+                logger.debug("Look catalog loaded", extra={"looks": len(looks)})
+                self.looks = looks
+        return self.looks
+
+    def search_dashboards(self, slug):
+        return self.load_dashboards().get(slug, [])
+
+    def search_looks(self, title):
+        return self.load_looks().get((title or "").lower(), [])
+
+
+def match_dashboard_id(source_dashboard_id, source_sdk, target_sdk, catalog=None):
     source = source_sdk.dashboard(str(source_dashboard_id))
     logger.debug("Attempting dashboard match", extra={"title": source.title, "slug": source.slug, "id": source.id})
-    target_dash = target_sdk.search_dashboards(slug=source.slug)
+    target_dash = (catalog or target_sdk).search_dashboards(slug=source.slug)
 
     if len(target_dash) > 1:
         raise MultipleAssetsFoundError(source.title)
@@ -61,10 +121,10 @@ def match_dashboard_id(source_dashboard_id, source_sdk, target_sdk):
     return target_id
 
 
-def match_look_id(source_look_id, source_sdk, target_sdk):
+def match_look_id(source_look_id, source_sdk, target_sdk, catalog=None):
     source = source_sdk.look(source_look_id)
     logger.debug("Attempting look match", extra={"title": source.title, "id": source.id})
-    target_look = target_sdk.search_looks(title=source.title)
+    target_look = (catalog or target_sdk).search_looks(title=source.title)
 
     if len(target_look) > 1:
         raise MultipleAssetsFoundError(source.title)
@@ -77,6 +137,52 @@ def match_look_id(source_look_id, source_sdk, target_sdk):
     return target_id
 
 
+class ContentResolver:
+    """Source dashboard and look ids resolved to target ids, once per target.
+
+    Misses are remembered too, so the audit and the item creation that follows share
+    one lookup per piece of content.
+    """
+
+    def __init__(self, source_sdk, target_sdk, catalog=None):
+        self.source_sdk = source_sdk
+        self.target_sdk = target_sdk
+        self.catalog = catalog or ContentCatalog(target_sdk)
+        self.resolved = {}
+        self.lock = threading.Lock()
+
+    def dashboard(self, source_dashboard_id):
+        return self.resolve("dashboard", source_dashboard_id)
+
+    def look(self, source_look_id):
+        return self.resolve("look", source_look_id)
+
+    def match(self, content_type, source_id):
+        if content_type == "dashboard":
+            return match_dashboard_id(source_id, self.source_sdk, self.target_sdk, self.catalog)
+        return match_look_id(source_id, self.source_sdk, self.target_sdk, self.catalog)
+
+    def resolve(self, content_type, source_id):
+        key = (content_type, str(source_id))
+        with self.lock:
+            future = self.resolved.get(key)
+            owner = future is None
+            if owner:
+                future = self.resolved[key] = Future()
+
+        if owner:
+            try:
+                future.set_result(self.match(content_type, source_id))
+            except AssertionError as e:
+                future.set_exception(e)
+            except Exception as e:
+                # only misses are remembered, anything else is retried by the next caller
+                with self.lock:
+                    del self.resolved[key]
+                future.set_exception(e)
+        return future.result()
+
+
 def return_board(board_name, source_sdk):
     logger.debug("Searching boards", extra={"title": board_name})
     board_list = source_sdk.search_boards(title=board_name)
@@ -156,22 +262,30 @@ def create_board_section(source_board_section_object, target_board_id, target_sd
     return resp.id
 
 
-def create_board_item(source_board_item_object, target_board_section_id, source_sdk, target_sdk):
-
+def build_board_item(source_board_item_object, target_board_section_id, resolver):
     dashboard_id = None
     look_id = None
 
     if source_board_item_object.dashboard_id:
-        dashboard_id = match_dashboard_id(source_board_item_object.dashboard_id, source_sdk, target_sdk)
+        dashboard_id = resolver.dashboard(source_board_item_object.dashboard_id)
     if source_board_item_object.look_id:
-        look_id = match_look_id(source_board_item_object.look_id, source_sdk, target_sdk)
+        look_id = resolver.look(source_board_item_object.look_id)
 
     new_board_item = models.WriteBoardItem()
     new_board_item.__dict__.update(source_board_item_object.__dict__)
     new_board_item.dashboard_id = dashboard_id
     new_board_item.look_id = look_id
     new_board_item.board_section_id = target_board_section_id
+    return new_board_item
+
 
+def create_board_item(source_board_item_object, target_board_section_id, source_sdk, target_sdk, resolver=None):
+    resolver = resolver or ContentResolver(source_sdk, target_sdk)
+    new_board_item = build_board_item(source_board_item_object, target_board_section_id, resolver)
+    return post_board_item(new_board_item, target_sdk)
+
+
+def post_board_item(new_board_item, target_sdk):
     logger.info(
         "Creating item",
         extra={
@@ -187,6 +301,148 @@ def create_board_item(source_board_item_object, target_board_section_id, source_
     return resp
 
 
+def skip_missing_content(allow_partial, item, fn, *args):
+    """Run `fn` for a board item. With `allow_partial`, an item whose content isn't on the target is logged and skipped"""
+    try:
+        return fn(*args)
+    except AssertionError:
+        if not allow_partial:
+            raise
+        logger.warning("Could not find content!", extra={"item": item.title})
+        return None
+
+
+def create_section(section, target_board_id, source_sdk, target_sdk, allow_partial=False, resolver=None, plan=None):
+    """Create `section` on the target board along with all of its items. Returns the new section id"""
+    resolver = resolver or ContentResolver(source_sdk, target_sdk)
+    plan = plan or Plan()
+    target_section_id = create_board_section(section, target_board_id, target_sdk)
+
+    for item in in_order(section.board_items, section.item_order):
+        new_board_item = skip_missing_content(allow_partial, item, build_board_item, item, target_section_id, resolver)
+        if new_board_item and plan.create("board_item", item.title):
+            post_board_item(new_board_item, target_sdk)
+    return target_section_id
+
+
+def in_order(objects, order):
+    """`objects` sorted by the position of their id in `order`, unlisted ones last"""
+    position = {object_id: i for i, object_id in enumerate(order or [])}
+    return sorted(objects, key=lambda i: position.get(i.id, len(position)))
+
+
+def section_keys(sections):
+    """Key sections by title and occurrence, so a moved section is matched rather than rebuilt"""
+    seen = Counter()
+    keyed = {}
+    for section in sections:
+        title = section.title or ""
+        keyed[(title, seen[title])] = section
+        seen[title] += 1
+    return keyed
+
+
+def order_changes(changes, field, wanted, current):
+    """Add `field` to `changes` if the order differs. diff compares lists as sets, so orders are checked here"""
+    if list(wanted or []) != list(current or []):
+        changes[field] = {"from": current, "to": wanted}
+    return changes
+
+
+def item_key(item):
+    return (item.dashboard_id, item.look_id, item.lookml_dashboard_id, item.custom_url)
+
+
+def reconcile_section_items(source_section, target_section, target_sdk, resolver, allow_partial, plan):
+    """Bring the items of an existing target section in line with the source. Returns the target item order"""
+    # target items, by what they point at, waiting to be claimed by a source item
+    unclaimed = {}
+    for item in in_order(target_section.board_items or [], target_section.item_order):
+        unclaimed.setdefault(item_key(item), []).append(item)
+
+    item_order = []
+    for source_item in in_order(source_section.board_items, source_section.item_order):
+        wanted = skip_missing_content(allow_partial, source_item, build_board_item, source_item, target_section.id, resolver)
+        if wanted is None:
+            continue
+
+        matches = unclaimed.get(item_key(wanted))
+        if not matches:
+            if plan.create("board_item", wanted.custom_title or source_item.title):
+                item_order.append(post_board_item(wanted, target_sdk).id)
+            continue
+
+        target_item = matches.pop(0)
+        item_order.append(target_item.id)
+        changes = diff(wanted, target_item, exclude=ITEM_ORDER_FIELDS)
+        if plan.update_if_changed("board_item", target_item.title, changes):
+            logger.info("Updating item", extra={"id": target_item.id, "changes": changes})
+            target_sdk.update_board_item(target_item.id, wanted)
+
+    for items in unclaimed.values():
+        for item in items:
+            if plan.delete("board_item", item.title):
+                logger.info("Deleting item", extra={"id": item.id})
+                target_sdk.delete_board_item(item.id)
+
+    return item_order
+
+
+def reconcile_board(source_board, target_board, source_sdk, target_sdk, allow_partial=False, resolver=None):
+    """Rebuild only what changed on an existing target board.
+
+    Sections are matched by title, items by the content they point at. Matched objects are
+    updated in place and reordered, so the board is never emptied while it syncs.
+    """
+    resolver = resolver or ContentResolver(source_sdk, target_sdk)
+    plan = Plan(target=instance_key(target_sdk))
+    logger.info("Reconciling board", extra={"title": source_board.title, "id": target_board.id})
+
+    target_sections = section_keys(in_order(target_board.board_sections or [], target_board.section_order))
+    section_order = []
+    for key, source_section in section_keys(in_order(source_board.board_sections, source_board.section_order)).items():
+        target_section = target_sections.pop(key, None)
+        if target_section is None:
+            if plan.create("board_section", source_section.title):
+                section_order.append(
+                    create_section(source_section, target_board.id, source_sdk, target_sdk, allow_partial, resolver, plan)
+                )
+            continue
+
+        section_order.append(target_section.id)
+        item_order = reconcile_section_items(source_section, target_section, target_sdk, resolver, allow_partial, plan)
+        update_section = models.WriteBoardSection(
+            title=source_section.title,
+            description=source_section.description,
+            item_order=item_order
+        )
+        changes = order_changes(
+            diff(update_section, target_section, exclude={"item_order"}), "item_order", item_order, target_section.item_order
+        )
+        if plan.update_if_changed("board_section", target_section.title, changes):
+            logger.info("Updating section", extra={"section_id": target_section.id, "changes": changes})
+            target_sdk.update_board_section(target_section.id, update_section)
+
+    for section in target_sections.values():
+        if plan.delete("board_section", section.title):
+            logger.info("Deleting section", extra={"section_id": section.id})
+            target_sdk.delete_board_section(section.id)
+
+    update_board = models.WriteBoard(
+        title=source_board.title,
+        description=source_board.description,
+        section_order=section_order
+    )
+    changes = order_changes(
+        diff(update_board, target_board, exclude={"section_order"}), "section_order", section_order, target_board.section_order
+    )
+    if plan.update_if_changed("board", target_board.title, changes):
+        target_sdk.update_board(target_board.id, update_board)
+        logger.info("Board updated", extra={"id": target_board.id, "changes": changes})
+
+    return plan.report()
+
+
 def board_content_lists(board_object):
     dash_list = []
     look_list = []
@@ -201,7 +457,8 @@ def board_content_lists(board_object):
     return (dash_list, look_list)
 
 
-def audit_board_content(board_object, source_sdk, target_sdk):
+def audit_board_content(board_object, source_sdk, target_sdk, resolver=None):
+    resolver = resolver or ContentResolver(source_sdk, target_sdk)
     missing_dashes = []
     missing_looks = []
 
@@ -209,14 +466,14 @@ def audit_board_content(board_object, source_sdk, target_sdk):
 
     for dash in dash_list:
         try:
-            match_dashboard_id(dash, source_sdk, target_sdk)
+            resolver.dashboard(dash)
         except AssertionError:
             dash_title = source_sdk.dashboard(str(dash)).title
             missing_dashes.append({"dash_id": dash, "dash_title": dash_title})
 
     for look in look_list:
         try:
-            match_look_id(look, source_sdk, target_sdk)
+            resolver.look(look)
         except AssertionError:
             look_title = source_sdk.look(look).title
             missing_looks.append({"look_id": look, "look_title": look_title})
@@ -224,10 +481,56 @@ def audit_board_content(board_object, source_sdk, target_sdk):
     return (missing_dashes, missing_looks)
 
 
-def send_boards(board_name, source_sdk, target_sdk, title_override=None, allow_partial=False):
-    source_board = return_board(board_name, source_sdk)
+def select_boards(source_sdk, board_names=None, pattern=None):
+    """Source boards by title, by regex on the title, or all of them, from one board listing"""
+    boards = source_sdk.all_boards()
+    logger.debug("Boards pulled", extra={"board_titles": [i.title for i in boards]})
+
+    if pattern:
+        compiled_pattern = re.compile(pattern)
+        return [i for i in boards if compiled_pattern.search(i.title or "")]
+    if not board_names:
+        return boards
+
+    by_title = {}
+    for board in boards:
+        by_title.setdefault((board.title or "").lower(), []).append(board)
+
+    selected = []
+    for board_name in board_names:
+        board_list = by_title.get(board_name.lower(), [])
+        if len(board_list) > 1:
+            raise MultipleAssetsFoundError(board_name)
+        assert len(board_list) == 1, f"Could not find board {board_name}! Double check available titles and try again."
+        selected.append(board_list[0])
+    return selected
+
 
-    missing_dashes, missing_looks = audit_board_content(source_board, source_sdk, target_sdk)
+def find_target_board(source_board_object, target_sdk, title_override=None):
+    search_title = title_override or source_board_object.title
+    search_res = target_sdk.search_boards(title=search_title)
+    assert len(search_res) < 2, "More than one board found! Refine your search or remove duplicate names."
+    return search_res[0] if search_res else None
+
+
+def send_boards(board_name, source_sdk, target_sdk, title_override=None, allow_partial=False, reconcile=False):
+    source_board = return_board(board_name, source_sdk)
+    deploy_board(source_board, source_sdk, target_sdk, title_override, allow_partial, reconcile=reconcile)
+
+
+def deploy_board(
+    source_board,
+    source_sdk,
+    target_sdk,
+    title_override=None,
+    allow_partial=False,
+    resolver=None,
+    reconcile=False
+):
+    resolver = resolver or ContentResolver(source_sdk, target_sdk)
+    logger.info("Deploying board", extra={"title": source_board.title})
+
+    missing_dashes, missing_looks = audit_board_content(source_board, source_sdk, target_sdk, resolver)
     if not allow_partial and (missing_dashes or missing_looks):
         logger.error(
             "Missing Content. Make sure it's deployed or rerun with allow-partial flag.",
@@ -242,20 +545,16 @@ def send_boards(board_name, source_sdk, target_sdk, title_override=None, allow_p
     else:
         logger.info("All content accounted for!")
 
-    target_board_id = create_or_update_board(source_board, target_sdk, title_override)
+    if reconcile:
+        target_board = find_target_board(source_board, target_sdk, title_override)
+        if target_board:
+            reconcile_board(source_board, target_board, source_sdk, target_sdk, allow_partial, resolver)
+            return
 
-    for section in source_board.board_sections:
-        target_section_id = create_board_section(section, target_board_id, target_sdk)
+    target_board_id = create_or_update_board(source_board, target_sdk, title_override)
 
-        for item in section.board_items:
-            try:
-                create_board_item(item, target_section_id, source_sdk, target_sdk)
-            except AssertionError:
-                if allow_partial:
-                    logger.warning("Could not find content!", extra={"item": item.title})
-                    pass
-                else:
-                    raise
+    for section in in_order(source_board.board_sections, source_board.section_order):
+        create_section(section, target_board_id, source_sdk, target_sdk, allow_partial, resolver)
 
 
 def main(args):
@@ -263,9 +562,31 @@ def main(args):
     if args.debug:
         logger.setLevel(logging.DEBUG)
 
-    source_sdk = get_client(args.ini, args.source)
-
-    for t in args.target:
-        target_sdk = get_client(args.ini, t)
-
-        send_boards(args.board, source_sdk, target_sdk, args.title_change, args.allow_partial)
+    source_sdk = get_source(args.ini, args.source, args.load_source_snapshot)
+    source_boards = select_boards(source_sdk, args.board, args.board_pattern)
+    assert not args.title_change or len(source_boards) == 1, "--title-change needs exactly one board"
+    logger.info("Boards selected", extra={"boards": [i.title for i in source_boards]})
+
+    def deploy(target_sdk):
+        # One resolver per target, so every board shares its content catalog
+        resolver = ContentResolver(source_sdk, target_sdk)
+        with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="board") as pool:
+            futures = [
+                pool.submit(
+                    deploy_board,
+                    source_board,
+                    source_sdk,
+                    target_sdk,
+                    args.title_change,
+                    args.allow_partial,
+                    resolver,
+                    args.reconcile
+                )
+                for source_board in source_boards
+            ]
+        # every board has finished by now, so a failure doesn't cut the others short
+        for future in futures:
+            future.result()
+
+    deploy_to_targets(args.ini, args.target, deploy, args.parallel_targets)
+    save_source(source_sdk, args.save_source_snapshot)
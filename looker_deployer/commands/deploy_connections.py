@@ -14,10 +14,14 @@
 
 import logging
 import re
-from looker_sdk import models40 as models, error
+from looker_sdk import models40 as models
 from looker_deployer.utils import deploy_logging
 from looker_deployer.utils import parse_ini
-from looker_deployer.utils.get_client import get_client
+from looker_deployer.utils.executor import WriteExecutor, get_executor, instance_key
+from looker_deployer.utils.match_by_key import KeyIndex
+from looker_deployer.utils.plan import Plan, diff
+from looker_deployer.utils.source_snapshot import get_source, save_source
+from looker_deployer.utils.targets import deploy_to_targets
 
 logger = deploy_logging.get_logger(__name__)
 
@@ -46,38 +50,57 @@ def get_filtered_connections(source_sdk, pattern=None):
     return connections
 
 
-def write_connections(connections, target_sdk, db_config=None):
-    for conn in connections:
-        # Create a DB Write Object from each connection
-        new_conn = models.WriteDBConnection()
-        new_conn.__dict__.update(conn.__dict__)
-
-        conn_exists = True
-        try:
-            target_sdk.connection(new_conn.name)
-        except error.SDKError:
-            conn_exists = False
-
-        if db_config:
-            logger.debug("Attempting password update", extra={"connection": new_conn.name})
-            db_pass = db_config[conn.name]
-            new_conn.password = db_pass
-
-        if not conn_exists:
-            logger.debug("No existing connection found. Creating...")
-            logger.info("Deploying connection", extra={"connection": new_conn.name})
-            target_sdk.create_connection(new_conn)
-            logger.info("Deployment complete", extra={"connection": new_conn.name})
-        else:
-            logger.debug("Existing connection found. Updating...")
-            logger.info("Deploying connection", extra={"connection": new_conn.name})
-            target_sdk.update_connection(new_conn.name, new_conn)
-            logger.info("Deployment complete", extra={"connection": new_conn.name})
-
-
-def send_connections(source_sdk, target_sdk, pattern=None, db_config=None):
+def create_connection(new_conn, target_sdk, executor):
+    logger.debug("No existing connection found. Creating...")
+    logger.info("Deploying connection", extra={"connection": new_conn.name})
+    executor.call(target_sdk.create_connection, new_conn)
+    logger.info("Deployment complete", extra={"connection": new_conn.name})
+
+
+def update_connection(new_conn, target_sdk, executor):
+    logger.debug("Existing connection found. Updating...")
+    logger.info("Deploying connection", extra={"connection": new_conn.name})
+    executor.call(target_sdk.update_connection, new_conn.name, new_conn)
+    logger.info("Deployment complete", extra={"connection": new_conn.name})
+
+
+def write_connections(connections, target_sdk, db_config=None, executor=None, plan=None):
+    executor = executor or WriteExecutor()
+    plan = plan or Plan()
+
+    # One list call tells us which connections already exist in the target
+    target_connections = KeyIndex(target_sdk.all_connections(), "name")
+
+    with executor.batch() as batch:
+        for conn in connections:
+            # Create a DB Write Object from each connection
+            new_conn = models.WriteDBConnection()
+            new_conn.__dict__.update(conn.__dict__)
+
+            if db_config:
+                logger.debug("Attempting password update", extra={"connection": new_conn.name})
+                db_pass = db_config[conn.name]
+                new_conn.password = db_pass
+
+            matched_conn = target_connections.match(conn)
+
+            if not matched_conn:
+                if plan.create("connection", new_conn.name):
+                    batch.run(create_connection, new_conn, target_sdk, executor)
+            else:
+                changes = diff(new_conn, matched_conn, exclude={"password"})
+                if db_config:
+                    # Passwords are never returned by the API, so a password from the ini is always sent
+                    changes["password"] = {"from": None, "to": "<from ini>"}
+                if plan.update_if_changed("connection", new_conn.name, changes):
+                    batch.run(update_connection, new_conn, target_sdk, executor)
+
+    plan.report()
+
+
+def send_connections(source_sdk, target_sdk, pattern=None, db_config=None, executor=None, plan=None):
     connections = get_filtered_connections(source_sdk, pattern)
-    write_connections(connections, target_sdk, db_config)
+    write_connections(connections, target_sdk, db_config, executor, plan)
 
 
 def main(args):
@@ -90,9 +113,15 @@ def main(args):
     else:
         db_config = None
 
-    source_sdk = get_client(args.ini, args.source)
+    source_sdk = get_source(args.ini, args.source, args.load_source_snapshot)
+
+    # INFO: Read the source once and share it across every target
+    connections = get_filtered_connections(source_sdk, args.pattern)
 
-    for t in args.target:
-        target_sdk = get_client(args.ini, t)
+    def deploy(target_sdk):
+        executor = get_executor(target_sdk, args.concurrency, args.max_requests_per_second)
+        plan = Plan(not args.plan, instance_key(target_sdk))
+        write_connections(connections, target_sdk, db_config, executor, plan)
 
-        send_connections(source_sdk, target_sdk, args.pattern, db_config)
+    deploy_to_targets(args.ini, args.target, deploy, args.parallel_targets)
+    save_source(source_sdk, args.save_source_snapshot)
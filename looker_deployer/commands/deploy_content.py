@@ -14,21 +14,25 @@
 
 import os
 import re
-import subprocess
 import logging
 import tempfile
 import shutil
 import threading
 from concurrent.futures import ThreadPoolExecutor
-from itertools import repeat
 from looker_deployer.utils import deploy_logging
 from looker_deployer.utils import parse_ini
+from looker_deployer.utils import native_content
+from looker_deployer.utils.content_results import IMPORT, ContentResults, GzrError, stream_command
+from looker_deployer.utils.deploy_ledger import DeployLedger
 from looker_deployer.utils.get_client import get_client
 from looker_sdk import models40 as models
 
 
 logger = deploy_logging.get_logger(__name__)
 
+# gzr reports the id it imported to as e.g. "Imported dashboard 42"
+IMPORTED_ID = re.compile(r"Imported (?:dashboard|look) #?(\w+)", re.IGNORECASE)
+
 
 def get_space_ids_from_name(space_name, parent_id, sdk):
     if (space_name == "Shared" and parent_id == "0"):
@@ -129,10 +133,95 @@ def import_content(content_type, content_json, space_id, env, ini, debug=False):
         win_exec = ["cmd.exe", "/c"]
         gzr_command = win_exec + gzr_command
 
-    subprocess.run(gzr_command)
+    output = stream_command(gzr_command)
+    if output.returncode != 0:
+        raise GzrError(content_json, output.returncode, output.lines)
+
+    target_id = None
+    for line in output.lines:
+        match = IMPORTED_ID.search(line)
+        if match:
+            target_id = match.group(1)
+    logger.info("Deployment complete", extra={"content_type": content_type, "source_file": content_json, "id": target_id})
+    return target_id
+
+
+class FolderIndex:
+    """Per-run map of folder paths to target folder ids.
+
+    Seeded from one bulk folder listing and kept up to date as folders are created,
+    so resolving a path is a dictionary walk rather than a search per path component.
+    """
+
+    ROOTS = ["Users", "Embed Users", "Embed Groups"]
+
+    def __init__(self, sdk):
+        self.sdk = sdk
+        self.lock = threading.Lock()
+        self.children = None
+        self.paths = {}
+
+    def load(self):
+        folders = self.sdk.all_folders(fields="id,name,parent_id")
+        self.children = {}
+        for folder in folders:
+            self.add(folder.parent_id, folder.name, folder.id)
+        logger.debug("Folder index loaded", extra={"folders": len(folders)})
+
+    def add(self, parent_id, name, folder_id):
+        # folder search is case insensitive, so the index is too
+        self.children.setdefault((parent_id, name.lower()), []).append(folder_id)
+
+    def find(self, space_name, parent_id):
+        if parent_id == "0" and space_name == "Shared":
+            return ["1"]
+        elif parent_id == "0" and space_name in FolderIndex.ROOTS:
+            return self.children.get((None, space_name.lower()), [])[:1]
+        return list(self.children.get((parent_id, space_name.lower()), []))
+
+    def find_or_create(self, space_name, parent_id):
+        target_id = self.find(space_name, parent_id)
+        if len(target_id) == 0 and "/" in space_name:
+            # Folders imported prior to PR #153 kept gzr's division slashes in their names
+            target_id = self.find(space_name.replace("/", "\u2215"), parent_id)
+
+        if len(target_id) > 1:
+            logger.error("More than one Space found with that parent/name", extra={"space_ids": target_id})
+            raise AssertionError("More than one Space found with that parent/name")
+        elif len(target_id) == 1:
+            logger.debug("Found Space ID", extra={"id": target_id[0]})
+            return target_id[0]
+        elif parent_id == "2":
+            logger.warning("Cannot create folder in Users.  Add the User first, then import their content", extra={"folder": space_name})
+            raise AssertionError("Cannot create folder in Users")
+
+        logger.warning("No folders found. Creating folder now", extra={"folder": space_name, "parent_id": parent_id})
+        res = self.sdk.create_folder(models.CreateFolder(name=space_name, parent_id=parent_id))
+        self.add(parent_id, space_name, res.id)
+        return res.id
+
+    def resolve(self, spaces):
+        # Gazer replaces slashes in folder names with division slashes (Unicode character 2215), so undo that.
+        path = tuple(i.replace("\u2215", "/") for i in spaces)
+
+        with self.lock:
+            if self.children is None:
+                self.load()
+
+            parent_id = "0"
+            for depth in range(1, len(path) + 1):
+                if path[:depth] not in self.paths:
+                    self.paths[path[:depth]] = self.find_or_create(path[depth - 1], parent_id)
+                parent_id = self.paths[path[:depth]]
 
+        logger.debug("Resolved folder path", extra={"folders": list(path), "folder_id": parent_id})
+        return parent_id
+
+
+def build_spaces(spaces, sdk, folder_index=None):
+    if folder_index is not None:
+        return folder_index.resolve(spaces)
 
-def build_spaces(spaces, sdk):
     # seeding initial value of parent id to Shared
     # We use a list to aid in debugging should values not drain properly"
     id_tracker = ["0"]
@@ -156,7 +245,129 @@ def build_spaces(spaces, sdk):
     return id_tracker[0]
 
 
-def deploy_space(s, sdk, env, ini, recursive, target_base, debug=False):
+class ContentImportPool:
+    """Bounded scheduler shared by every folder and content file of a run.
+
+    Folder walks and imports are queued on the same workers. A folder's children are
+    queued as soon as the folder id is known, and its dashboards as soon as its looks
+    are in, since dashboards can reference the looks deployed alongside them.
+    Nothing waits inside a worker, so the tree shape cannot starve the pool.
+    With a `ledger`, files already imported unchanged into the same folder are skipped.
+    """
+
+    def __init__(self, env, ini, debug=False, workers=3, sdk=None, engine="gzr", ledger=None):
+        assert engine in ["gzr", "native"], "Unsupported Content Engine"
+        self.env = env
+        self.ini = ini
+        self.debug = debug
+        self.sdk = sdk
+        self.engine = engine
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="content-import")
+        self.done = threading.Condition()
+        self.pending = 0
+        self.jobs = 0
+        self.errors = []
+        self.ledger = ledger
+        self.skipped = 0
+        self.results = ContentResults(IMPORT)
+
+    def run(self, fn, *args, then=None):
+        with self.done:
+            self.pending += 1
+            self.jobs += 1
+        return self.executor.submit(self._run, fn, args, then)
+
+    def _run(self, fn, args, then):
+        try:
+            return fn(*args)
+        except Exception as e:
+            with self.done:
+                self.errors.append(e)
+            raise
+        finally:
+            try:
+                # follow-up work is queued before this job stops counting as pending
+                if then is not None:
+                    then()
+            finally:
+                with self.done:
+                    self.pending -= 1
+                    self.done.notify_all()
+
+    def submit(self, content_type, content_json, space_id, then=None):
+        if self.ledger is not None and self.ledger.unchanged(content_type, content_json, space_id):
+            logger.info(
+                "Content unchanged since last deploy. Skipping",
+                extra={"content_type": content_type, "source_file": content_json, "folder_id": space_id}
+            )
+            with self.done:
+                self.skipped += 1
+            if then is not None:
+                then()
+            return None
+        return self.run(self.import_file, content_type, content_json, space_id, then=then)
+
+    def import_file(self, content_type, content_json, space_id):
+        if self.engine == "native":
+            target_id = self.results.track(
+                content_type, content_json, native_content.import_content, content_type, content_json, space_id, self.sdk
+            )
+        else:
+            target_id = self.results.track(
+                content_type, content_json, import_content, content_type, content_json, space_id, self.env, self.ini, self.debug
+            )
+        if self.ledger is not None:
+            self.ledger.record(content_type, content_json, space_id, target_id)
+        return target_id
+
+    def submit_folder(self, look_files, dash_files, space_id):
+        def run_dashboards():
+            for dash in dash_files:
+                self.submit("dashboard", dash, space_id)
+
+        if not look_files:
+            return run_dashboards()
+
+        remaining = [len(look_files)]
+        lock = threading.Lock()
+
+        def look_done():
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                run_dashboards()
+
+        for look in look_files:
+            self.submit("look", look, space_id, then=look_done)
+
+    def join(self):
+        with self.done:
+            while self.pending:
+                self.done.wait()
+            errors, jobs = self.errors, self.jobs
+            self.errors, self.jobs = [], 0
+        if errors:
+            logger.error("Content import failed", extra={"failures": len(errors), "jobs": jobs})
+            raise errors[0]
+        logger.debug("Content import jobs complete", extra={"jobs": jobs, "skipped": self.skipped})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.join()
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+def deploy_space(s, sdk, env, ini, recursive, target_base, debug=False, pool=None, folder_index=None):
+
+    if pool is None:
+        with ContentImportPool(env, ini, debug) as pool:
+            return deploy_space(s, sdk, env, ini, recursive, target_base, debug, pool, folder_index)
 
     logger.debug("working folder", extra={"working_folder": s})
 
@@ -177,44 +388,23 @@ def deploy_space(s, sdk, env, ini, recursive, target_base, debug=False):
     logger.debug("folders to process", extra={"folders": spaces_to_process})
 
     # The final value of id_tracker in build_spaces must be the targeted space id
-    space_id = build_spaces(spaces_to_process, sdk)
+    space_id = build_spaces(spaces_to_process, sdk, folder_index)
     logger.debug("target folder id", extra={"folder_id": space_id})
 
-    # deploy looks
-    logger.debug("running looks", extra={"looks": look_files})
-    with ThreadPoolExecutor(max_workers=3) as pool:
-        pool.map(
-            import_content,
-            repeat("look"),
-            look_files,
-            repeat(space_id),
-            repeat(env),
-            repeat(ini),
-            repeat(debug)
-        )
-    # deploy dashboards
-    logger.debug("running dashboards", extra={"dashboards": dash_files})
-    with ThreadPoolExecutor(max_workers=3) as pool:
-        pool.map(
-            import_content,
-            repeat("dashboard"),
-            dash_files,
-            repeat(space_id),
-            repeat(env),
-            repeat(ini),
-            repeat(debug)
-        )
-
-    # go for recursion
+    # deploy looks, then dashboards once the folder's looks are in
+    logger.debug("running content", extra={"looks": look_files, "dashboards": dash_files})
+    pool.submit_folder(look_files, dash_files, space_id)
+
+    # go for recursion. Children only need this folder to exist, so they are queued right away
     if recursive and space_children:
         logger.info("Attemting Recursion of children folders", extra={"children_folders": space_children})
         for child in space_children:
-            deploy_space(child, sdk, env, ini, recursive, target_base, debug)
+            pool.run(deploy_space, child, sdk, env, ini, recursive, target_base, debug, pool, folder_index)
     else:
         logger.info("No Recursion specified or empty child list", extra={"children_folders": space_children})
 
 
-def deploy_content(content_type, content, sdk, env, ini, target_base, debug=False):
+def deploy_content(content_type, content, sdk, env, ini, target_base, debug=False, pool=None, folder_index=None):
     # extract directory path
     dirs = content.rpartition(os.sep)[0] + os.sep
 
@@ -226,13 +416,36 @@ def deploy_content(content_type, content, sdk, env, ini, target_base, debug=Fals
     spaces_to_process = "".join([b, c]).split(os.sep)
 
     # The final value of id_tracker in build_spaces must be the targeted space id
-    space_id = build_spaces(spaces_to_process, sdk)
+    space_id = build_spaces(spaces_to_process, sdk, folder_index)
 
-    import_content(content_type, content, space_id, env, ini, debug)
+    if pool is None:
+        import_content(content_type, content, space_id, env, ini, debug)
+    else:
+        pool.submit(content_type, content, space_id)
 
 
 def send_content(
-    sdk, env, ini, target_folder=None, spaces=None, dashboards=None, looks=None, recursive=False, debug=False, target_base=None
+    sdk, env, ini, target_folder=None, spaces=None, dashboards=None, looks=None, recursive=False, debug=False, target_base=None,
+    engine="gzr", workers=3, ledger=None
+):
+
+    folder_index = FolderIndex(sdk)
+    pool = ContentImportPool(env, ini, debug, workers, sdk, engine, ledger)
+    try:
+        with pool:
+            send_content_to_pool(
+                pool, folder_index, sdk, env, ini, target_folder, spaces, dashboards, looks, recursive, debug, target_base
+            )
+    finally:
+        pool.results.report()
+        # keep what did deploy, even if a later import failed
+        if ledger is not None:
+            ledger.save()
+            logger.info("Unchanged content skipped", extra={"skipped": pool.skipped})
+
+
+def send_content_to_pool(
+    pool, folder_index, sdk, env, ini, target_folder=None, spaces=None, dashboards=None, looks=None, recursive=False, debug=False, target_base=None
 ):
 
     if spaces:
@@ -250,10 +463,12 @@ def send_content(
                     # copy the source space directory tree to target space override
                     shutil.copytree(s, updated_space)
                     # kick off the job from the new space
-                    deploy_space(updated_space, sdk, env, ini, recursive, target_base, debug)
+                    deploy_space(updated_space, sdk, env, ini, recursive, target_base, debug, pool, folder_index)
+                    # the temporary copy must outlive every job streamed from it
+                    pool.join()
             # If no target space override, kick off job normally
             else:
-                deploy_space(s, sdk, env, ini, recursive, target_base, debug)
+                deploy_space(s, sdk, env, ini, recursive, target_base, debug, pool, folder_index)
     if dashboards:
         logger.debug("Deploying dashboards", extra={"dashboards": dashboards})
         for dash in dashboards:
@@ -270,9 +485,10 @@ def send_content(
                     shutil.copy(dash, target_dir)
                     new_dash_path = [os.path.join(target_dir, f) for f in os.listdir(target_dir)][0]
                     # kick off the job from the new space
-                    deploy_content("dashboard", new_dash_path, sdk, env, ini, target_base, debug)
+                    deploy_content("dashboard", new_dash_path, sdk, env, ini, target_base, debug, pool, folder_index)
+                    pool.join()
             else:
-                deploy_content("dashboard", dash, sdk, env, ini, target_base, debug)
+                deploy_content("dashboard", dash, sdk, env, ini, target_base, debug, pool, folder_index)
     if looks:
         logger.debug("Deploying looks", extra={"looks": looks})
         for look in looks:
@@ -289,9 +505,10 @@ def send_content(
                     shutil.copy(look, target_dir)
                     new_look_path = [os.path.join(target_dir, f) for f in os.listdir(target_dir)][0]
                     # kick off the job from the new space
-                    deploy_content("look", new_look_path, sdk, env, ini, target_base, debug)
+                    deploy_content("look", new_look_path, sdk, env, ini, target_base, debug, pool, folder_index)
+                    pool.join()
             else:
-                deploy_content("look", look, sdk, env, ini, target_base, debug)
+                deploy_content("look", look, sdk, env, ini, target_base, debug, pool, folder_index)
 
 
 def main(args):
@@ -310,6 +527,7 @@ def main(args):
         args.target_base = 'Shared'
 
     sdk = get_client(args.ini, args.env)
+    ledger = DeployLedger.load(args.env, args.ledger_dir, force=args.force_all)
     send_content(
         sdk,
         args.env,
@@ -320,5 +538,8 @@ def main(args):
         args.looks,
         args.recursive,
         args.debug,
-        args.target_base
+        args.target_base,
+        args.engine,
+        args.workers,
+        ledger
     )
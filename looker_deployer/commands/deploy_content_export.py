@@ -12,12 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 import os
-import subprocess
 import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from looker_sdk.error import SDKError
 from looker_deployer.utils import deploy_logging
+from looker_deployer.utils import native_content
+from looker_deployer.utils.content_results import EXPORT, ContentResults, GzrError, stream_command
 from looker_deployer.commands.deploy_content import get_gzr_creds
+from looker_deployer.utils.executor import rate_limited, read_pool
+from looker_deployer.utils.export_manifest import ExportManifest, content_key, scan_content_files
 from looker_deployer.utils.get_client import get_client
 
 
@@ -55,10 +63,12 @@ def export_spaces(folder_id, env, ini, path, debug=False):
         win_exec = ["cmd.exe", "/c"]
         gzr_command = win_exec + gzr_command
 
-    subprocess.run(gzr_command)
+    output = stream_command(gzr_command)
+    if output.returncode != 0:
+        raise GzrError(f"space {folder_id}", output.returncode, output.lines)
 
 
-def export_content(content_type, content_id, env, ini, path, debug=False):
+def export_content(content_type, content_id, env, ini, path, debug=False, filename=None):
     host, port, client_id, client_secret, verify_ssl = get_gzr_creds(ini, env)
 
     gzr_command = [
@@ -87,9 +97,65 @@ def export_content(content_type, content_id, env, ini, path, debug=False):
         win_exec = ["cmd.exe", "/c"]
         gzr_command = win_exec + gzr_command
 
-    filename = Path(path) / f"{content_type}_{content_id}.json"
-    with open(filename, "w") as outfile:
-        subprocess.run(gzr_command, stdout=outfile)
+    filename = Path(path) / (filename or f"{content_type}_{content_id}.json")
+    with open(filename, "wb") as outfile:
+        output = stream_command(gzr_command, outfile)
+    if output.returncode != 0:
+        # a partial file would be picked up by the next import
+        os.remove(filename)
+        raise GzrError(f"{content_type} {content_id}", output.returncode, output.lines)
+    return str(filename)
+
+
+class FolderTree:
+    """Per-run map of folder ids to folders, for walking ancestors without a call per level.
+
+    Seeded from one bulk folder listing the first time a folder is asked for. Stands in
+    for the SDK in `recurse_folders`, so every export of a run shares the same lookups.
+    """
+
+    def __init__(self, sdk):
+        self.sdk = sdk
+        self.lock = threading.Lock()
+        self.folders = None
+        self.children_of = {}
+
+    def load(self):
+        folders = self.sdk.all_folders(fields="id,name,parent_id")
+        self.folders = {}
+        for folder in folders:
+            self.add(folder)
+        logger.debug("Folder tree loaded", extra={"folders": len(folders)})
+
+    def add(self, folder):
+        self.folders[str(folder.id)] = folder
+        self.children_of.setdefault(str(folder.parent_id), []).append(folder)
+
+    def children(self, folder_id):
+        self.folder(folder_id)
+        with self.lock:
+            return list(self.children_of.get(str(folder_id), []))
+
+    def subtree(self, folder_id):
+        """Ids of a folder and every folder below it"""
+        folder_ids = [str(folder_id)]
+        for folder_id in folder_ids:
+            folder_ids.extend(str(i.id) for i in self.children(folder_id))
+        return folder_ids
+
+    def folder(self, folder_id):
+        folder_id = str(folder_id)
+        with self.lock:
+            if self.folders is None:
+                self.load()
+            found = self.folders.get(folder_id)
+        if found is None:
+            # folders the listing didn't return, e.g. created since it was loaded
+            found = self.sdk.folder(folder_id)
+            with self.lock:
+                if folder_id not in self.folders:
+                    self.add(found)
+        return found
 
 
 def recurse_folders(folder_id, folder_list, sdk, debug=False):
@@ -106,47 +172,233 @@ def recurse_folders(folder_id, folder_list, sdk, debug=False):
     return folder_list
 
 
-def send_export(
-    sdk, env, ini, local_target, folders=None, dashboards=None, looks=None, debug=False
-):
-    for fid in folders or []:
-
-        # generate the list of folders
-        folder_list = []
-        folder_list = recurse_folders(fid, folder_list, sdk, debug)
-        # list is generated in reverse order, so we have to correct
+def list_folder(sdk, content_type, folder_id):
+    list_content = sdk.folder_dashboards if content_type == "dashboard" else sdk.folder_looks
+    items = rate_limited(sdk, list_content)(str(folder_id), fields="id,title,folder_id,updated_at")
+    return [(content_type, item) for item in items]
+
+
+def folder_content(sdk, folder_ids):
+    """Dashboards and looks filed in `folder_ids`, listed a few folders at a time"""
+    listings = [(content_type, folder_id) for folder_id in sorted(folder_ids) for content_type in ["dashboard", "look"]]
+    with read_pool() as pool:
+        listed = pool.map(lambda i: list_folder(sdk, *i), listings)
+        return [i for items in listed for i in items]
+
+
+def not_found(error):
+    # SDKError carries the response body rather than the status code, and a 404 body says "Not found"
+    return (error.message or "").lower() == "not found" or "/404/" in (error.documentation_url or "")
+
+
+def content_updated_at(content_type, content_id, sdk):
+    """The content's updated_at, or None if the instance says it doesn't exist"""
+    get = sdk.dashboard if content_type == "dashboard" else sdk.look
+    try:
+        return get(str(content_id), fields="id,updated_at").updated_at
+    except SDKError as e:
+        if not_found(e):
+            return None
+        raise
+
+
+class ContentExport:
+    """One run of `send_export`, holding what its export jobs share.
+
+    Folder exports, changed folder content and single items are queued on one pool, and the
+    manifest is brought up to date once every job has finished.
+    """
+
+    def __init__(self, sdk, env, ini, local_target, debug=False, engine="gzr", manifest=None, incremental=False):
+        self.sdk = sdk
+        self.env = env
+        self.ini = ini
+        self.local_target = local_target
+        self.debug = debug
+        self.engine = engine
+        self.manifest = manifest
+        self.incremental = incremental
+        self.folder_tree = FolderTree(sdk)
+        self.folder_ids = set()
+        self.listed = None
+        self.jobs = []
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.results = ContentResults(EXPORT)
+
+    def run(self, folders=None, dashboards=None, looks=None, workers=1):
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export") as pool:
+                self.export_folders(pool, folders)
+                self.export_changed_folder_content(pool)
+                self.export_items(pool, dashboards, looks)
+            # every export has finished by now, so a failure doesn't cut the others short
+            for job in self.jobs:
+                job.result()
+        finally:
+            self.results.report()
+        self.update_manifest()
+
+    def submit(self, pool, fn, *args):
+        self.jobs.append(pool.submit(fn, *args))
+
+    def count(self, outcome):
+        with self.lock:
+            self.counts[outcome] += 1
+
+    def export_file(self, content_type, content_id, path, filename=None, updated_at=None, folder_id=None):
+        named = {"filename": filename} if filename else {}
+        if self.engine == "native":
+            exporter = functools.partial(
+                native_content.export_content, content_type, content_id, str(path), self.sdk, **named
+            )
+        else:
+            exporter = functools.partial(
+                export_content, content_type, content_id, self.env, self.ini, str(path), self.debug, **named
+            )
+        written = self.results.track(content_type, content_id, exporter)
+        if self.manifest is not None:
+            self.manifest.record(content_type, content_id, written, updated_at, folder_id)
+
+    def export_folders(self, pool, folders):
+        for fid in folders or []:
+            if self.manifest is not None:
+                self.folder_ids.update(self.folder_tree.subtree(fid))
+            if self.incremental:
+                # only the changed content of these folders is exported, see export_changed_folder_content
+                continue
+
+            # generate the list of folders
+            folder_list = []
+            folder_list = recurse_folders(fid, folder_list, self.folder_tree, self.debug)
+            # list is generated in reverse order, so we have to correct
+            folder_list.reverse()
+            logger.debug("folder_list", extra={"folder_id": fid, "list": folder_list})
+
+            # create the target directory. Parent is called b/c the final directory is created during export
+            path_string = "/".join([self.local_target] + folder_list)
+            path = Path(path_string).parent
+            path.mkdir(parents=True, exist_ok=True)
+
+            # export the folder
+            if self.engine == "native":
+                self.submit(pool, self.results.track, "space", fid, native_content.export_space, fid, str(path), self.sdk)
+            else:
+                self.submit(
+                    pool, self.results.track, "space", fid, export_spaces, fid, self.env, self.ini, str(path), self.debug
+                )
+
+    def folder_export_path(self, content_type, item):
+        """Where a folder export puts `item`, in the layout gzr gives it"""
+        folder_list = recurse_folders(item.folder_id, [], self.folder_tree, self.debug)
         folder_list.reverse()
-        logger.debug("folder_list", extra={"folder_id": fid, "list": folder_list})
-
-        # create the target directory. Parent is called b/c the final directory is created during export
-        path_string = "/".join([local_target] + folder_list)
-        path = Path(path_string).parent
-        path.mkdir(parents=True, exist_ok=True)
-
-        # export the folder
-        export_spaces(fid, env, ini, str(path), debug)
-
-    for did in dashboards or []:
-
-        logger.debug("dashboard_list", extra={"dashboards": dashboards})
+        path = Path(self.local_target, *[native_content.safe_name(i) for i in folder_list])
+        filename = f"{content_type.capitalize()}_{item.id}_{native_content.safe_name(item.title or '')}.json"
+        return path, filename
+
+    def export_changed_folder_content(self, pool):
+        if not (self.incremental and self.folder_ids):
+            return
+
+        # folder exports are redone one changed file at a time
+        self.listed = folder_content(self.sdk, self.folder_ids)
+        for content_type, item in self.listed:
+            path, filename = self.folder_export_path(content_type, item)
+            if self.manifest.is_current(content_type, item.id, item.updated_at, path / filename):
+                self.count("unchanged")
+                continue
+
+            previous = self.manifest.entries.get(content_key(content_type, item.id))
+            if previous and previous["path"] != str(path / filename) and os.path.exists(previous["path"]):
+                # renamed or moved since the last export
+                os.remove(previous["path"])
+            path.mkdir(parents=True, exist_ok=True)
+            self.count("exported")
+            self.submit(pool, self.export_file, content_type, item.id, path, filename, item.updated_at, str(item.folder_id))
+
+    def export_items(self, pool, dashboards, looks):
+        path = Path(self.local_target)
+        if dashboards or looks:
+            # create the target directory
+            path.mkdir(parents=True, exist_ok=True)
+
+        for content_type, content_ids in [("dashboard", dashboards), ("look", looks)]:
+            logger.debug(f"{content_type}_list", extra={f"{content_type}s": content_ids})
+            for content_id in content_ids or []:
+                self.submit(pool, self.export_item, content_type, content_id, path)
+
+    def export_item(self, content_type, content_id, path):
+        updated_at = None
+        if self.incremental:
+            # looked up here rather than up front, so the lookups run on the workers too
+            updated_at = content_updated_at(content_type, content_id, self.sdk)
+            if not self.item_changed(content_type, content_id, updated_at, path):
+                return
+        self.count("exported")
+        self.export_file(content_type, content_id, path, None, updated_at)
+
+    def item_changed(self, content_type, content_id, updated_at, path):
+        key = content_key(content_type, content_id)
+        if updated_at is None:
+            logger.warning("Content not found", extra={"content": key})
+            if key in self.manifest.entries:
+                self.manifest.tombstone(key)
+                self.count("removed")
+            return False
+        if self.manifest.is_current(content_type, content_id, updated_at, path / f"{content_type}_{content_id}.json"):
+            self.count("unchanged")
+            return False
+        return True
+
+    def update_manifest(self):
+        if self.manifest is None:
+            return
+
+        if self.folder_ids:
+            if self.listed is None:
+                self.record_folder_exports()
+            self.tombstone_removed_content()
+
+        self.manifest.save()
+        logger.info(
+            "Export summary",
+            extra=dict({"exported": 0, "unchanged": 0, "removed": 0}, **self.counts, incremental=self.incremental)
+        )
+
+    def record_folder_exports(self):
+        # whole folders were exported, so pick their files up from disk
+        self.listed = folder_content(self.sdk, self.folder_ids)
+        found = scan_content_files(self.local_target)
+        for content_type, item in self.listed:
+            key = content_key(content_type, item.id)
+            if key in found:
+                self.manifest.record(content_type, item.id, found[key], item.updated_at, str(item.folder_id))
+                self.count("exported")
+
+    def tombstone_removed_content(self):
+        listed_keys = {content_key(content_type, item.id) for content_type, item in self.listed}
+        for key, entry in self.manifest.live().items():
+            folder_id = entry.get("folder_id")
+            if not folder_id or key in listed_keys:
+                continue
+            # gone from an exported folder, or its folder is gone from the instance
+            if folder_id in self.folder_ids or folder_id not in self.folder_tree.folders:
+                self.manifest.tombstone(key)
+                self.count("removed")
 
-        # create the target directory
-        path = Path(local_target)
-        path.mkdir(parents=True, exist_ok=True)
 
-        # export the dashboard
-        export_content("dashboard", did, env, ini, str(path), debug)
-
-    for lid in looks or []:
-
-        logger.debug("look_list", extra={"looks": looks})
-
-        # create the target directory
-        path = Path(local_target)
-        path.mkdir(parents=True, exist_ok=True)
+def send_export(
+    sdk, env, ini, local_target, folders=None, dashboards=None, looks=None, debug=False, engine="gzr", workers=1,
+    manifest=None, incremental=False
+):
+    """Export content to `local_target`.
 
-        # export the look
-        export_content("look", lid, env, ini, str(path), debug)
+    With a `manifest` every exported file is recorded with the version it holds, and
+    content that has been deleted from the instance is tombstoned. An `incremental`
+    export uses it to skip any content whose file is already up to date.
+    """
+    export = ContentExport(sdk, env, ini, local_target, debug, engine, manifest, incremental)
+    export.run(folders, dashboards, looks, workers)
 
 
 def main(args):
@@ -161,6 +413,12 @@ def main(args):
         extra={"env": args.env, "folders": args.folders, "dashboards": args.dashboards, "looks": args.looks, "local_target": args.local_target}
     )
     sdk = get_client(args.ini, args.env)
+
+    manifest = ExportManifest.load(args.local_target) or ExportManifest(args.local_target)
+    incremental = args.incremental and manifest.exported_at is not None
+    if args.incremental and not incremental:
+        logger.warning("No export manifest found. Running a full export", extra={"local_target": args.local_target})
+
     send_export(
         sdk,
         args.env,
@@ -169,5 +427,9 @@ def main(args):
         args.folders,
         args.dashboards,
         args.looks,
-        args.debug
+        args.debug,
+        args.engine,
+        args.workers,
+        manifest,
+        incremental
     )
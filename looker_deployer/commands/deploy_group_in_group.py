@@ -2,8 +2,13 @@ import logging
 import re
 from looker_sdk import models40 as models
 from looker_deployer.utils import deploy_logging
-from looker_deployer.utils.get_client import get_client
-from looker_deployer.utils.match_by_key import match_by_key
+from looker_deployer.utils.executor import (READ_CONCURRENCY, WriteExecutor,
+                                            get_executor, instance_key,
+                                            rate_limited, read_pool)
+from looker_deployer.utils.source_snapshot import get_source, save_source
+from looker_deployer.utils.targets import deploy_to_targets
+from looker_deployer.utils.match_by_key import KeyIndex
+from looker_deployer.utils.plan import Plan
 
 logger = deploy_logging.get_logger(__name__)
 
@@ -34,87 +39,100 @@ def get_filtered_groups(source_sdk, pattern=None):
     return groups
 
 
-def write_groups_in_group(source_sdk, target_sdk, pattern=None):  # noqa: C901
+def add_group_group(group, nested_group, target_sdk, executor):
+    logger.debug("No Groups in Group found. Creating...")
+    logger.debug("Deploying Groups in Group",
+                 extra={"group_name": group.name,
+                        "group_group_id": nested_group.id})
+    executor.call(target_sdk.add_group_group, group_id=group.id,
+                  body=models.GroupIdForGroupInclusion(
+                      group_id=nested_group.id))
+    logger.info("Deployment Complete",
+                extra={"group_name": group.name,
+                       "group_group_id": nested_group.id})
+
+
+def remove_group_group(group, nested_group, target_sdk, executor):
+    logger.debug("Extra Groups in Group found. Deleting...")
+    logger.debug("Removing Groups in Group",
+                 extra={"group_name": group.name,
+                        "group_group_id": nested_group.id})
+    executor.call(target_sdk.delete_group_from_group,
+                  group_id=group.id, deleting_group_id=nested_group.id)
+    logger.info("Deployment Complete",
+                extra={"group_name": group.name,
+                       "group_group_id": nested_group.id})
+
+
+def get_group_graph(sdk, groups, workers=READ_CONCURRENCY):
+    # INFO: Fetch the nested groups of every group at once. Membership edges
+    # are keyed by (parent name, nested group name)
+    with read_pool(workers) as pool:
+        nested_groups = pool.map(rate_limited(sdk, sdk.all_group_groups),
+                                 [i.id for i in groups])
+        edges = {}
+        for group, nested in zip(groups, nested_groups):
+            edges.update(((group.name, i.name), i) for i in nested)
+    return edges
+
+
+def write_groups_in_group(source_sdk, target_sdk, pattern=None,
+                          executor=None, plan=None):
+    executor = executor or WriteExecutor()
+    plan = plan or Plan()
 
     # INFO: Get all groups from source and target instances that match pattern
     # for name
     groups = get_filtered_groups(source_sdk, pattern)
-    target_groups = get_filtered_groups(target_sdk, pattern=None)
+    target_groups = KeyIndex(get_filtered_groups(target_sdk, pattern=None),
+                             "name")
 
-    # INFO: Start Loop of Create/Update on Target
+    # INFO: Only groups that already exist in the target can be linked
+    parents = []
     for group in groups:
-        matched_group = match_by_key(target_groups, group, "name")
-        logger.debug("Group Matched " + matched_group.name)
-        groups_in_group = source_sdk.all_group_groups(group.id)
-        target_groups_in_group = target_sdk.all_group_groups(matched_group.id)
-
-        # INFO: Need to loop through the groups in group to identify
-        # target group ID
-        for i, nested_group in enumerate(groups_in_group):
-            target_nested_group = match_by_key(target_groups, nested_group,
-                                               "name")
-
-            if target_nested_group:
-                nested_group.id = target_nested_group.id
-                groups_in_group[i] = nested_group
-            else:
-                groups_in_group.remove(nested_group)
-
-        # INFO: If groups in groups between instances is different, we need to
-        # either delete or create
-        source_group_ids = []
-        for nested_group in groups_in_group:
-            source_group_ids.append(nested_group.id)
-
-        target_group_ids = []
-        for nested_group in target_groups_in_group:
-            target_group_ids.append(nested_group.id)
-
-        all_group_ids = list(set().union(source_group_ids, target_group_ids))
-
-        for group_id in all_group_ids:
-            in_source = True
-            in_target = True
-            try:
-                source_group_ids.index(group_id)
-            except Exception:
-                in_source = False
-
-            try:
-                target_group_ids.index(group_id)
-            except Exception:
-                in_target = False
-
-            if in_source and not in_target:
-                logger.debug("No Groups in Group found. Creating...")
-                logger.debug("Deploying Groups in Group",
-                             extra={"group_name": group.name,
-                                    "group_group_id": group_id})
-                target_sdk.add_group_group(group_id=matched_group.id,
-                                           body=models.GroupIdForGroupInclusion
-                                           (group_id=group_id))
-                logger.info("Deployment Complete",
-                            extra={"group_name": group.name,
-                                   "group_group_id": group_id})
-
-            elif not in_source and in_target:
-                logger.debug("Extra Groups in Group found. Deleting...")
-                logger.debug("Removing Groups in Group",
-                             extra={"group_name": group.name,
-                                    "group_group_id": group_id})
-                target_sdk.delete_group_from_group(group_id=matched_group.id,
-                                                   deleting_group_id=group_id)
-                logger.info("Deployment Complete",
-                            extra={"group_name": group.name,
-                                   "group_group_id": group_id})
+        if target_groups.match(group):
+            parents.append(group)
+        else:
+            logger.warning("Group not found in target. Deploy groups first",
+                           extra={"group_name": group.name})
+    target_parents = [target_groups.match(i) for i in parents]
+
+    source_edges = {i for i in get_group_graph(source_sdk, parents)
+                    if i[1] in target_groups}
+    target_graph = get_group_graph(target_sdk, target_parents)
+    target_edges = target_graph.keys()
+
+    with executor.batch() as batch:
+        for parent, nested in sorted(source_edges - target_edges):
+            if plan.create("group_in_group", f"{parent} > {nested}"):
+                batch.run(add_group_group, target_groups.get(parent),
+                          target_groups.get(nested), target_sdk, executor)
+
+        for parent, nested in sorted(target_edges - source_edges):
+            if plan.delete("group_in_group", f"{parent} > {nested}"):
+                batch.run(remove_group_group, target_groups.get(parent),
+                          target_graph[(parent, nested)], target_sdk,
+                          executor)
+
+        for parent, nested in source_edges & target_edges:
+            plan.unchanged("group_in_group", f"{parent} > {nested}")
+
+    plan.report()
 
 
 def main(args):
     if args.debug:
         logger.setLevel(logging.DEBUG)
 
-    source_sdk = get_client(args.ini, args.source)
+    source_sdk = get_source(args.ini, args.source,
+                            args.load_source_snapshot)
+
+    def deploy(target_sdk):
+        executor = get_executor(target_sdk, args.concurrency,
+                                args.max_requests_per_second)
+        plan = Plan(not args.plan, instance_key(target_sdk))
+        write_groups_in_group(source_sdk, target_sdk, args.pattern, executor,
+                              plan)
 
-    for t in args.target:
-        target_sdk = get_client(args.ini, t)
-        write_groups_in_group(source_sdk, target_sdk, args.pattern)
+    deploy_to_targets(args.ini, args.target, deploy, args.parallel_targets)
+    save_source(source_sdk, args.save_source_snapshot)
@@ -2,8 +2,12 @@ import logging
 import re
 from looker_sdk import models40 as models
 from looker_deployer.utils import deploy_logging
-from looker_deployer.utils.get_client import get_client
-from looker_deployer.utils.match_by_key import match_by_key
+from looker_deployer.utils.executor import (WriteExecutor, get_executor,
+                                            instance_key)
+from looker_deployer.utils.source_snapshot import get_source, save_source
+from looker_deployer.utils.targets import deploy_to_targets
+from looker_deployer.utils.match_by_key import KeyIndex
+from looker_deployer.utils.plan import Plan, diff
 
 logger = deploy_logging.get_logger(__name__)
 
@@ -34,66 +38,94 @@ def get_filtered_groups(source_sdk, pattern=None):
     return groups
 
 
-def write_groups(groups, target_sdk, pattern=None, allow_delete=None):
+def create_group(new_group, target_sdk, executor):
+    logger.debug("No Group found. Creating...")
+    logger.debug("Deploying Group", extra={"group": new_group.name})
+    executor.call(target_sdk.create_group, new_group)
+    logger.info("Deployment complete", extra={"group": new_group.name})
+
+
+def update_group(group_id, new_group, target_sdk, executor):
+    logger.debug("Existing Group found. Updating...")
+    logger.debug("Deploying Group", extra={"group": new_group.name})
+    executor.call(target_sdk.update_group, group_id, new_group)
+    logger.info("Deployment complete", extra={"group": new_group.name})
+
+
+def delete_group(target_group, target_sdk, executor):
+    logger.debug("No Source Group found. Deleting...")
+    logger.debug("Deleting Group", extra={"group": target_group.name})
+    executor.call(target_sdk.delete_group, target_group.id)
+    logger.info("Delete complete", extra={"group": target_group.name})
+
+
+def write_groups(groups, target_sdk, pattern=None, allow_delete=None,
+                 executor=None, plan=None):
+    executor = executor or WriteExecutor()
+    plan = plan or Plan()
 
     # INFO: Get all groups from target instances that match pattern for name
     target_groups = get_filtered_groups(target_sdk, pattern)
+    target_group_index = KeyIndex(target_groups, "name")
+
+    with executor.batch() as batch:
+        # INFO: Start Loop of Create/Update on Target
+        for group in groups:
+            # INFO: Create Group
+            new_group = models.WriteGroup()
+            new_group.__dict__.update(group.__dict__)
 
-    # INFO: Start Loop of Create/Update on Target
-    for group in groups:
-        # INFO: Create Group
-        new_group = models.WriteGroup()
-        new_group.__dict__.update(group.__dict__)
-
-        # INFO: Test if group is already in target
-        matched_group = match_by_key(target_groups, group, "name")
-
-        if matched_group:
-            group_exists = True
-        else:
-            group_exists = False
-
-        # INFO: Create or Update the Group
-        if not group_exists:
-            logger.debug("No Group found. Creating...")
-            logger.debug("Deploying Group", extra={"group": group.name})
-            matched_group = target_sdk.create_group(new_group)
-            logger.info("Deployment complete", extra={"group": new_group.name})
-        else:
-            logger.debug("Existing Group found. Updating...")
-            logger.debug("Deploying Group", extra={"group": new_group.name})
-            matched_group = target_sdk.update_group(matched_group.id,
-                                                    new_group)
-            logger.info("Deployment complete", extra={"group": new_group.name})
-
-    # INFO: Delete missing groups that are not in the source
-    if allow_delete:
-        for target_group in target_groups:
-
-            # INFO: Test if model set is already in target
-            matched_group = match_by_key(groups, target_group, "name")
+            # INFO: Test if group is already in target
+            matched_group = target_group_index.match(group)
 
+            # INFO: Create or Update the Group
             if not matched_group:
-                logger.debug("No Source Group found. Deleting...")
-                logger.debug("Deleting Group", extra={"group":
-                             target_group.name})
-                target_sdk.delete_group(target_group.id)
-                logger.info("Delete complete", extra={"group":
-                            target_group.name})
+                if plan.create("group", new_group.name):
+                    batch.run(create_group, new_group, target_sdk, executor)
+            else:
+                changes = diff(new_group, matched_group)
+                if plan.update_if_changed("group", new_group.name, changes):
+                    batch.run(update_group, matched_group.id, new_group,
+                              target_sdk, executor)
 
+        # INFO: Delete missing groups that are not in the source
+        if allow_delete:
+            group_index = KeyIndex(groups, "name")
+            for target_group in target_groups:
 
-def send_groups(source_sdk, target_sdk, pattern=None, allow_delete=None):
+                # INFO: Test if model set is already in target
+                matched_group = group_index.match(target_group)
+
+                if not matched_group and plan.delete("group",
+                                                     target_group.name):
+                    batch.run(delete_group, target_group, target_sdk, executor)
+
+    plan.report()
+
+
+def send_groups(source_sdk, target_sdk, pattern=None, allow_delete=None,
+                executor=None, plan=None):
     # INFO: Get all groups from source instance
     groups = get_filtered_groups(source_sdk, pattern)
-    write_groups(groups, target_sdk, pattern, allow_delete)
+    write_groups(groups, target_sdk, pattern, allow_delete, executor, plan)
 
 
 def main(args):
     if args.debug:
         logger.setLevel(logging.DEBUG)
 
-    source_sdk = get_client(args.ini, args.source)
+    source_sdk = get_source(args.ini, args.source,
+                            args.load_source_snapshot)
+
+    # INFO: Read the source once and share it across every target
+    groups = get_filtered_groups(source_sdk, args.pattern)
+
+    def deploy(target_sdk):
+        executor = get_executor(target_sdk, args.concurrency,
+                                args.max_requests_per_second)
+        plan = Plan(not args.plan, instance_key(target_sdk))
+        write_groups(groups, target_sdk, args.pattern, args.delete, executor,
+                     plan)
 
-    for t in args.target:
-        target_sdk = get_client(args.ini, t)
-        send_groups(source_sdk, target_sdk, args.pattern, args.delete)
+    deploy_to_targets(args.ini, args.target, deploy, args.parallel_targets)
+    save_source(source_sdk, args.save_source_snapshot)
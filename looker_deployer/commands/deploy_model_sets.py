@@ -2,8 +2,12 @@ import logging
 import re
 from looker_sdk import models40 as models
 from looker_deployer.utils import deploy_logging
-from looker_deployer.utils.get_client import get_client
-from looker_deployer.utils.match_by_key import match_by_key
+from looker_deployer.utils.executor import (WriteExecutor, get_executor,
+                                            instance_key)
+from looker_deployer.utils.source_snapshot import get_source, save_source
+from looker_deployer.utils.targets import deploy_to_targets
+from looker_deployer.utils.match_by_key import KeyIndex
+from looker_deployer.utils.plan import Plan, diff
 
 logger = deploy_logging.get_logger(__name__)
 
@@ -34,63 +38,86 @@ def get_filtered_model_sets(source_sdk, pattern=None):
     return model_sets
 
 
-def write_model_sets(model_sets, target_sdk, pattern=None, allow_delete=None):
+def create_model_set(new_model_set, target_sdk, executor):
+    logger.debug("No Model Set found. Creating...")
+    logger.debug("Deploying Model Set",
+                 extra={"model_set": new_model_set.name})
+    executor.call(target_sdk.create_model_set, new_model_set)
+    logger.info("Deployment complete",
+                extra={"model_set": new_model_set.name})
+
+
+def update_model_set(model_set_id, new_model_set, target_sdk, executor):
+    logger.debug("Existing model set found. Updating...")
+    logger.debug("Deploying Model Set",
+                 extra={"model_set": new_model_set.name})
+    executor.call(target_sdk.update_model_set, model_set_id, new_model_set)
+    logger.info("Deployment complete",
+                extra={"model_set": new_model_set.name})
+
+
+def delete_model_set(target_model_set, target_sdk, executor):
+    logger.debug("No Source Model Set found. Deleting...")
+    logger.debug("Deleting Model Set",
+                 extra={"model_set": target_model_set.name})
+    executor.call(target_sdk.delete_model_set, target_model_set.id)
+    logger.info("Delete complete",
+                extra={"model_set": target_model_set.name})
+
+
+def write_model_sets(model_sets, target_sdk, pattern=None, allow_delete=None,
+                     executor=None, plan=None):
+    executor = executor or WriteExecutor()
+    plan = plan or Plan()
 
     # INFO: Get filtered model sets from target Instance
     target_model_sets = get_filtered_model_sets(target_sdk, pattern)
+    target_model_set_index = KeyIndex(target_model_sets, "name")
 
-    # INFO: Start Loop of Create/Update on Target
-    for model_set in model_sets:
-        # INFO: Create model set
-        new_model_set = models.WriteModelSet()
-        new_model_set.__dict__.update(model_set.__dict__)
-
-        # INFO: Test if model set is already in target
-        matched_model_set = match_by_key(target_model_sets, model_set, "name")
-
-        if matched_model_set:
-            model_set_exists = True
-        else:
-            model_set_exists = False
-
-        # INFO: Create or Update the Model Set
-        if not model_set_exists:
-            logger.debug("No Model Set found. Creating...")
-            logger.debug("Deploying Model Set",
-                         extra={"model_set": model_set.name})
-            matched_model_set = target_sdk.create_model_set(new_model_set)
-            logger.info("Deployment complete",
-                        extra={"model_set": new_model_set.name})
-        else:
-            logger.debug("Existing model set found. Updating...")
-            logger.debug("Deploying Model Set",
-                         extra={"model_set": new_model_set.name})
-            matched_model_set = target_sdk.update_model_set(
-                matched_model_set.id, new_model_set)
-            logger.info("Deployment complete",
-                        extra={"model_set": new_model_set.name})
-
-    # INFO: Delete missing model sets that are not in source
-    if allow_delete:
-        for target_model_set in target_model_sets:
+    with executor.batch() as batch:
+        # INFO: Start Loop of Create/Update on Target
+        for model_set in model_sets:
+            # INFO: Create model set
+            new_model_set = models.WriteModelSet()
+            new_model_set.__dict__.update(model_set.__dict__)
 
             # INFO: Test if model set is already in target
-            matched_model_set = match_by_key(model_sets, target_model_set,
-                                             "name")
+            matched_model_set = target_model_set_index.match(model_set)
 
+            # INFO: Create or Update the Model Set
             if not matched_model_set:
-                logger.debug("No Source Model Set found. Deleting...")
-                logger.debug("Deleting Model Set",
-                             extra={"model_set": target_model_set.name})
-                target_sdk.delete_model_set(target_model_set.id)
-                logger.info("Delete complete",
-                            extra={"model_set": target_model_set.name})
-
-
-def send_model_sets(source_sdk, target_sdk, pattern=None, allow_delete=None):
+                if plan.create("model_set", new_model_set.name):
+                    batch.run(create_model_set, new_model_set, target_sdk,
+                              executor)
+            else:
+                changes = diff(new_model_set, matched_model_set)
+                if plan.update_if_changed("model_set", new_model_set.name,
+                                          changes):
+                    batch.run(update_model_set, matched_model_set.id,
+                              new_model_set, target_sdk, executor)
+
+        # INFO: Delete missing model sets that are not in source
+        if allow_delete:
+            model_set_index = KeyIndex(model_sets, "name")
+            for target_model_set in target_model_sets:
+
+                # INFO: Test if model set is already in target
+                matched_model_set = model_set_index.match(target_model_set)
+
+                if not matched_model_set and plan.delete(
+                        "model_set", target_model_set.name):
+                    batch.run(delete_model_set, target_model_set,
+                              target_sdk, executor)
+
+    plan.report()
+
+
+def send_model_sets(source_sdk, target_sdk, pattern=None, allow_delete=None,
+                    executor=None, plan=None):
     # INFO: Get all model sets from source instance
     model_sets = get_filtered_model_sets(source_sdk, pattern)
-    write_model_sets(model_sets, target_sdk, pattern, allow_delete)
+    write_model_sets(model_sets, target_sdk, pattern, allow_delete, executor,
+                     plan)
 
 
 def main(args):
@@ -98,8 +125,18 @@ def main(args):
     if args.debug:
         logger.setLevel(logging.DEBUG)
 
-    source_sdk = get_client(args.ini, args.source)
+    source_sdk = get_source(args.ini, args.source,
+                            args.load_source_snapshot)
+
+    # INFO: Read the source once and share it across every target
+    model_sets = get_filtered_model_sets(source_sdk, args.pattern)
+
+    def deploy(target_sdk):
+        executor = get_executor(target_sdk, args.concurrency,
+                                args.max_requests_per_second)
+        plan = Plan(not args.plan, instance_key(target_sdk))
+        write_model_sets(model_sets, target_sdk, args.pattern, args.delete,
+                         executor, plan)
 
-    for t in args.target:
-        target_sdk = get_client(args.ini, t)
-        send_model_sets(source_sdk, target_sdk, args.pattern, args.delete)
+    deploy_to_targets(args.ini, args.target, deploy, args.parallel_targets)
+    save_source(source_sdk, args.save_source_snapshot)
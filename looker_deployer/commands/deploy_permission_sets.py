@@ -2,8 +2,12 @@ import logging
 import re
 from looker_sdk import models40 as models
 from looker_deployer.utils import deploy_logging
-from looker_deployer.utils.get_client import get_client
-from looker_deployer.utils.match_by_key import match_by_key
+from looker_deployer.utils.executor import (WriteExecutor, get_executor,
+                                            instance_key)
+from looker_deployer.utils.source_snapshot import get_source, save_source
+from looker_deployer.utils.targets import deploy_to_targets
+from looker_deployer.utils.match_by_key import KeyIndex
+from looker_deployer.utils.plan import Plan, diff
 
 logger = deploy_logging.get_logger(__name__)
 
@@ -35,71 +39,92 @@ def get_filtered_permission_sets(source_sdk, pattern=None):
     return permission_sets
 
 
+def create_permission_set(new_permission_set, target_sdk, executor):
+    logger.debug("No Permission Set found. Creating...")
+    logger.debug("Deploying Permission Set",
+                 extra={"permission_set": new_permission_set.name})
+    executor.call(target_sdk.create_permission_set, new_permission_set)
+    logger.info("Deployment complete",
+                extra={"permission_set": new_permission_set.name})
+
+
+def update_permission_set(permission_set_id, new_permission_set, target_sdk,
+                          executor):
+    logger.debug("Existing permission set found. Updating...")
+    logger.debug("Deploying Permission Set",
+                 extra={"permission_set": new_permission_set.name})
+    executor.call(target_sdk.update_permission_set, permission_set_id,
+                  new_permission_set)
+    logger.info("Deployment complete",
+                extra={"permission_set": new_permission_set.name})
+
+
+def delete_permission_set(target_permission_set, target_sdk, executor):
+    logger.debug("No Source Permission Set found. Deleting...")
+    logger.debug("Deleting Permission Set",
+                 extra={"permission_set": target_permission_set.name})
+    executor.call(target_sdk.delete_permission_set, target_permission_set.id)
+    logger.info("Delete complete",
+                extra={"permission_set": target_permission_set.name})
+
+
 def write_permission_sets(permission_sets, target_sdk, pattern=None,
-                          allow_delete=None):
+                          allow_delete=None, executor=None, plan=None):
+    executor = executor or WriteExecutor()
+    plan = plan or Plan()
 
     # INFO: Get all permission sets from target instances that match pattern
     target_permission_sets = get_filtered_permission_sets(target_sdk, pattern)
+    target_permission_set_index = KeyIndex(target_permission_sets, "name")
+
+    with executor.batch() as batch:
+        # INFO: Start Loop of Create/Update on Target
+        for permission_set in permission_sets:
+            # INFO: Create permission set
+            new_permission_set = models.WritePermissionSet()
+            new_permission_set.__dict__.update(permission_set.__dict__)
 
-    # INFO: Start Loop of Create/Update on Target
-    for permission_set in permission_sets:
-        # INFO: Create permission set
-        new_permission_set = models.WritePermissionSet()
-        new_permission_set.__dict__.update(permission_set.__dict__)
-
-        # INFO: Test if permission set is already in target
-        matched_permission_set = match_by_key(target_permission_sets,
-                                              permission_set, "name")
-
-        if matched_permission_set:
-            permission_set_exists = True
-        else:
-            permission_set_exists = False
-
-        # INFO: Create or Update the permission set
-        if not permission_set_exists:
-            logger.debug("No Permission Set found. Creating...")
-            logger.debug("Deploying Permission Set",
-                         extra={"permission_set": permission_set.name})
-            matched_permission_set = target_sdk.create_permission_set(
-                new_permission_set)
-            logger.info("Deployment complete",
-                        extra={"permission_set": new_permission_set.name})
-        else:
-            logger.debug("Existing permission set found. Updating...")
-            logger.debug("Deploying Permission Set",
-                         extra={"permission_set": new_permission_set.name})
-            matched_permission_set = target_sdk.update_permission_set(
-                matched_permission_set.id,
-                new_permission_set)
-            logger.info("Deployment complete",
-                        extra={"permission_set": new_permission_set.name})
-
-    # INFO:    Delete missing permission sets that are not in source
-    if allow_delete:
-        for target_permission_set in target_permission_sets:
-
-            # INFO:    Test if model set is already in target
-            matched_permission_set = match_by_key(permission_sets,
-                                                  target_permission_set,
-                                                  "name")
+            # INFO: Test if permission set is already in target
+            matched_permission_set = target_permission_set_index.match(
+                permission_set)
 
+            # INFO: Create or Update the permission set
             if not matched_permission_set:
-                logger.debug("No Source Permission Set found. Deleting...")
-                logger.debug("Deleting Permission Set",
-                             extra={"permission_set":
-                                    target_permission_set.name})
-                target_sdk.delete_permission_set(target_permission_set.id)
-                logger.info("Delete complete",
-                            extra={"permission_set":
-                                   target_permission_set.name})
+                if plan.create("permission_set", new_permission_set.name):
+                    batch.run(create_permission_set, new_permission_set,
+                              target_sdk, executor)
+            else:
+                changes = diff(new_permission_set, matched_permission_set)
+                if plan.update_if_changed("permission_set",
+                                          new_permission_set.name, changes):
+                    batch.run(update_permission_set,
+                              matched_permission_set.id, new_permission_set,
+                              target_sdk, executor)
+
+        # INFO:    Delete missing permission sets that are not in source
+        if allow_delete:
+            permission_set_index = KeyIndex(permission_sets, "name")
+            for target_permission_set in target_permission_sets:
+
+                # INFO:    Test if model set is already in target
+                matched_permission_set = permission_set_index.match(
+                    target_permission_set)
+
+                if not matched_permission_set and plan.delete(
+                        "permission_set", target_permission_set.name):
+                    batch.run(delete_permission_set, target_permission_set,
+                              target_sdk, executor)
+
+    plan.report()
 
 
 def send_permission_sets(source_sdk, target_sdk,
-                         pattern=None, allow_delete=None):
+                         pattern=None, allow_delete=None, executor=None,
+                         plan=None):
     # INFO:    Get all permissions sets from source instance
     permission_sets = get_filtered_permission_sets(source_sdk, pattern)
-    write_permission_sets(permission_sets, target_sdk, pattern, allow_delete)
+    write_permission_sets(permission_sets, target_sdk, pattern, allow_delete,
+                          executor, plan)
 
 
 def main(args):
@@ -107,8 +132,18 @@ def main(args):
     if args.debug:
         logger.setLevel(logging.DEBUG)
 
-    source_sdk = get_client(args.ini, args.source)
+    source_sdk = get_source(args.ini, args.source,
+                            args.load_source_snapshot)
+
+    # INFO: Read the source once and share it across every target
+    permission_sets = get_filtered_permission_sets(source_sdk, args.pattern)
+
+    def deploy(target_sdk):
+        executor = get_executor(target_sdk, args.concurrency,
+                                args.max_requests_per_second)
+        plan = Plan(not args.plan, instance_key(target_sdk))
+        write_permission_sets(permission_sets, target_sdk, args.pattern,
+                              args.delete, executor, plan)
 
-    for t in args.target:
-        target_sdk = get_client(args.ini, t)
-        send_permission_sets(source_sdk, target_sdk, args.pattern, args.delete)
+    deploy_to_targets(args.ini, args.target, deploy, args.parallel_targets)
+    save_source(source_sdk, args.save_source_snapshot)
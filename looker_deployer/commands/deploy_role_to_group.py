@@ -1,8 +1,13 @@
 import logging
 import re
 from looker_deployer.utils import deploy_logging
-from looker_deployer.utils.get_client import get_client
-from looker_deployer.utils.match_by_key import match_by_key
+from looker_deployer.utils.executor import (WriteExecutor, get_executor,
+                                            instance_key, rate_limited,
+                                            read_pool)
+from looker_deployer.utils.source_snapshot import get_source, save_source
+from looker_deployer.utils.targets import deploy_to_targets
+from looker_deployer.utils.match_by_key import KeyIndex
+from looker_deployer.utils.plan import Plan
 
 logger = deploy_logging.get_logger(__name__)
 
@@ -31,48 +36,88 @@ def get_filtered_roles(source_sdk, pattern=None):
     return roles
 
 
-def write_role_to_group(source_sdk, target_sdk, pattern=None):
+def set_role_groups(role, role_id, groups_for_update, target_sdk, executor):
+    logger.debug("Updating Role Group. Updating...")
+    logger.debug("Deploying Role Group",
+                 extra={"role_name": role.name,
+                        "group_ids": groups_for_update})
+    executor.call(target_sdk.set_role_groups, role_id=role_id,
+                  body=groups_for_update)
+    logger.info("Deployment Complete",
+                extra={"role_name": role.name,
+                       "group_ids": groups_for_update})
+
+
+def get_role_groups(sdk, roles, pool):
+    # INFO: Queue one role_groups call per role on the shared pool
+    role_groups = rate_limited(sdk, sdk.role_groups)
+    return {role.name: pool.submit(role_groups, role.id) for role in roles}
+
+
+def write_role_to_group(source_sdk, target_sdk, pattern=None, executor=None,
+                        plan=None):
+    executor = executor or WriteExecutor()
+    plan = plan or Plan()
 
     # INFO: Get all roles and groups information
     roles = get_filtered_roles(source_sdk, pattern)
-    target_roles = get_filtered_roles(target_sdk, pattern)
-    target_groups = target_sdk.all_groups()
+    target_roles = KeyIndex(get_filtered_roles(target_sdk, pattern), "name")
+    target_groups = KeyIndex(target_sdk.all_groups(fields="id,name"), "name")
 
-    # INFO: Start Loop of Update on Target
+    matched_roles = []
     for role in roles:
-        matched_role = match_by_key(target_roles, role, "name")
-        role_groups = source_sdk.role_groups(role.id)
-
-        # INFO: Need to loop through the role groups and find
-        # corresponding target group match
-        for i, role_group in enumerate(role_groups):
-            target_group = match_by_key(target_groups, role_group, "name")
-
-            if target_group:
-                role_group.id = target_group.id
-                role_groups[i] = role_group
-            else:
-                role_groups.remove(role_group)
-
-        # INFO: Perform update to target role group
-        groups_for_update = [i.id for i in role_groups]
-        logger.debug("Updating Role Group. Updating...")
-        logger.debug("Deploying Role Group",
-                     extra={"role_name": role.name,
-                            "group_ids": groups_for_update})
-        target_sdk.set_role_groups(role_id=matched_role.id,
-                                   body=groups_for_update)
-        logger.info("Deployment Complete",
-                    extra={"role_name": role.name,
-                           "group_ids": groups_for_update})
+        matched_role = target_roles.match(role)
+        if matched_role:
+            matched_roles.append((role, matched_role))
+        else:
+            logger.warning("Role not found in target. Deploy roles first",
+                           extra={"role_name": role.name})
+
+    # INFO: Fetch the groups of every role from both instances at once
+    with read_pool() as pool:
+        source_role_groups = get_role_groups(
+            source_sdk, [i[0] for i in matched_roles], pool)
+        target_role_groups = get_role_groups(
+            target_sdk, [i[1] for i in matched_roles], pool)
+
+    avoided = 0
+    with executor.batch() as batch:
+        # INFO: Start Loop of Update on Target
+        for role, matched_role in matched_roles:
+            # INFO: Find the corresponding target group for each role group
+            role_groups = source_role_groups[role.name].result()
+            matched_groups = [target_groups.match(i) for i in role_groups]
+            groups_for_update = [i.id for i in matched_groups if i]
+
+            current_groups = target_role_groups[matched_role.name].result()
+            if set(groups_for_update) == {i.id for i in current_groups}:
+                plan.unchanged("role_to_group", role.name)
+                avoided += 1
+                continue
+
+            # INFO: Perform update to target role group
+            if plan.update("role_to_group", role.name,
+                           {"group_ids": groups_for_update}):
+                batch.run(set_role_groups, role, matched_role.id,
+                          groups_for_update, target_sdk, executor)
+
+    logger.measure("role_to_group_writes_avoided", avoided, logger.COUNT)
+    plan.report()
 
 
 def main(args):
     if args.debug:
         logger.setLevel(logging.DEBUG)
 
-    source_sdk = get_client(args.ini, args.source)
+    source_sdk = get_source(args.ini, args.source,
+                            args.load_source_snapshot)
+
+    def deploy(target_sdk):
+        executor = get_executor(target_sdk, args.concurrency,
+                                args.max_requests_per_second)
+        plan = Plan(not args.plan, instance_key(target_sdk))
+        write_role_to_group(source_sdk, target_sdk, args.pattern, executor,
+                            plan)
 
-    for t in args.target:
-        target_sdk = get_client(args.ini, t)
-        write_role_to_group(source_sdk, target_sdk, args.pattern)
+    deploy_to_targets(args.ini, args.target, deploy, args.parallel_targets)
+    save_source(source_sdk, args.save_source_snapshot)
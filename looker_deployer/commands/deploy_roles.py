@@ -2,8 +2,12 @@ import logging
 import re
 from looker_sdk import models40 as models
 from looker_deployer.utils import deploy_logging
-from looker_deployer.utils.get_client import get_client
-from looker_deployer.utils.match_by_key import match_by_key
+from looker_deployer.utils.executor import (WriteExecutor, get_executor,
+                                            instance_key)
+from looker_deployer.utils.source_snapshot import get_source, save_source
+from looker_deployer.utils.targets import deploy_to_targets
+from looker_deployer.utils.match_by_key import KeyIndex
+from looker_deployer.utils.plan import Plan, diff
 
 logger = deploy_logging.get_logger(__name__)
 
@@ -32,69 +36,122 @@ def get_filtered_roles(source_sdk, pattern=None):
     return roles
 
 
-def write_roles(roles, target_sdk, pattern=None, allow_delete=None):
+def create_role(new_role, target_sdk, executor):
+    logger.debug("No Role found. Creating...")
+    logger.debug("Deploying Role", extra={"role": new_role.name})
+    executor.call(target_sdk.create_role, new_role)
+    logger.info("Deployment complete", extra={"role": new_role.name})
+
+
+def update_role(role_id, new_role, target_sdk, executor):
+    logger.debug("Existing Role found. Updating...")
+    logger.debug("Deploying Role", extra={"role": new_role.name})
+    executor.call(target_sdk.update_role, role_id, new_role)
+    logger.info("Deployment complete", extra={"role": new_role.name})
+
+
+def delete_role(target_role, target_sdk, executor):
+    logger.debug("No Source Role found. Deleting...")
+    logger.debug("Deleting Role", extra={"role": target_role.name})
+    executor.call(target_sdk.delete_role, target_role.id)
+    logger.info("Delete complete", extra={"role": target_role.name})
+
+
+def match_role_sets(role, new_role, target_permission_sets,
+                    target_model_sets):
+    unresolved = {}
+    for field, index in (("permission_set", target_permission_sets),
+                         ("model_set", target_model_sets)):
+        matched = index.match(getattr(role, field))
+        if matched:
+            setattr(new_role, f"{field}_id", matched.id)
+        else:
+            unresolved[field] = getattr(role, field).name
+    return unresolved
+
+
+def plan_unresolved_role(new_role, matched_role, unresolved, plan):
+    # INFO: A set missing from the target may only be planned so far, which is
+    # fine for a plan but leaves no id to send when applying
+    assert not plan.apply, (
+        f"Role {new_role.name} needs sets missing from the target: "
+        f"{unresolved}")
+    logger.info("Role needs sets that are not in the target yet",
+                extra={"role": new_role.name, "unresolved": unresolved})
+    if not matched_role:
+        plan.create("role", new_role.name)
+    else:
+        plan.update("role", new_role.name,
+                    {k: {"to": v, "unresolved": True}
+                     for k, v in unresolved.items()})
+
+
+def write_roles(roles, target_sdk, pattern=None, allow_delete=None,
+                executor=None, plan=None):
+    executor = executor or WriteExecutor()
+    plan = plan or Plan()
 
     # INFO: Get all roles from target instances that match pattern for name
     target_roles = get_filtered_roles(target_sdk, pattern)
+    target_role_index = KeyIndex(target_roles, "name")
 
     # INFO: Get all permission sets and models from target instances
-    target_permission_sets = target_sdk.all_permission_sets()
-    target_model_sets = target_sdk.all_model_sets()
-
-    # INFO: Start Loop of Create/Update on Target
-    for role in roles:
-        # INFO: Create Role
-        new_role = models.WriteRole()
-        new_role.__dict__.update(role.__dict__)
-
-        # INFO: For the role being created or updated, need to swap the
-        # permission set and model set ids
-        matched_permission_set = match_by_key(target_permission_sets,
-                                              role.permission_set, "name")
-        matched_model_set = match_by_key(target_model_sets,
-                                         role.model_set, "name")
-        new_role.permission_set_id = matched_permission_set.id
-        new_role.model_set_id = matched_model_set.id
-
-        # INFO: Test if role is already in target
-        matched_role = match_by_key(target_roles, role, "name")
-
-        if matched_role:
-            role_exists = True
-        else:
-            role_exists = False
-
-        # INFO: Create or Update the role
-        if not role_exists:
-            logger.debug("No Role found. Creating...")
-            logger.debug("Deploying Role", extra={"role": role.name})
-            matched_role = target_sdk.create_role(new_role)
-            logger.info("Deployment complete", extra={"role": new_role.name})
-        else:
-            logger.debug("Existing Role found. Updating...")
-            logger.debug("Deploying Role", extra={"role": new_role.name})
-            matched_role = target_sdk.update_role(matched_role.id, new_role)
-            logger.info("Deployment complete", extra={"role": new_role.name})
+    target_permission_sets = KeyIndex(target_sdk.all_permission_sets(), "name")
+    target_model_sets = KeyIndex(target_sdk.all_model_sets(), "name")
+
+    with executor.batch() as batch:
+        # INFO: Start Loop of Create/Update on Target
+        for role in roles:
+            # INFO: Create Role
+            new_role = models.WriteRole()
+            new_role.__dict__.update(role.__dict__)
+
+            # INFO: For the role being created or updated, need to swap the
+            # permission set and model set ids
+            unresolved = match_role_sets(role, new_role,
+                                         target_permission_sets,
+                                         target_model_sets)
+
+            # INFO: Test if role is already in target
+            matched_role = target_role_index.match(role)
+
+            if unresolved:
+                plan_unresolved_role(new_role, matched_role, unresolved,
+                                     plan)
+                continue
+
+            # INFO: Create or Update the role
+            if not matched_role:
+                if plan.create("role", new_role.name):
+                    batch.run(create_role, new_role, target_sdk, executor)
+            else:
+                # INFO: The nested sets carry source ids, the *_id fields
+                # are what the update sends
+                changes = diff(new_role, matched_role,
+                               exclude={"permission_set", "model_set"})
+                if plan.update_if_changed("role", new_role.name, changes):
+                    batch.run(update_role, matched_role.id, new_role,
+                              target_sdk, executor)
 
-    # INFO: Delete missing roles that are not in the source
-    if allow_delete:
-        for target_role in target_roles:
+        # INFO: Delete missing roles that are not in the source
+        if allow_delete:
+            role_index = KeyIndex(roles, "name")
+            for target_role in target_roles:
 
-            # INFO: Test if model set is already in target
-            matched_role = match_by_key(roles, target_role, "name")
+                # INFO: Test if model set is already in target
+                matched_role = role_index.match(target_role)
 
-            if not matched_role:
-                logger.debug("No Source Role found. Deleting...")
-                logger.debug("Deleting Role", extra={"role": target_role.name})
-                target_sdk.delete_role(target_role.id)
-                logger.info("Delete complete",
-                            extra={"role": target_role.name})
+                if not matched_role and plan.delete("role", target_role.name):
+                    batch.run(delete_role, target_role, target_sdk, executor)
 
+    plan.report()
 
-def send_roles(source_sdk, target_sdk, pattern=None, allow_delete=None):
+
+def send_roles(source_sdk, target_sdk, pattern=None, allow_delete=None,
+               executor=None, plan=None):
     # INFO: Get all roles from source instance
     roles = get_filtered_roles(source_sdk, pattern)
-    write_roles(roles, target_sdk, pattern, allow_delete)
+    write_roles(roles, target_sdk, pattern, allow_delete, executor, plan)
 
 
 def main(args):
@@ -102,8 +159,18 @@ def main(args):
     if args.debug:
         logger.setLevel(logging.DEBUG)
 
-    source_sdk = get_client(args.ini, args.source)
+    source_sdk = get_source(args.ini, args.source,
+                            args.load_source_snapshot)
+
+    # INFO: Read the source once and share it across every target
+    roles = get_filtered_roles(source_sdk, args.pattern)
+
+    def deploy(target_sdk):
+        executor = get_executor(target_sdk, args.concurrency,
+                                args.max_requests_per_second)
+        plan = Plan(not args.plan, instance_key(target_sdk))
+        write_roles(roles, target_sdk, args.pattern, args.delete, executor,
+                    plan)
 
-    for t in args.target:
-        target_sdk = get_client(args.ini, t)
-        send_roles(source_sdk, target_sdk, args.pattern, args.delete)
+    deploy_to_targets(args.ini, args.target, deploy, args.parallel_targets)
+    save_source(source_sdk, args.save_source_snapshot)
@@ -0,0 +1,162 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from looker_deployer.commands import deploy_group_in_group, deploy_groups
+from looker_deployer.commands import deploy_model_sets, deploy_permission_sets
+from looker_deployer.commands import deploy_role_to_group, deploy_roles
+from looker_deployer.commands import deploy_user_attributes
+from looker_deployer.utils import deploy_logging
+from looker_deployer.utils.executor import get_executor, instance_key
+from looker_deployer.utils.plan import Plan
+from looker_deployer.utils.source_snapshot import get_source, save_source
+from looker_deployer.utils.targets import deploy_to_targets
+
+logger = deploy_logging.get_logger(__name__)
+
+
+class StageFailedError(Exception):
+    """Exception raised if any stage of a sync failed or was skipped"""
+
+    def __init__(self, failed_stages, skipped_stages,
+                 message="Sync stages failed. Check the logs for details"):
+        self.failed_stages = failed_stages
+        self.skipped_stages = skipped_stages
+        self.message = message
+        super().__init__(self.message)
+
+    def __str__(self):
+        return (f"{', '.join(self.failed_stages)} -> {self.message} "
+                f"(skipped: {', '.join(self.skipped_stages) or 'none'})")
+
+
+def sync_permission_sets(source_sdk, target_sdk, args, executor, plan):
+    permission_sets = deploy_permission_sets.get_filtered_permission_sets(
+        source_sdk)
+    deploy_permission_sets.write_permission_sets(
+        permission_sets, target_sdk, None, args.delete, executor, plan)
+
+
+def sync_model_sets(source_sdk, target_sdk, args, executor, plan):
+    model_sets = deploy_model_sets.get_filtered_model_sets(source_sdk)
+    deploy_model_sets.write_model_sets(model_sets, target_sdk, None,
+                                       args.delete, executor, plan)
+
+
+def sync_roles(source_sdk, target_sdk, args, executor, plan):
+    roles = deploy_roles.get_filtered_roles(source_sdk)
+    deploy_roles.write_roles(roles, target_sdk, None, args.delete, executor,
+                             plan)
+
+
+def sync_groups(source_sdk, target_sdk, args, executor, plan):
+    groups = deploy_groups.get_filtered_groups(source_sdk)
+    deploy_groups.write_groups(groups, target_sdk, None, args.delete,
+                               executor, plan)
+
+
+def sync_group_in_group(source_sdk, target_sdk, args, executor, plan):
+    deploy_group_in_group.write_groups_in_group(source_sdk, target_sdk, None,
+                                                executor, plan)
+
+
+def sync_role_to_group(source_sdk, target_sdk, args, executor, plan):
+    deploy_role_to_group.write_role_to_group(source_sdk, target_sdk, None,
+                                             executor, plan)
+
+
+def sync_user_attributes(source_sdk, target_sdk, args, executor, plan):
+    deploy_user_attributes.write_user_attributes(source_sdk, target_sdk, None,
+                                                 args.delete, executor, plan)
+
+
+# stage: (stages it depends on, sync function). Listed in dependency order
+STAGES = {
+    "permission_sets": ([], sync_permission_sets),
+    "model_sets": ([], sync_model_sets),
+    "groups": ([], sync_groups),
+    "roles": (["permission_sets", "model_sets"], sync_roles),
+    "group_in_group": (["groups"], sync_group_in_group),
+    "role_to_group": (["roles", "groups"], sync_role_to_group),
+    "user_attributes": (["groups"], sync_user_attributes),
+}
+
+
+def run_stages(stages, run_stage, parallel_stages=1):
+    """Call `run_stage(name)` for each stage once its dependencies are done.
+
+    Up to `parallel_stages` independent stages run at once. A stage whose
+    dependency failed is skipped. Dependencies outside `stages` are assumed to
+    be in place already. Returns the status of every stage.
+    """
+    pending = [i for i in STAGES if i in stages]
+    status = {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, parallel_stages),
+                            thread_name_prefix="stage") as pool:
+        while pending or running:
+            for name in list(pending):
+                needs = [i for i in STAGES[name][0] if i in stages]
+                if any(status.get(i) in ("failed", "skipped") for i in needs):
+                    logger.warning("Skipping stage after failed dependency",
+                                   extra={"stage": name, "needs": needs})
+                    status[name] = "skipped"
+                    pending.remove(name)
+                elif all(status.get(i) == "ok" for i in needs):
+                    running[pool.submit(run_stage, name)] = name
+                    pending.remove(name)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    future.result()
+                    status[name] = "ok"
+                except Exception:
+                    logger.exception("Stage failed", extra={"stage": name})
+                    status[name] = "failed"
+    return status
+
+
+def sync_target(source_sdk, target_sdk, args):
+    executor = get_executor(target_sdk, args.concurrency,
+                            args.max_requests_per_second)
+
+    def run_stage(name):
+        start = time.perf_counter()
+        logger.info("Starting stage", extra={"stage": name})
+        plan = Plan(not args.plan, instance_key(target_sdk))
+        STAGES[name][1](source_sdk, target_sdk, args, executor, plan)
+        logger.info(
+            "Stage complete",
+            extra={"stage": name,
+                   "seconds": round(time.perf_counter() - start, 2)}
+        )
+
+    status = run_stages(args.stages, run_stage, args.parallel_stages)
+    logger.info(
+        "Sync summary by stage",
+        extra={"stages": status, "target": instance_key(target_sdk)}
+    )
+    failed = [i for i in status if status[i] == "failed"]
+    skipped = [i for i in status if status[i] == "skipped"]
+    if failed or skipped:
+        raise StageFailedError(failed, skipped)
+    return status
+
+
+def main(args):
+    if args.debug:
+        logger.setLevel(logging.DEBUG)
+
+    # INFO: One source snapshot serves every stage and every target, so
+    # collections the stages have in common are read from the source once
+    source_sdk = get_source(args.ini, args.source,
+                            args.load_source_snapshot)
+
+    def deploy(target_sdk):
+        sync_target(source_sdk, target_sdk, args)
+
+    deploy_to_targets(args.ini, args.target, deploy, args.parallel_targets)
+    save_source(source_sdk, args.save_source_snapshot)
@@ -1,9 +1,13 @@
 import logging
 import re
+from itertools import repeat
 from looker_sdk import models40 as models
 from looker_deployer.utils import deploy_logging
-from looker_deployer.utils.get_client import get_client
-from looker_deployer.utils.match_by_key import match_by_key
+from looker_deployer.utils.executor import READ_CONCURRENCY, WriteExecutor, get_executor, instance_key, rate_limited, read_pool
+from looker_deployer.utils.source_snapshot import get_source, save_source
+from looker_deployer.utils.targets import deploy_to_targets
+from looker_deployer.utils.match_by_key import KeyIndex
+from looker_deployer.utils.plan import Plan, diff
 
 logger = deploy_logging.get_logger(__name__)
 
@@ -48,102 +52,155 @@ def get_user_attribute_group_value(source_sdk, user_attribute):
 
 
 def match_user_attributes(source_user_attribute, target_user_attributes):
-    matched_user_attribute = None
+    return target_user_attributes.match(source_user_attribute)
 
-    for target_user_attribute in target_user_attributes:
-        if source_user_attribute.name == target_user_attribute.name:
-            matched_user_attribute = target_user_attribute
 
-    return matched_user_attribute
+def get_group_names(source_sdk):
+    # INFO: One call for every group name instead of one per group value
+    return {i.id: i.name for i in source_sdk.all_groups(fields="id,name")}
 
 
-def add_group_name_information(source_sdk, list_to_update):
-    for i, item in enumerate(list_to_update):
-        item_group_name = source_sdk.group(group_id=item.group_id)
-        item.name = item_group_name.name
-        list_to_update[i] = item
+def add_group_name_information(group_names, list_to_update):
+    for item in list_to_update:
+        item.name = group_names.get(item.group_id)
+        if item.name is None:
+            logger.warning("Group for user attribute value not found",
+                           extra={"group_id": item.group_id})
     return list_to_update
 
 
-def write_user_attributes(source_sdk, target_sdk,
-                          pattern=None, allow_delete=None):
+def get_all_user_attribute_group_values(source_sdk, user_attributes,
+                                        workers=READ_CONCURRENCY):
+    # INFO: Fetch the group values of every attribute up front, a few at a
+    # time, and name their groups from a single group listing
+    group_names = get_group_names(source_sdk)
+    with read_pool(workers) as pool:
+        group_values = pool.map(rate_limited(source_sdk,
+                                             get_user_attribute_group_value),
+                                repeat(source_sdk), user_attributes)
+        return {
+            user_attribute.id: add_group_name_information(group_names, values)
+            for user_attribute, values in zip(user_attributes, group_values)
+        }
 
-    # INFO: Get All User Attirbutes From Source Instance
-    user_attributes = get_filtered_user_attributes(source_sdk, pattern)
-    target_user_attributes = get_filtered_user_attributes(target_sdk, pattern)
-    target_groups = target_sdk.all_groups()
-
-    # INFO: Start Loop of Create/Update User Attribute on Target
-    # and Update Group Values if set
-    for user_attribute in user_attributes:
-        # INFO: Create user attribute
-        new_user_attribute = models.WriteUserAttribute(name="", label="", type="")
-        new_user_attribute.__dict__.update(user_attribute.__dict__)
-
-        # INFO: Test if user attribute is already in target
-        matched_user_attribute = match_user_attributes(user_attribute,
-                                                       target_user_attributes)
-        if matched_user_attribute:
-            user_attribute_exists = True
-        else:
-            user_attribute_exists = False
-
-        # INFO: Create or Update the User Attribute
-        if not user_attribute_exists:
-            logger.debug("No User Attribute found. Creating...")
-            logger.debug("Deploying User Attribute",
-                         extra={"user_attribute": new_user_attribute.name})
-            matched_user_attribute = target_sdk.create_user_attribute(new_user_attribute)
-            logger.info("Deployment complete",
-                        extra={"user_attribute": new_user_attribute.name})
-        else:
+
+def group_value_keys(user_attribute_group_values):
+    ranked = sorted(user_attribute_group_values, key=lambda i: i.rank or 0)
+    return [(i.group_id, i.value) for i in ranked]
+
+
+def write_user_attribute(user_attribute, matched_user_attribute,
+                         user_attribute_group_values, target_sdk,
+                         target_groups, executor, plan):
+    # INFO: Create user attribute
+    new_user_attribute = models.WriteUserAttribute(name="", label="", type="")
+    new_user_attribute.__dict__.update(user_attribute.__dict__)
+
+    # INFO: Create or Update the User Attribute
+    if not matched_user_attribute:
+        if not plan.create("user_attribute", new_user_attribute.name):
+            return
+        logger.debug("No User Attribute found. Creating...")
+        logger.debug("Deploying User Attribute",
+                     extra={"user_attribute": new_user_attribute.name})
+        target_user_attribute = executor.call(
+            target_sdk.create_user_attribute, new_user_attribute)
+        logger.info("Deployment complete",
+                    extra={"user_attribute": new_user_attribute.name})
+    else:
+        target_user_attribute = matched_user_attribute
+        changes = diff(new_user_attribute, matched_user_attribute)
+        if plan.update_if_changed("user_attribute", new_user_attribute.name,
+                                  changes):
             logger.debug("Existing user attribute found. Updating...")
             logger.debug("Deploying User Attribute",
                          extra={"user_attribute": new_user_attribute.name})
-            matched_user_attribute = target_sdk.update_user_attribute(
+            target_user_attribute = executor.call(
+                target_sdk.update_user_attribute,
                 matched_user_attribute.id,
                 new_user_attribute)
             logger.info("Deployment complete",
                         extra={"user_attribute": new_user_attribute.name})
-        # INFO: Set group values for user attribute
-        user_attribute_group_values = get_user_attribute_group_value(
-            source_sdk, user_attribute)
-        user_attribute_group_values = add_group_name_information(
-            source_sdk, user_attribute_group_values)
-        # INFO: Need to loop through the group values in a user attribute to
-        # determine matching group
-        for i, user_attribute_group_value in enumerate(
-                user_attribute_group_values):
-            target_group = match_by_key(
-                target_groups, user_attribute_group_value, "name")
-            if target_group:
-                user_attribute_group_value.group_id = target_group.id
-                user_attribute_group_values[i] = user_attribute_group_value
-            else:
-                user_attribute_group_values.remove(user_attribute_group_value)
-
-        if user_attribute_group_values:
-            target_sdk.set_user_attribute_group_values(
-                user_attribute_id=matched_user_attribute.id,
-                body=user_attribute_group_values)
-
-    # INFO: Delete missing users attirbutes that are not in source
-    if allow_delete:
-        for target_user_attribute in target_user_attributes:
+    # INFO: Set group values for user attribute. Keep the group values whose
+    # group exists in the target and point them at the target group
+    matched_group_values = []
+    for user_attribute_group_value in user_attribute_group_values:
+        target_group = target_groups.match(user_attribute_group_value)
+        if target_group:
+            user_attribute_group_value.group_id = target_group.id
+            matched_group_values.append(user_attribute_group_value)
+    user_attribute_group_values = matched_group_values
+
+    if not user_attribute_group_values:
+        return
+
+    # INFO: An existing attribute may already carry the same group values
+    if matched_user_attribute:
+        current_group_values = target_sdk.all_user_attribute_group_values(
+            matched_user_attribute.id)
+        if group_value_keys(current_group_values) == \
+                group_value_keys(user_attribute_group_values):
+            plan.unchanged("user_attribute_group_values",
+                           new_user_attribute.name)
+            return
+
+    if plan.update("user_attribute_group_values", new_user_attribute.name):
+        executor.call(
+            target_sdk.set_user_attribute_group_values,
+            user_attribute_id=target_user_attribute.id,
+            body=user_attribute_group_values)
+
+
+def delete_user_attribute(target_user_attribute, target_sdk, executor):
+    logger.debug("No Source User Attribute found. Deleting...")
+    logger.debug("Deleting User Attribute",
+                 extra={"user_attribute": target_user_attribute.name})
+    executor.call(target_sdk.delete_user_attribute, target_user_attribute.id)
+    logger.info("Delete complete",
+                extra={"user_attribute": target_user_attribute.name})
+
 
+def write_user_attributes(source_sdk, target_sdk,
+                          pattern=None, allow_delete=None, executor=None,
+                          plan=None):
+    executor = executor or WriteExecutor()
+    plan = plan or Plan()
+
+    # INFO: Get All User Attirbutes From Source Instance
+    user_attributes = get_filtered_user_attributes(source_sdk, pattern)
+    target_user_attributes = get_filtered_user_attributes(target_sdk, pattern)
+    target_user_attribute_index = KeyIndex(target_user_attributes, "name")
+    target_groups = KeyIndex(target_sdk.all_groups(fields="id,name"), "name")
+    group_values = get_all_user_attribute_group_values(source_sdk,
+                                                       user_attributes)
+
+    with executor.batch() as batch:
+        # INFO: Start Loop of Create/Update User Attribute on Target
+        # and Update Group Values if set
+        for user_attribute in user_attributes:
             # INFO: Test if user attribute is already in target
-            matched_user_attribute = match_by_key(
-                user_attributes, target_user_attribute, "name")
+            matched_user_attribute = match_user_attributes(
+                user_attribute, target_user_attribute_index)
 
-            if not matched_user_attribute:
-                logger.debug("No Source User Attribute found. Deleting...")
-                logger.debug("Deleting User Attribute",
-                             extra={"user_attribute":
-                                    target_user_attribute.name})
-                target_sdk.delete_user_attribute(target_user_attribute.id)
-                logger.info("Delete complete",
-                            extra={"user_attribute":
-                                   target_user_attribute.name})
+            batch.run(write_user_attribute, user_attribute,
+                      matched_user_attribute, group_values[user_attribute.id],
+                      target_sdk, target_groups, executor, plan)
+
+        # INFO: Delete missing users attirbutes that are not in source
+        if allow_delete:
+            user_attribute_index = KeyIndex(user_attributes, "name")
+            for target_user_attribute in target_user_attributes:
+
+                # INFO: Test if user attribute is already in target
+                matched_user_attribute = user_attribute_index.match(
+                    target_user_attribute)
+
+                if not matched_user_attribute and plan.delete(
+                        "user_attribute", target_user_attribute.name):
+                    batch.run(delete_user_attribute, target_user_attribute,
+                              target_sdk, executor)
+
+    plan.report()
 
 
 def main(args):
@@ -151,9 +208,12 @@ def main(args):
     if args.debug:
         logger.setLevel(logging.DEBUG)
 
-    source_sdk = get_client(args.ini, args.source)
+    source_sdk = get_source(args.ini, args.source, args.load_source_snapshot)
+
+    def deploy(target_sdk):
+        executor = get_executor(target_sdk, args.concurrency, args.max_requests_per_second)
+        plan = Plan(not args.plan, instance_key(target_sdk))
+        write_user_attributes(source_sdk, target_sdk, args.pattern, args.delete, executor, plan)
 
-    for t in args.target:
-        target_sdk = get_client(args.ini, t)
-        write_user_attributes(source_sdk, target_sdk,
-                              args.pattern, args.delete)
+    deploy_to_targets(args.ini, args.target, deploy, args.parallel_targets)
+    save_source(source_sdk, args.save_source_snapshot)
@@ -0,0 +1,156 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import subprocess
+import threading
+import time
+from collections import Counter, deque, namedtuple
+from looker_deployer.utils import deploy_logging
+
+logger = deploy_logging.get_logger(__name__)
+
+# how much of a command's output is kept for errors and parsing
+OUTPUT_TAIL = 50
+SLOWEST_ITEMS = 10
+
+IMPORT = "import"
+EXPORT = "export"
+
+CommandOutput = namedtuple("CommandOutput", ["returncode", "lines", "bytes"])
+ContentResult = namedtuple(
+    "ContentResult", ["action", "content_type", "content", "status", "target_id", "duration", "bytes", "error"]
+)
+
+
+class GzrError(Exception):
+    """Exception raised if a gzr command exits with an error"""
+
+    def __init__(self, content, returncode, lines, message="gzr exited with an error"):
+        self.content = content
+        self.returncode = returncode
+        self.lines = lines
+        self.message = message
+        super().__init__(self.message)
+
+    def __str__(self):
+        # the command line carries credentials, so only the content and gzr's own output are shown
+        return f"{self.content} -> {self.message} ({self.returncode}): {' | '.join(self.lines[-5:])}"
+
+
+def stream_command(command, outfile=None):
+    """Run `command`, logging its output line by line as it arrives.
+
+    With an `outfile` stdout is copied there as it streams and only stderr is logged.
+    Returns the exit code, the last lines of logged output and the bytes written.
+    """
+    tail = deque(maxlen=OUTPUT_TAIL)
+
+    def drain(stream):
+        for line in stream:
+            line = line.decode(errors="replace").rstrip()
+            if line:
+                logger.debug("gzr", extra={"output": line})
+                tail.append(line)
+
+    if outfile is None:
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        drain(proc.stdout)
+        return CommandOutput(proc.wait(), list(tail), 0)
+
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # stderr is drained alongside stdout, so neither pipe can fill up and stall gzr
+    stderr = threading.Thread(target=drain, args=(proc.stderr,), daemon=True)
+    stderr.start()
+    written = 0
+    for chunk in iter(lambda: proc.stdout.read(65536), b""):
+        outfile.write(chunk)
+        written += len(chunk)
+    returncode = proc.wait()
+    stderr.join()
+    return CommandOutput(returncode, list(tail), written)
+
+
+class ContentResults:
+    """Per item results of a content import or export, with a summary at the end of the run.
+
+    Every tracked item is timed and measured as it finishes, so slow or failing items show
+    up in the logs as they happen and again in the run summary.
+    """
+
+    def __init__(self, action):
+        self.action = action
+        self.results = []
+        self.lock = threading.Lock()
+
+    def track(self, content_type, content, fn, *args):
+        """Run `fn` for one item and record how it went.
+
+        Imports return the target id and move the source file, exports return the file they wrote.
+        """
+        start = time.monotonic()
+        try:
+            returned = fn(*args)
+        except Exception as e:
+            self.add(ContentResult(self.action, content_type, content, "failed", None, time.monotonic() - start, None, str(e)))
+            raise
+        target_id, path = (returned, content) if self.action == IMPORT else (None, returned)
+        self.add(ContentResult(
+            self.action, content_type, content, "ok", target_id, time.monotonic() - start, file_size(path), None
+        ))
+        return returned
+
+    def add(self, result):
+        with self.lock:
+            self.results.append(result)
+        logger.measure(f"content_{self.action}_seconds", result.duration, logger.SECONDS)
+        if result.bytes is not None:
+            logger.measure(f"content_{self.action}_bytes", result.bytes, logger.BYTES)
+        if result.status != "ok":
+            logger.error("Content failed", extra=result._asdict())
+        else:
+            logger.debug("Content done", extra=result._asdict())
+
+    def report(self, slowest=SLOWEST_ITEMS):
+        with self.lock:
+            results = list(self.results)
+        if not results:
+            return None
+        statuses = Counter(i.status for i in results)
+        summary = {
+            "action": self.action,
+            "items": len(results),
+            "ok": statuses.get("ok", 0),
+            "failed": statuses.get("failed", 0),
+            "seconds": round(sum(i.duration for i in results), 3),
+            "bytes": sum(i.bytes or 0 for i in results),
+            "slowest": [
+                {"content": i.content, "content_type": i.content_type, "seconds": round(i.duration, 3), "status": i.status}
+                for i in sorted(results, key=lambda i: i.duration, reverse=True)[:slowest]
+            ],
+            "failures": [
+                {"content": i.content, "content_type": i.content_type, "error": i.error}
+                for i in results if i.status != "ok"
+            ]
+        }
+        (logger.warning if summary["failed"] else logger.info)("Content run summary", extra=summary)
+        return summary
+
+
+def file_size(path):
+    # folder exports and files already cleaned up have no size to report
+    try:
+        return os.path.getsize(path) if path and os.path.isfile(path) else None
+    except OSError:
+        return None
@@ -0,0 +1,81 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from looker_deployer.utils import deploy_logging
+from looker_deployer.utils.export_manifest import file_hash
+
+logger = deploy_logging.get_logger(__name__)
+
+LEDGER_DIR = ".ldeploy_ledger"
+
+
+def ledger_key(content_type, content_json, folder_id):
+    # the file name carries the source id, and import paths can be temporary copies
+    return f"{content_type}:{folder_id}:{os.path.basename(content_json)}"
+
+
+class DeployLedger:
+    """Per environment record of the content files imported into it.
+
+    Each successful import stores the hash of the file, the folder it went to and the id
+    it got on the target, so a later run can skip files that haven't changed since.
+    """
+
+    def __init__(self, path, entries=None, force=False):
+        self.path = Path(path)
+        self.entries = entries or {}
+        self.force = force
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, env, ledger_dir=LEDGER_DIR, force=False):
+        ledger = cls(Path(ledger_dir) / f"{env}.json", force=force)
+        if ledger.path.exists():
+            with open(ledger.path) as f:
+                ledger.entries = json.load(f)
+            logger.info("Loaded deploy ledger", extra={"path": str(ledger.path), "content": len(ledger.entries)})
+        return ledger
+
+    def unchanged(self, content_type, content_json, folder_id):
+        """True if this exact file was already imported into `folder_id`"""
+        if self.force:
+            # everything is imported again, and the ledger refreshed as it goes
+            return False
+        with self.lock:
+            entry = self.entries.get(ledger_key(content_type, content_json, folder_id))
+        return entry is not None and entry["hash"] == file_hash(content_json)
+
+    def record(self, content_type, content_json, folder_id, target_id=None):
+        entry = {
+            "hash": file_hash(content_json),
+            "folder_id": folder_id,
+            "target_id": target_id,
+            "deployed_at": datetime.now(timezone.utc).isoformat()
+        }
+        with self.lock:
+            self.entries[ledger_key(content_type, content_json, folder_id)] = entry
+        return entry
+
+    def save(self):
+        with self.lock:
+            entries = dict(self.entries)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(entries, f, indent=2, sort_keys=True)
+        logger.info("Saved deploy ledger", extra={"path": str(self.path), "content": len(entries)})
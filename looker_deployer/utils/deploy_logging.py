@@ -20,15 +20,16 @@ from pythonjsonlogger import jsonlogger
 class MetricLogger(logging.Logger):
     COUNT = "COUNT"
     BYTES = "BYTES"
+    SECONDS = "SECONDS"
 
-    _valid_units = {COUNT, BYTES}
+    _valid_units = {COUNT, BYTES, SECONDS}
 
     def measure(self, measure, value, unit, level=logging.INFO):
         """
         Expands standard logging to enforce consistent attributes for measurements/instrumentation
         :param measure: the name of the measurement (what will be aggregated and reported on)
         :param value: the value of the measurement (will be force casted to float)
-        :param unit: a valid unit of measure defined in the class (e.g., .COUNT, .BYTES)
+        :param unit: a valid unit of measure defined in the class (e.g., .COUNT, .BYTES, .SECONDS)
         :param level: the logging level to use for output (default logging.INFO)
         :return: None
         """
@@ -0,0 +1,154 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from looker_deployer.utils import deploy_logging
+
+logger = deploy_logging.get_logger(__name__)
+
+# how many lookups a command fans out at once against one instance
+READ_CONCURRENCY = 8
+
+
+class TokenBucket:
+    """Blocking token bucket allowing `rate` calls per second with bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        assert rate > 0, "Rate must be positive"
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class WriteExecutor:
+    """Runs the create/update/delete calls of the write_* functions against one instance.
+
+    With a concurrency of 1 every call runs inline, in order, exactly as before. Every call
+    made through the executor draws from the instance's token bucket when a rate is set.
+    """
+
+    def __init__(self, concurrency=1, limiter=None):
+        assert concurrency >= 1, "Concurrency must be at least 1"
+        self.concurrency = concurrency
+        self.limiter = limiter
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="write") if concurrency > 1 else None
+
+    def call(self, fn, *args, **kwargs):
+        if self.limiter:
+            self.limiter.acquire()
+        return fn(*args, **kwargs)
+
+    def batch(self):
+        return WriteBatch(self)
+
+
+class WriteBatch:
+    """A group of writes that must all have finished (or failed) when the block exits"""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.futures = []
+
+    def run(self, fn, *args, **kwargs):
+        """Queue a task. API calls inside it should go through `executor.call`"""
+        if self.executor.pool is None:
+            future = Future()
+            future.set_result(fn(*args, **kwargs))
+        else:
+            future = self.executor.pool.submit(fn, *args, **kwargs)
+        self.futures.append(future)
+        return future
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue a single rate limited API call"""
+        return self.run(self.executor.call, fn, *args, **kwargs)
+
+    def join(self):
+        errors = [f.exception() for f in self.futures if f.exception() is not None]
+        if errors:
+            logger.error("Writes failed", extra={"failures": len(errors), "writes": len(self.futures)})
+            raise errors[0]
+        return [f.result() for f in self.futures]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.join()
+        else:
+            # let queued writes settle before the original error propagates
+            for future in self.futures:
+                future.exception()
+
+
+_limiters = {}
+_executors = {}
+_registry_lock = threading.Lock()
+
+
+def instance_key(sdk):
+    try:
+        return sdk.auth.settings.base_url
+    except AttributeError:
+        return id(sdk)
+
+
+def get_executor(sdk, concurrency=1, max_requests_per_second=None):
+    """Executor for the instance behind `sdk`. The rate limit is shared per instance"""
+    key = instance_key(sdk)
+    with _registry_lock:
+        limiter = None
+        if max_requests_per_second:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limiter = _limiters[key] = TokenBucket(max_requests_per_second)
+        executor = _executors.get((key, concurrency, max_requests_per_second))
+        if executor is None:
+            executor = _executors[(key, concurrency, max_requests_per_second)] = WriteExecutor(concurrency, limiter)
+    return executor
+
+
+def rate_limited(sdk, fn):
+    """`fn`, drawing from the token bucket of the instance behind `sdk` when it has a rate limit"""
+    with _registry_lock:
+        limiter = _limiters.get(instance_key(sdk))
+    if limiter is None:
+        return fn
+
+    def call(*args, **kwargs):
+        limiter.acquire()
+        return fn(*args, **kwargs)
+    return call
+
+
+def read_pool(workers=READ_CONCURRENCY):
+    """Thread pool for fanning out lookups. Use it as a context manager so its threads are shut down"""
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="read")
@@ -0,0 +1,128 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from looker_deployer.utils import deploy_logging
+
+logger = deploy_logging.get_logger(__name__)
+
+MANIFEST_NAME = ".ldeploy_export_manifest.json"
+
+# gzr and the native engine name files Dashboard_<id>_<title>.json in folder exports
+# and dashboard_<id>.json when exporting a single piece of content
+CONTENT_FILE = re.compile(r"^(Dashboard|Look|dashboard|look)_(\d+)(_.*)?\.json$")
+
+
+def content_key(content_type, content_id):
+    return f"{content_type}:{content_id}"
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_content_files(root):
+    """Every exported content file under `root`, as {content_key: path}"""
+    found = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            match = CONTENT_FILE.match(filename)
+            if match:
+                found[content_key(match.group(1).lower(), match.group(2))] = os.path.join(dirpath, filename)
+    return found
+
+
+class ExportManifest:
+    """Record of the content files in an export directory and the version each one holds.
+
+    Entries are keyed by content type and id, with the content's `updated_at`, the file it
+    was written to and a hash of that file. Content removed from the instance is kept as a
+    tombstone so later runs know it was deleted rather than never exported.
+    """
+
+    def __init__(self, local_target, entries=None, exported_at=None):
+        self.local_target = local_target
+        self.entries = entries or {}
+        self.exported_at = exported_at
+        self.lock = threading.Lock()
+
+    @property
+    def path(self):
+        return Path(self.local_target) / MANIFEST_NAME
+
+    @classmethod
+    def load(cls, local_target):
+        manifest = cls(local_target)
+        if not manifest.path.exists():
+            return None
+        with open(manifest.path) as f:
+            data = json.load(f)
+        manifest.entries = data["content"]
+        manifest.exported_at = data["exported_at"]
+        logger.info("Loaded export manifest", extra={"path": str(manifest.path), "content": len(manifest.entries)})
+        return manifest
+
+    def is_current(self, content_type, content_id, updated_at, path):
+        """True if `path` already holds this version of the content, untouched since it was exported"""
+        entry = self.entries.get(content_key(content_type, content_id))
+        if not entry or entry.get("deleted") or entry["updated_at"] != updated_at or entry["path"] != str(path):
+            return False
+        return os.path.exists(path) and file_hash(path) == entry["hash"]
+
+    def record(self, content_type, content_id, path, updated_at=None, folder_id=None):
+        entry = {
+            "type": content_type,
+            "id": str(content_id),
+            "folder_id": folder_id,
+            "updated_at": updated_at,
+            "path": str(path),
+            "hash": file_hash(path)
+        }
+        with self.lock:
+            self.entries[content_key(content_type, content_id)] = entry
+        return entry
+
+    def tombstone(self, key):
+        with self.lock:
+            entry = self.entries[key]
+            if entry.get("deleted"):
+                return
+            entry["deleted"] = True
+            entry["deleted_at"] = datetime.now(timezone.utc).isoformat()
+        if os.path.exists(entry["path"]):
+            os.remove(entry["path"])
+        logger.info("Content removed from export", extra={"content": key, "path": entry["path"]})
+
+    def live(self):
+        with self.lock:
+            return {k: v for k, v in self.entries.items() if not v.get("deleted")}
+
+    def save(self):
+        self.exported_at = datetime.now(timezone.utc).isoformat()
+        with self.lock:
+            data = {"exported_at": self.exported_at, "content": self.entries}
+        Path(self.local_target).mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        logger.info("Saved export manifest", extra={"path": str(self.path), "content": len(data["content"])})
@@ -12,15 +12,112 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import configparser
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from looker_deployer import version
-from looker_sdk import api_settings, methods40 as methods, requests_transport, auth_session, serialize, _settings
+from looker_deployer.utils import deploy_logging
+from looker_deployer.utils import parse_ini
+from looker_sdk import api_settings, methods40 as methods, requests_transport, auth_session, serialize
+from looker_sdk.sdk import constants
 from typing import Optional
 
+logger = deploy_logging.get_logger(__name__)
+
+# enough kept-alive connections for the write workers, content workers and parallel targets of a run
+POOL_SIZE = 32
+# retries of connections that could not be opened, requests that reached the server are never repeated
+RETRIES = 3
+
+
+class IniSettings(api_settings.ApiSettings):
+    """ApiSettings that read the ini file through the process-wide cache in parse_ini.
+
+    The SDK reads its settings again on every login, so this keeps those reads off disk too.
+    """
+
+    def read_config(self) -> api_settings.SettingsConfig:
+        data = {"client_id": "", "client_secret": ""}
+        config = parse_ini.read_ini(self.filename)
+        # a missing file parses to no sections, and the environment has to supply everything
+        if config.sections():
+            # If section is not specified, use first section in file
+            section = self.section or config.sections()[0]
+            if not config.has_section(section):
+                raise configparser.NoSectionError(section)
+            self._override_settings(data, dict(config[section]))
+
+        if self.env_prefix:
+            self._override_settings(data, self._override_from_env())
+        return self._clean_input(data)
+
+
+def _settings(config_file: str, section: Optional[str] = None) -> api_settings.ApiSettings:
+    return IniSettings(
+        filename=config_file,
+        section=section,
+        sdk_version=constants.sdk_version,
+        env_prefix=constants.environment_prefix,
+    )
+
+
+class SharedAuthSession(auth_session.AuthSession):
+    """AuthSession that logs in once for every thread sharing the client.
+
+    The access token is kept until it expires, and threads that find it expired wait for a
+    single login instead of each logging in.
+    """
+
+    def __init__(self, *args, token_cache=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.login_lock = threading.Lock()
+        self.token_cache = token_cache
+
+    def _get_token(self, transport_options):
+        if not self.is_authenticated:
+            with self.login_lock:
+                if not self.is_authenticated:
+                    self._cached_login(transport_options)
+        return self.token
+
+    def _cached_login(self, transport_options):
+        if self.token_cache is None:
+            return self._login(transport_options)
+
+        config = self.settings.read_config()
+        credentials = (self.settings.base_url, config.get("client_id"), config.get("client_secret"))
+        if all(credentials):
+            cached = self.token_cache.load(*credentials)
+            if cached is not None:
+                self.token = cached
+                return
+        self._login(transport_options)
+        if all(credentials):
+            self.token_cache.save(*credentials, self.token)
+
+
+def pooled_session(pool_size=POOL_SIZE, retries=RETRIES):
+    """requests.Session that keeps up to `pool_size` connections per host alive for reuse"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=None, connect=retries, read=False, redirect=False, status=False)
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 
 def configure_sdk(
     config_file: str = "looker.ini",
     section: Optional[str] = None,
     config_settings: Optional[api_settings.ApiSettings] = None,
+    pool_size: int = POOL_SIZE,
+    token_cache=None,
 ) -> methods.Looker40SDK:
     """Default dependency configuration"""
     settings = (
@@ -28,9 +125,9 @@ def configure_sdk(
     )
     settings.is_configured()
     settings.headers['User-Agent'] = f"Looker Deployer {version.__version__}"
-    transport = requests_transport.RequestsTransport.configure(settings)
+    transport = requests_transport.RequestsTransport(settings, pooled_session(pool_size))
     return methods.Looker40SDK(
-        auth_session.AuthSession(settings, transport, serialize.deserialize40, "4.0"),
+        SharedAuthSession(settings, transport, serialize.deserialize40, "4.0", token_cache=token_cache),
         serialize.deserialize40,
         serialize.serialize40,
         transport,
@@ -38,6 +135,35 @@ def configure_sdk(
     )
 
 
+class ClientRegistry:
+    """One SDK client per ini file and section, for the whole process.
+
+    Every command, target and worker that asks for the same instance gets the same client,
+    so they share its pooled connections and its access token.
+    With a `token_cache` clients also reuse tokens saved by earlier runs.
+    """
+
+    def __init__(self, token_cache=None):
+        self.clients = {}
+        self.token_cache = token_cache
+        self.lock = threading.Lock()
+
+    def get(self, ini, env):
+        key = (os.path.abspath(ini), env)
+        with self.lock:
+            sdk = self.clients.get(key)
+            if sdk is None:
+                logger.debug("Configuring client", extra={"ini": ini, "env": env})
+                sdk = self.clients[key] = configure_sdk(config_file=ini, section=env, token_cache=self.token_cache)
+        return sdk
+
+    def clear(self):
+        with self.lock:
+            self.clients.clear()
+
+
+registry = ClientRegistry()
+
+
 def get_client(ini, env):
-    sdk = configure_sdk(config_file=ini, section=env)
-    return sdk
+    return registry.get(ini, env)
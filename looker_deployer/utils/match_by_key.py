@@ -1,3 +1,8 @@
+from looker_deployer.utils import deploy_logging
+
+logger = deploy_logging.get_logger(__name__)
+
+
 def match_by_key(tuple_to_search, dictionary_to_match, key_to_match_on):
     matched = None
 
@@ -7,3 +12,41 @@ def match_by_key(tuple_to_search, dictionary_to_match, key_to_match_on):
             break
 
     return matched
+
+
+class KeyIndex:
+    """Hashed lookup of a collection by one attribute, built once and matched many times.
+
+    Like match_by_key, the first item wins when several share a key. Duplicates are
+    kept in `duplicates` and logged so they can be cleaned up on the instance.
+    """
+
+    def __init__(self, items, key_to_match_on="name"):
+        self.key_to_match_on = key_to_match_on
+        self.items = {}
+        self.duplicates = set()
+
+        for item in items:
+            key = getattr(item, key_to_match_on)
+            if key in self.items:
+                self.duplicates.add(key)
+            else:
+                self.items[key] = item
+
+        if self.duplicates:
+            logger.warning(
+                "Duplicate keys found. Matching on the first of each",
+                extra={"key": key_to_match_on, "duplicates": sorted(str(i) for i in self.duplicates)}
+            )
+
+    def get(self, key):
+        return self.items.get(key)
+
+    def match(self, dictionary_to_match):
+        return self.items.get(getattr(dictionary_to_match, self.key_to_match_on))
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
@@ -0,0 +1,249 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-process content engine that reads and writes the gzr JSON format.
+
+Everything goes through the Looker40SDK client, so a whole deploy shares one
+authenticated session instead of paying a gzr process and login per file.
+"""
+
+import json
+import os
+from pathlib import Path
+from looker_sdk import models40 as models, serialize
+from looker_deployer.utils import deploy_logging
+
+logger = deploy_logging.get_logger(__name__)
+
+# fields that only make sense on the instance the content was exported from
+QUERY_EXCLUDE = {"client_id"}
+LOOK_EXCLUDE = {"query", "query_id", "folder", "folder_id", "user_id"}
+DASHBOARD_EXCLUDE = {"folder", "folder_id", "user_id", "lookml_link_id", "deleted", "certification_metadata"}
+ELEMENT_EXCLUDE = {"dashboard_id", "dashboard_layout_id", "look", "look_id", "query", "query_id", "merge_result_id", "result_maker_id"}
+FILTER_EXCLUDE = {"dashboard_id"}
+
+
+def to_write_model(data, structure, exclude=(), **overrides):
+    body = {k: v for k, v in data.items() if k not in exclude and v is not None}
+    body.update(overrides)
+    return serialize.deserialize40(data=json.dumps(body), structure=structure)
+
+
+def to_json(api_model):
+    return json.loads(serialize.serialize40(api_model=api_model))
+
+
+def safe_name(name):
+    # gzr swaps slashes for division slashes (Unicode character 2215) in file and folder names
+    return name.replace("/", "\u2215")
+
+
+def create_query(query_json, sdk):
+    query = sdk.create_query(to_write_model(query_json, models.WriteQuery, QUERY_EXCLUDE))
+    return query.id
+
+
+def import_look(look_json, folder_id, sdk):
+    query_id = create_query(look_json["query"], sdk)
+    new_look = to_write_model(look_json, models.WriteLookWithQuery, LOOK_EXCLUDE)
+    new_look.query_id = query_id
+    new_look.folder_id = folder_id
+
+    existing = sdk.search_looks(title=look_json["title"], folder_id=folder_id, fields="id")
+    if existing:
+        logger.debug("Existing look found. Updating...", extra={"look_id": existing[0].id})
+        return sdk.update_look(existing[0].id, new_look).id
+
+    logger.debug("No existing look found. Creating...", extra={"title": look_json["title"]})
+    return sdk.create_look(new_look).id
+
+
+def create_merge_result(merge_json, sdk):
+    source_queries = []
+    for source_query in merge_json.get("source_queries") or []:
+        if not source_query.get("query"):
+            return None
+        source_queries.append(
+            models.MergeQuerySourceQuery(
+                merge_fields=[models.MergeFields(**i) for i in source_query.get("merge_fields") or []],
+                name=source_query.get("name"),
+                query_id=create_query(source_query["query"], sdk)
+            )
+        )
+    new_merge = to_write_model(merge_json, models.WriteMergeQuery, {"source_queries"})
+    new_merge.source_queries = source_queries
+    return sdk.create_merge_query(body=new_merge).id
+
+
+def create_dashboard_element(element_json, dashboard_id, folder_id, sdk):
+    new_element = to_write_model(element_json, models.WriteDashboardElement, ELEMENT_EXCLUDE, dashboard_id=dashboard_id)
+
+    look_json = element_json.get("look")
+    if look_json:
+        # look tiles point at the look of the same title deployed alongside the dashboard
+        matched = sdk.search_looks(title=look_json["title"], folder_id=folder_id, fields="id")
+        if matched:
+            new_element.look_id = matched[0].id
+        else:
+            logger.warning("Linked look not found in target folder. Importing tile as a query", extra={"look": look_json["title"]})
+            new_element.query_id = create_query(look_json["query"], sdk)
+    elif element_json.get("query"):
+        new_element.query_id = create_query(element_json["query"], sdk)
+    elif element_json.get("merge_result"):
+        new_element.merge_result_id = create_merge_result(element_json["merge_result"], sdk)
+        if new_element.merge_result_id is None:
+            logger.warning("Merge result has no exported source queries. Skipping tile", extra={"title": element_json.get("title")})
+            return None
+
+    if new_element.result_maker:
+        new_element.result_maker.query = None
+        new_element.result_maker.merge_result_id = new_element.merge_result_id
+
+    return sdk.create_dashboard_element(new_element).id
+
+
+def layout_dashboard(dash_json, dashboard_id, element_ids, sdk):
+    source_layout = next((i for i in dash_json.get("dashboard_layouts") or [] if i.get("active")), None)
+    if not source_layout:
+        return
+    source_components = {
+        element_ids[i["dashboard_element_id"]]: i
+        for i in source_layout.get("dashboard_layout_components") or []
+        if i.get("dashboard_element_id") in element_ids
+    }
+    target_layout = next((i for i in sdk.dashboard_dashboard_layouts(dashboard_id) if i.active), None)
+    if not target_layout:
+        return
+
+    if source_layout.get("type"):
+        sdk.update_dashboard_layout(
+            target_layout.id,
+            models.WriteDashboardLayout(type=source_layout["type"], column_width=source_layout.get("column_width"))
+        )
+
+    for component in sdk.dashboard_layout_dashboard_layout_components(target_layout.id):
+        source_component = source_components.get(component.dashboard_element_id)
+        if source_component:
+            sdk.update_dashboard_layout_component(
+                component.id,
+                to_write_model(source_component, models.WriteDashboardLayoutComponent, {"dashboard_layout_id", "dashboard_element_id"})
+            )
+
+
+def import_dashboard(dash_json, folder_id, sdk):
+    new_dash = to_write_model(dash_json, models.WriteDashboard, DASHBOARD_EXCLUDE)
+    new_dash.folder_id = folder_id
+
+    existing = sdk.search_dashboards(title=dash_json["title"], folder_id=folder_id, fields="id")
+    if existing:
+        dashboard_id = existing[0].id
+        logger.debug("Existing dashboard found. Replacing content...", extra={"dashboard_id": dashboard_id})
+        # the slug already belongs to this dashboard (or to another one), so leave it alone
+        new_dash.slug = None
+        sdk.update_dashboard(dashboard_id, new_dash)
+        for element in sdk.dashboard_dashboard_elements(dashboard_id, fields="id"):
+            sdk.delete_dashboard_element(element.id)
+        for dash_filter in sdk.dashboard_dashboard_filters(dashboard_id, fields="id"):
+            sdk.delete_dashboard_filter(dash_filter.id)
+    else:
+        logger.debug("No existing dashboard found. Creating...", extra={"title": dash_json["title"]})
+        if new_dash.slug and sdk.search_dashboards(slug=new_dash.slug, fields="id"):
+            # like gzr, a slug already taken by a dashboard elsewhere is dropped and the instance picks a new one
+            logger.warning("Dashboard slug already in use. Importing with a new slug", extra={"slug": new_dash.slug})
+            new_dash.slug = None
+        dashboard_id = sdk.create_dashboard(new_dash).id
+
+    for dash_filter in dash_json.get("dashboard_filters") or []:
+        sdk.create_dashboard_filter(
+            to_write_model(dash_filter, models.WriteCreateDashboardFilter, FILTER_EXCLUDE, dashboard_id=dashboard_id)
+        )
+
+    element_ids = {}
+    for element in dash_json.get("dashboard_elements") or []:
+        new_id = create_dashboard_element(element, dashboard_id, folder_id, sdk)
+        if new_id:
+            element_ids[element.get("id")] = new_id
+
+    layout_dashboard(dash_json, dashboard_id, element_ids, sdk)
+    return dashboard_id
+
+
+def import_content(content_type, content_json, space_id, sdk):
+    assert content_type in ["dashboard", "look"], "Unsupported Content Type"
+    with open(content_json) as f:
+        data = json.load(f)
+
+    logger.info(
+        "Deploying content",
+        extra={"content_type": content_type, "source_file": content_json, "folder_id": space_id, "engine": "native"}
+    )
+
+    if content_type == "look":
+        target_id = import_look(data, space_id, sdk)
+    else:
+        target_id = import_dashboard(data, space_id, sdk)
+
+    logger.info("Deployment complete", extra={"content_type": content_type, "source_file": content_json, "id": target_id})
+    return target_id
+
+
+def cat_content(content_type, content_id, sdk):
+    if content_type == "look":
+        return to_json(sdk.look(str(content_id)))
+
+    data = to_json(sdk.dashboard(str(content_id)))
+    for element in data.get("dashboard_elements") or []:
+        if element.get("merge_result_id"):
+            element["merge_result"] = cat_merge_result(element["merge_result_id"], sdk)
+    return data
+
+
+def cat_merge_result(merge_result_id, sdk):
+    # elements only carry the merge result id, and merge results only source query ids,
+    # so bring both along like gzr does
+    merge_result = to_json(sdk.merge_query(str(merge_result_id)))
+    for source_query in merge_result.get("source_queries") or []:
+        source_query["query"] = to_json(sdk.query(source_query["query_id"]))
+    return merge_result
+
+
+def write_json(data, filename):
+    with open(filename, "w") as outfile:
+        json.dump(data, outfile, indent=2)
+
+
+def export_content(content_type, content_id, path, sdk, filename=None):
+    filename = Path(path) / (filename or f"{content_type}_{content_id}.json")
+    write_json(cat_content(content_type, content_id, sdk), filename)
+    return str(filename)
+
+
+def export_space(folder_id, path, sdk):
+    folder = sdk.folder(str(folder_id))
+    folder_path = Path(path) / safe_name(folder.name)
+    folder_path.mkdir(parents=True, exist_ok=True)
+    logger.info("Exporting folder", extra={"folder_id": folder_id, "path": str(folder_path)})
+
+    for look in sdk.folder_looks(str(folder_id), fields="id,title"):
+        filename = folder_path / f"Look_{look.id}_{safe_name(look.title)}.json"
+        write_json(cat_content("look", look.id, sdk), filename)
+
+    for dash in sdk.folder_dashboards(str(folder_id), fields="id,title"):
+        filename = folder_path / f"Dashboard_{dash.id}_{safe_name(dash.title)}.json"
+        write_json(cat_content("dashboard", dash.id, sdk), filename)
+
+    for child in sdk.folder_children(str(folder_id), fields="id"):
+        export_space(child.id, str(folder_path), sdk)
+
+    return str(folder_path) + os.sep
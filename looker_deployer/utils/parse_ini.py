@@ -13,10 +13,40 @@
 # limitations under the License.
 
 import configparser
+import os
+import threading
+
+# parsed ini files by absolute path, with the modification time they were parsed at
+_cache = {}
+_lock = threading.Lock()
+
+
+def modified_at(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
 
 
 def read_ini(ini="../looker.ini"):
-    config = configparser.ConfigParser()
-    config.read(ini)
+    """Parsed ini file, shared by every caller in the process until the file changes on disk.
+
+    The parser is shared, so callers must treat it as read only.
+    """
+    path = os.path.abspath(ini)
+    mtime = modified_at(path)
+    with _lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        config = configparser.ConfigParser()
+        config.read(ini)
+        _cache[path] = (mtime, config)
 
     return config
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,111 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import threading
+from collections import Counter
+from looker_sdk import serialize
+from looker_deployer.utils import deploy_logging
+
+logger = deploy_logging.get_logger(__name__)
+
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+UNCHANGED = "unchanged"
+
+
+def to_comparable(api_model):
+    return json.loads(serialize.serialize40(api_model=api_model))
+
+
+def normalize(value):
+    # the API doesn't promise an order for lists like permissions or models
+    if isinstance(value, list):
+        return sorted((normalize(i) for i in value), key=lambda i: json.dumps(i, sort_keys=True))
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items()}
+    return value
+
+
+def diff(write_model, target, exclude=()):
+    """Fields of `write_model` that differ on `target`, as {field: {"from": old, "to": new}}.
+
+    Only fields set on the write model are compared. Unset fields are left alone by
+    the API, so they never count as a change.
+    """
+    wanted = to_comparable(write_model)
+    current = to_comparable(target)
+    changes = {}
+    for field, value in wanted.items():
+        if field in exclude:
+            continue
+        if normalize(value) != normalize(current.get(field)):
+            changes[field] = {"from": current.get(field), "to": value}
+    return changes
+
+
+class Plan:
+    """Records what a sync will create, update or delete on one target.
+
+    Each recording method returns True when the write should go ahead, so a plan built
+    with `apply=False` computes the full change set without touching the target.
+    """
+
+    def __init__(self, apply=True, target=None):
+        self.apply = apply
+        self.target = target
+        self.actions = []
+        self.lock = threading.Lock()
+
+    def record(self, action, kind, name, changes=None):
+        with self.lock:
+            self.actions.append((action, kind, name))
+        # applied changes are logged by the write itself
+        level = logger.info if not self.apply and action != UNCHANGED else logger.debug
+        level(
+            "Planned change",
+            extra={"action": action, "kind": kind, "object": name, "changes": changes, "target": self.target}
+        )
+        return self.apply and action != UNCHANGED
+
+    def create(self, kind, name):
+        return self.record(CREATE, kind, name)
+
+    def update(self, kind, name, changes=None):
+        return self.record(UPDATE, kind, name, changes)
+
+    def delete(self, kind, name):
+        return self.record(DELETE, kind, name)
+
+    def unchanged(self, kind, name):
+        return self.record(UNCHANGED, kind, name)
+
+    def update_if_changed(self, kind, name, changes):
+        if changes:
+            return self.update(kind, name, changes)
+        return self.unchanged(kind, name)
+
+    def summary(self):
+        with self.lock:
+            counts = Counter(action for action, kind, name in self.actions)
+        return {action: counts.get(action, 0) for action in (CREATE, UPDATE, DELETE, UNCHANGED)}
+
+    def report(self):
+        summary = self.summary()
+        logger.info(
+            "Plan summary" if not self.apply else "Sync summary",
+            extra=dict(summary, target=self.target, applied=self.apply)
+        )
+        return summary
@@ -0,0 +1,130 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import json
+import threading
+import typing
+from concurrent.futures import Future
+from looker_sdk import methods40 as methods, serialize
+from looker_deployer.utils import deploy_logging
+from looker_deployer.utils.get_client import get_client
+
+logger = deploy_logging.get_logger(__name__)
+
+# calls with these prefixes change the instance and are never recorded
+WRITE_PREFIXES = ("create_", "update_", "delete_", "set_", "add_", "remove_", "import_", "deploy_", "reset_", "sync_", "login", "logout")
+
+
+class SourceSnapshotMiss(Exception):
+    """Exception raised if an offline snapshot has no recording of a call"""
+
+    def __init__(self, method, message="Source snapshot has no recording of this call."):
+        self.method = method
+        self.message = message
+        super().__init__(self.message)
+
+    def __str__(self):
+        return f"{self.method} -> {self.message}"
+
+
+class SourceSnapshot:
+    """Stands in for the source SDK and reads each object from the source only once.
+
+    Read calls are recorded by method and arguments, so every target sync of a run shares
+    the first answer. Callers get their own copy of the result and are free to mutate it.
+    A snapshot can be saved to disk and loaded later without a connection to the source.
+    """
+
+    def __init__(self, sdk=None):
+        self.sdk = sdk
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name.startswith(WRITE_PREFIXES):
+            if self.sdk is None:
+                raise AttributeError(name)
+            return getattr(self.sdk, name)
+
+        def read(*args, **kwargs):
+            return copy.deepcopy(self.read(name, args, kwargs))
+        return read
+
+    def read(self, name, args, kwargs):
+        key = (name, json.dumps([args, kwargs], sort_keys=True, default=str))
+        with self.lock:
+            future = self.calls.get(key)
+            owner = future is None
+            if owner:
+                if self.sdk is None:
+                    raise SourceSnapshotMiss(f"{name}{key[1]}")
+                future = self.calls[key] = Future()
+
+        if owner:
+            logger.debug("Reading source", extra={"method": name, "arguments": key[1]})
+            try:
+                future.set_result(getattr(self.sdk, name)(*args, **kwargs))
+            except Exception as e:
+                # don't record failures, the next caller should see the error for itself
+                with self.lock:
+                    del self.calls[key]
+                future.set_exception(e)
+        return future.result()
+
+    def save(self, path):
+        recorded = []
+        with self.lock:
+            calls = [(key, future) for key, future in self.calls.items() if future.done() and not future.exception()]
+        for (name, arguments), future in calls:
+            args, kwargs = json.loads(arguments)
+            result = future.result()
+            recorded.append({
+                "method": name,
+                "args": args,
+                "kwargs": kwargs,
+                "result": None if result is None else json.loads(serialize.serialize40(api_model=result))
+            })
+        with open(path, "w") as f:
+            json.dump(recorded, f, indent=2)
+        logger.info("Saved source snapshot", extra={"path": path, "calls": len(recorded)})
+
+    @classmethod
+    def load(cls, path, sdk=None):
+        snapshot = cls(sdk)
+        with open(path) as f:
+            recorded = json.load(f)
+        for call in recorded:
+            structure = typing.get_type_hints(getattr(methods.Looker40SDK, call["method"]))["return"]
+            result = call["result"]
+            if result is not None:
+                result = serialize.deserialize40(data=json.dumps(result), structure=structure)
+            future = Future()
+            future.set_result(result)
+            key = (call["method"], json.dumps([call["args"], call["kwargs"]], sort_keys=True, default=str))
+            snapshot.calls[key] = future
+        logger.info("Loaded source snapshot", extra={"path": path, "calls": len(recorded)})
+        return snapshot
+
+
+def get_source(ini, source, snapshot_path=None):
+    """Source SDK for a run. With `snapshot_path` the source is read from disk instead of the instance"""
+    if snapshot_path:
+        return SourceSnapshot.load(snapshot_path)
+    return SourceSnapshot(get_client(ini, source))
+
+
+def save_source(source_sdk, snapshot_path=None):
+    if snapshot_path:
+        source_sdk.save(snapshot_path)
@@ -0,0 +1,74 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from looker_deployer.utils import deploy_logging
+from looker_deployer.utils.get_client import get_client
+
+logger = deploy_logging.get_logger(__name__)
+
+TargetResult = namedtuple("TargetResult", ["target", "ok", "seconds", "error"])
+
+
+class TargetDeploymentError(Exception):
+    """Exception raised if one or more targets failed to deploy"""
+
+    def __init__(self, failed_targets, message="Deployment failed for one or more targets."):
+        self.failed_targets = failed_targets
+        self.message = message
+        super().__init__(self.message)
+
+    def __str__(self):
+        return f"{self.message} -> {', '.join(self.failed_targets)}"
+
+
+def deploy_target(ini, target, deploy):
+    start = time.perf_counter()
+    try:
+        target_sdk = get_client(ini, target)
+        deploy(target_sdk)
+    except Exception as e:
+        logger.exception("Target deployment failed", extra={"target": target})
+        return TargetResult(target, False, time.perf_counter() - start, e)
+    return TargetResult(target, True, time.perf_counter() - start, None)
+
+
+def deploy_to_targets(ini, targets, deploy, parallel_targets=1):
+    """Call `deploy(target_sdk)` for every target, up to `parallel_targets` at a time.
+
+    A failing target does not stop the others. Every target gets a summary line and
+    TargetDeploymentError is raised at the end if any of them failed.
+    """
+    workers = max(1, min(parallel_targets, len(targets)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="target") as pool:
+        results = list(pool.map(deploy_target, repeat(ini), targets, repeat(deploy)))
+
+    for result in results:
+        logger.info(
+            "Target summary",
+            extra={
+                "target": result.target,
+                "status": "ok" if result.ok else "failed",
+                "seconds": round(result.seconds, 2),
+                "error": repr(result.error) if result.error else None
+            }
+        )
+
+    failed = [result.target for result in results if not result.ok]
+    if failed:
+        raise TargetDeploymentError(failed)
+    return results
@@ -0,0 +1,98 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from looker_sdk.rtl import auth_token
+from looker_deployer.utils import deploy_logging
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+
+logger = deploy_logging.get_logger(__name__)
+
+TOKEN_CACHE_ENV = "LDEPLOY_TOKEN_CACHE"
+# cached tokens this close to expiry are left alone, a run would outlive them
+EXPIRY_MARGIN = 300
+
+
+def cache_key(base_url, client_id):
+    return hashlib.sha256(f"{base_url}\n{client_id}".encode()).hexdigest()
+
+
+def cipher(client_secret):
+    # only someone holding the client secret, who could log in anyway, can read the token
+    key = hashlib.pbkdf2_hmac("sha256", client_secret.encode(), b"looker-deployer-token-cache", 100000)
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+class TokenCache:
+    """Access tokens kept on disk between runs, encrypted with a key derived from the client secret.
+
+    Entries are keyed by instance url and client id and are only handed out while they
+    have more than EXPIRY_MARGIN seconds left.
+    """
+
+    def __init__(self, directory):
+        assert Fernet is not None, "The token cache needs the cryptography package: pip install looker-deployer[token-cache]"
+        self.directory = Path(directory)
+
+    def path(self, base_url, client_id):
+        return self.directory / f"{cache_key(base_url, client_id)}.token"
+
+    def load(self, base_url, client_id, client_secret):
+        path = self.path(base_url, client_id)
+        try:
+            with open(path, "rb") as f:
+                cached = json.loads(cipher(client_secret).decrypt(f.read()))
+        except FileNotFoundError:
+            return None
+        except (InvalidToken, ValueError):
+            # written with another secret or damaged, the next login replaces it
+            logger.warning("Ignoring unreadable cached token", extra={"base_url": base_url})
+            return None
+
+        remaining = int(cached["expires_at"] - time.time())
+        if remaining <= EXPIRY_MARGIN:
+            logger.debug("Cached token expired", extra={"base_url": base_url})
+            return None
+        logger.debug("Using cached token", extra={"base_url": base_url, "expires_in": remaining})
+        return auth_token.AuthToken(auth_token.AccessToken(
+            access_token=cached["access_token"],
+            token_type=cached["token_type"],
+            expires_in=remaining
+        ))
+
+    def save(self, base_url, client_id, client_secret, token):
+        cached = {
+            "access_token": token.access_token,
+            "token_type": token.token_type,
+            "expires_at": time.time() + token.expires_in
+        }
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        path = self.path(base_url, client_id)
+        # written to a private temporary file first, so readers never see half a token
+        temporary = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(cipher(client_secret).encrypt(json.dumps(cached).encode()))
+        os.replace(temporary, path)
+        logger.debug("Cached token", extra={"base_url": base_url})
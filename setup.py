@@ -18,12 +18,14 @@ from looker_deployer import version as pkg
 NAME = "looker_deployer"
 VERSION = pkg.__version__
 REQUIRES = ["looker-sdk>=21.18.0", "oyaml", "python-json-logger"]
+EXTRAS = {"token-cache": ["cryptography"]}
 
 setup(
     author="Looker Open Source",
     author_email="looker-open-source@google.com",
     description="A Looker Deployment Tool",
     install_requires=REQUIRES,
+    extras_require=EXTRAS,
     long_description=open("README.md", encoding="utf-8").read(),
     long_description_content_type="text/markdown",
     keywords=["Looker Deployer"],
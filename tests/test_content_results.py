@@ -0,0 +1,40 @@
+import io
+import sys
+import pytest
+from looker_deployer.utils import content_results
+
+
+def test_stream_command_lines():
+    output = content_results.stream_command([sys.executable, "-c", "print('one'); print('two')"])
+    assert output == content_results.CommandOutput(0, ["one", "two"], 0)
+
+
+def test_stream_command_outfile():
+    outfile = io.BytesIO()
+    script = "import sys; sys.stdout.write('x' * 100000); sys.stderr.write('warning\\n'); sys.exit(3)"
+
+    output = content_results.stream_command([sys.executable, "-c", script], outfile)
+
+    assert output == content_results.CommandOutput(3, ["warning"], 100000)
+    assert outfile.getvalue() == b"x" * 100000
+
+
+def test_gzr_error_hides_command():
+    error = content_results.GzrError("dashboard 1", 1, ["Error: not found"])
+    assert str(error) == "dashboard 1 -> gzr exited with an error (1): Error: not found"
+
+
+def test_content_results_report(tmp_path):
+    content = tmp_path / "Look_1.json"
+    content.write_text("{}")
+    results = content_results.ContentResults(content_results.IMPORT)
+
+    assert results.track("look", str(content), lambda: "42") == "42"
+    with pytest.raises(ValueError):
+        results.track("dashboard", "Dashboard_2.json", lambda: (_ for _ in ()).throw(ValueError("boom")))
+
+    summary = results.report()
+    assert (summary["items"], summary["ok"], summary["failed"], summary["bytes"]) == (2, 1, 1, 2)
+    assert summary["failures"] == [{"content": "Dashboard_2.json", "content_type": "dashboard", "error": "boom"}]
+    assert len(summary["slowest"]) == 2
+    assert results.results[0].target_id == "42"
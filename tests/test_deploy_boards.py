@@ -117,6 +117,48 @@ def test_return_board_multi(mocker):
         deploy_boards.return_board("foo", sdk)
 
 
+def test_select_boards_by_title(mocker):
+    mocker.patch.object(sdk, "all_boards")
+    sdk.all_boards.return_value = [models.Board(title="Foo"), models.Board(title="Bar"), models.Board(title="Baz")]
+
+    boards = deploy_boards.select_boards(sdk, ["bar", "Foo"])
+
+    assert [i.title for i in boards] == ["Bar", "Foo"]
+    sdk.all_boards.assert_called_once()
+
+
+def test_select_boards_missing(mocker):
+    mocker.patch.object(sdk, "all_boards")
+    sdk.all_boards.return_value = [models.Board(title="Foo")]
+
+    with pytest.raises(AssertionError):
+        deploy_boards.select_boards(sdk, ["Bar"])
+
+
+def test_select_boards_multi(mocker):
+    mocker.patch.object(sdk, "all_boards")
+    sdk.all_boards.return_value = [models.Board(title="Foo"), models.Board(title="foo")]
+
+    with pytest.raises(deploy_boards.MultipleAssetsFoundError):
+        deploy_boards.select_boards(sdk, ["Foo"])
+
+
+def test_select_boards_untitled(mocker):
+    mocker.patch.object(sdk, "all_boards")
+    sdk.all_boards.return_value = [models.Board(title=None), models.Board(title="Sales Home")]
+
+    assert [i.title for i in deploy_boards.select_boards(sdk, pattern="Home")] == ["Sales Home"]
+    assert [i.title for i in deploy_boards.select_boards(sdk, ["sales home"])] == ["Sales Home"]
+
+
+def test_select_boards_pattern_and_all(mocker):
+    mocker.patch.object(sdk, "all_boards")
+    sdk.all_boards.return_value = [models.Board(title="Sales Home"), models.Board(title="Ops Home"), models.Board(title="Misc")]
+
+    assert [i.title for i in deploy_boards.select_boards(sdk, pattern="Home$")] == ["Sales Home", "Ops Home"]
+    assert len(deploy_boards.select_boards(sdk)) == 3
+
+
 def test_create_or_update_board_create(mocker):
     test_board = models.Board(title="taco", description="burrito")
     test_board_resp = MockBoard()
@@ -230,7 +272,7 @@ def test_create_board_item_dashboard_match_call(mocker):
     mocker.patch("looker_deployer.commands.deploy_boards.match_dashboard_id")
     mocker.patch.object(sdk, "create_board_item")
     deploy_boards.create_board_item(test_board_item, 1, sdk, sdk)
-    deploy_boards.match_dashboard_id.assert_called_with("42", sdk, sdk)
+    deploy_boards.match_dashboard_id.assert_called_with("42", sdk, sdk, mocker.ANY)
 
 
 def test_create_board_item_look_match_call(mocker):
@@ -238,7 +280,7 @@ def test_create_board_item_look_match_call(mocker):
     mocker.patch("looker_deployer.commands.deploy_boards.match_look_id")
     mocker.patch.object(sdk, "create_board_item")
     deploy_boards.create_board_item(test_board_item, 1, sdk, sdk)
-    deploy_boards.match_look_id.assert_called_with("42", sdk, sdk)
+    deploy_boards.match_look_id.assert_called_with("42", sdk, sdk, mocker.ANY)
 
 
 def test_create_board_item_dashboard_item_call(mocker):
@@ -287,3 +329,152 @@ def test_audit_board_no_misses(mocker):
     mocker.patch("looker_deployer.commands.deploy_boards.match_look_id")
     missing = deploy_boards.audit_board_content(test_board, sdk, sdk)
     assert missing == ([], [])
+
+
+def test_content_resolver_shared_by_audit_and_create(mocker):
+    test_board = MockBoard()
+    mocker.patch("looker_deployer.commands.deploy_boards.match_dashboard_id", return_value="20")
+    mocker.patch("looker_deployer.commands.deploy_boards.match_look_id", return_value="10")
+    mocker.patch.object(sdk, "create_board_item")
+
+    resolver = deploy_boards.ContentResolver(sdk, sdk)
+    deploy_boards.audit_board_content(test_board, sdk, sdk, resolver)
+    deploy_boards.create_board_item(models.BoardItem(dashboard_id=2, look_id=1), 4, sdk, sdk, resolver)
+
+    deploy_boards.match_dashboard_id.assert_called_once_with(2, sdk, sdk, resolver.catalog)
+    deploy_boards.match_look_id.assert_called_once_with(1, sdk, sdk, resolver.catalog)
+
+
+def test_content_resolver_remembers_misses(mocker):
+    mocker.patch("looker_deployer.commands.deploy_boards.match_look_id", side_effect=AssertionError)
+
+    resolver = deploy_boards.ContentResolver(sdk, sdk)
+    for i in range(2):
+        with pytest.raises(AssertionError):
+            resolver.look(1)
+
+    deploy_boards.match_look_id.assert_called_once()
+
+
+def test_content_catalog_pages(mocker):
+    mocker.patch.object(sdk, "search_dashboards")
+    sdk.search_dashboards.side_effect = [
+        [models.Dashboard(id="1", slug="a"), models.Dashboard(id="2", slug="b")],
+        [models.Dashboard(id="3", slug="a")]
+    ]
+
+    catalog = deploy_boards.ContentCatalog(sdk, page_size=2)
+    assert catalog.search_dashboards(slug="a") == [models.Dashboard(id="1", slug="a"), models.Dashboard(id="3", slug="a")]
+    assert catalog.search_dashboards(slug="c") == []
+
+    assert sdk.search_dashboards.call_count == 2
+    sdk.search_dashboards.assert_called_with(fields="id,slug", limit=2, offset=2, sorts="id")
+
+
+def test_match_look_id_catalog(mocker):
+    mocker.patch.object(sdk, "look")
+    mocker.patch.object(sdk, "search_looks")
+    sdk.look.return_value = MockLook()
+    sdk.search_looks.return_value = [models.Look(id="7", title="FooBarBaz")]
+
+    catalog = deploy_boards.ContentCatalog(sdk)
+    assert deploy_boards.match_look_id(1, sdk, sdk, catalog) == "7"
+    assert deploy_boards.match_look_id(1, sdk, sdk, catalog) == "7"
+    sdk.search_looks.assert_called_once()
+
+
+def test_reconcile_board_only_writes_changes(mocker):
+    mocker.patch("looker_deployer.commands.deploy_boards.match_dashboard_id", return_value="20")
+    mocker.patch("looker_deployer.commands.deploy_boards.match_look_id", return_value="10")
+    for method in ["create_board_item", "update_board_item", "delete_board_item", "create_board_section",
+                   "update_board_section", "delete_board_section", "update_board"]:
+        mocker.patch.object(sdk, method)
+    sdk.create_board_item.return_value = models.BoardItem(id="103")
+
+    source_board = models.Board(title="foo", board_sections=[
+        models.BoardSection(title="A", board_items=[models.BoardItem(dashboard_id=2), models.BoardItem(look_id=1)]),
+        models.BoardSection(title="B", board_items=[models.BoardItem(look_id=1)])
+    ])
+    target_board = models.Board(id="1", title="foo", section_order=["11", "10", "12"], board_sections=[
+        models.BoardSection(id="10", title="A", item_order=["100", "101"], board_items=[
+            models.BoardItem(id="100", dashboard_id="20"),
+            models.BoardItem(id="101", look_id="99")
+        ]),
+        models.BoardSection(id="11", title="B", item_order=["102"], board_items=[models.BoardItem(id="102", look_id="10")]),
+        models.BoardSection(id="12", title="C", board_items=[])
+    ])
+
+    summary = deploy_boards.reconcile_board(source_board, target_board, sdk, sdk)
+
+    sdk.create_board_item.assert_called_once()
+    assert sdk.create_board_item.call_args[0][0].look_id == "10"
+    sdk.update_board_item.assert_not_called()
+    sdk.delete_board_item.assert_called_once_with("101")
+    sdk.create_board_section.assert_not_called()
+    sdk.delete_board_section.assert_called_once_with("12")
+    sdk.update_board_section.assert_called_once_with("10", models.WriteBoardSection(title="A", item_order=["100", "103"]))
+    sdk.update_board.assert_called_once_with("1", models.WriteBoard(title="foo", section_order=["10", "11"]))
+    assert summary == {"create": 1, "update": 2, "delete": 2, "unchanged": 3}
+
+
+def test_reconcile_board_reorder_only(mocker):
+    mocker.patch("looker_deployer.commands.deploy_boards.match_dashboard_id", return_value="20")
+    mocker.patch("looker_deployer.commands.deploy_boards.match_look_id", return_value="10")
+    for method in ["create_board_item", "update_board_item", "delete_board_item", "create_board_section",
+                   "update_board_section", "delete_board_section", "update_board"]:
+        mocker.patch.object(sdk, method)
+
+    # INFO: The source lists sections and items in creation order, their display order is reversed
+    source_board = models.Board(title="foo", section_order=["2", "1"], board_sections=[
+        models.BoardSection(id="1", title="A", item_order=["4", "3"], board_items=[
+            models.BoardItem(id="3", dashboard_id=2), models.BoardItem(id="4", look_id=1)
+        ]),
+        models.BoardSection(id="2", title="B", board_items=[])
+    ])
+    target_board = models.Board(id="1", title="foo", section_order=["10", "11"], board_sections=[
+        models.BoardSection(id="10", title="A", item_order=["100", "101"], board_items=[
+            models.BoardItem(id="100", dashboard_id="20"),
+            models.BoardItem(id="101", look_id="10")
+        ]),
+        models.BoardSection(id="11", title="B", item_order=[], board_items=[])
+    ])
+
+    summary = deploy_boards.reconcile_board(source_board, target_board, sdk, sdk)
+
+    sdk.create_board_item.assert_not_called()
+    sdk.delete_board_item.assert_not_called()
+    sdk.update_board_section.assert_called_once_with("10", models.WriteBoardSection(title="A", item_order=["101", "100"]))
+    sdk.update_board.assert_called_once_with("1", models.WriteBoard(title="foo", section_order=["11", "10"]))
+    assert summary == {"create": 0, "update": 2, "delete": 0, "unchanged": 3}
+
+
+def test_reconcile_board_new_section_allow_partial(mocker):
+    mocker.patch("looker_deployer.commands.deploy_boards.match_dashboard_id", return_value="20")
+    mocker.patch("looker_deployer.commands.deploy_boards.match_look_id", side_effect=AssertionError)
+    for method in ["create_board_item", "create_board_section", "update_board"]:
+        mocker.patch.object(sdk, method)
+    sdk.create_board_section.return_value = models.BoardSection(id="10")
+
+    source_board = models.Board(title="foo", board_sections=[
+        models.BoardSection(title="A", board_items=[models.BoardItem(dashboard_id=2), models.BoardItem(look_id=1)])
+    ])
+    target_board = models.Board(id="1", title="foo", board_sections=[])
+
+    summary = deploy_boards.reconcile_board(source_board, target_board, sdk, sdk, allow_partial=True)
+
+    sdk.create_board_item.assert_called_once()
+    assert sdk.create_board_item.call_args[0][0].dashboard_id == "20"
+    sdk.update_board.assert_called_once_with("1", models.WriteBoard(title="foo", section_order=["10"]))
+    assert summary["create"] == 2
+
+
+def test_deploy_board_reconcile_existing(mocker):
+    mocker.patch("looker_deployer.commands.deploy_boards.audit_board_content", return_value=([], []))
+    mocker.patch("looker_deployer.commands.deploy_boards.find_target_board", return_value="target")
+    mocker.patch("looker_deployer.commands.deploy_boards.reconcile_board")
+    mocker.patch("looker_deployer.commands.deploy_boards.create_or_update_board")
+
+    deploy_boards.deploy_board(MockBoard(), sdk, sdk, reconcile=True)
+
+    deploy_boards.reconcile_board.assert_called_once()
+    deploy_boards.create_or_update_board.assert_not_called()
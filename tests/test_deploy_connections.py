@@ -13,7 +13,7 @@
 # limitations under the License.
 
 from looker_deployer.commands import deploy_connections
-from looker_sdk import methods40 as methods, models40 as models, error
+from looker_sdk import methods40 as methods, models40 as models
 
 
 class mockSettings:
@@ -56,33 +56,50 @@ def test_get_filtered_connections_filter(mocker):
 def test_write_connections_new(mocker):
     conn_list = [models.WriteDBConnection(name="Taco")]
 
-    mocker.patch.object(sdk, "connection", side_effect=error.SDKError("mocked error"))
+    mocker.patch.object(sdk, "all_connections")
     mocker.patch.object(sdk, "create_connection")
 
+    sdk.all_connections.return_value = [models.DBConnection(name="Burrito")]
+
     deploy_connections.write_connections(conn_list, sdk)
     sdk.create_connection.assert_called_once_with(conn_list[0])
 
 
 def test_write_connections_existing(mocker):
-    conn_list = [models.WriteDBConnection(name="Taco")]
+    conn_list = [models.WriteDBConnection(name="Taco", host="db.example.com")]
 
-    mocker.patch.object(sdk, "connection")
+    mocker.patch.object(sdk, "all_connections")
     mocker.patch.object(sdk, "update_connection")
 
-    sdk.connection.return_value = "foo"
+    sdk.all_connections.return_value = [models.DBConnection(name="Taco", host="old.example.com")]
 
     deploy_connections.write_connections(conn_list, sdk)
     sdk.update_connection.assert_called_once_with("Taco", conn_list[0])
 
 
+def test_write_connections_unchanged(mocker):
+    conn_list = [models.WriteDBConnection(name="Taco", host="db.example.com")]
+
+    mocker.patch.object(sdk, "all_connections")
+    mocker.patch.object(sdk, "connection")
+    mocker.patch.object(sdk, "update_connection")
+
+    sdk.all_connections.return_value = [models.DBConnection(name="Taco", host="db.example.com")]
+
+    deploy_connections.write_connections(conn_list, sdk)
+    sdk.all_connections.assert_called_once()
+    sdk.connection.assert_not_called()
+    sdk.update_connection.assert_not_called()
+
+
 def test_write_connections_update_pw_existing(mocker):
     conn_list = [models.WriteDBConnection(name="Taco")]
     conf = {"Taco": "Cat"}
 
-    mocker.patch.object(sdk, "connection")
+    mocker.patch.object(sdk, "all_connections")
     mocker.patch.object(sdk, "update_connection")
 
-    sdk.connection.return_value = "foo"
+    sdk.all_connections.return_value = [models.DBConnection(name="Taco")]
 
     deploy_connections.write_connections(conn_list, sdk, conf)
     sdk.update_connection.assert_called_once_with("Taco", models.WriteDBConnection(name="Taco", password="Cat"))
@@ -92,8 +109,10 @@ def test_write_connections_update_pw_new(mocker):
     conn_list = [models.WriteDBConnection(name="Taco")]
     conf = {"Taco": "Cat"}
 
-    mocker.patch.object(sdk, "connection", side_effect=error.SDKError("mocked error"))
+    mocker.patch.object(sdk, "all_connections")
     mocker.patch.object(sdk, "create_connection")
 
+    sdk.all_connections.return_value = []
+
     deploy_connections.write_connections(conn_list, sdk, conf)
     sdk.create_connection.assert_called_once_with(models.WriteDBConnection(name="Taco", password="Cat"))
@@ -14,9 +14,9 @@
 
 import pytest
 import os
-import subprocess
 from looker_sdk import methods40 as methods, models40 as models
 from looker_deployer.commands import deploy_content
+from looker_deployer.utils.content_results import CommandOutput
 from looker_deployer.utils import parse_ini
 
 
@@ -30,6 +30,8 @@ class mockAuth:
 
 sdk = methods.Looker40SDK(mockAuth(), "bar", "baz", "bosh", "bizz")
 
+OK = CommandOutput(0, [], 0)
+
 TRUE_INI = {
     "taco": {
         "base_url": "https://phoobarbaz.com:1234",
@@ -104,9 +106,9 @@ def test_import_content(mocker):
     mocker.patch("looker_deployer.commands.deploy_content.get_gzr_creds")
     deploy_content.get_gzr_creds.return_value = ("foobar.com", "1234", "abc", "xyz", "True")
 
-    mocker.patch("subprocess.run")
+    mocker.patch("looker_deployer.commands.deploy_content.stream_command", return_value=OK)
     deploy_content.import_content("dashboard", "tacocat.json", "42", "env", "ini", False)
-    subprocess.run.assert_called_with([
+    deploy_content.stream_command.assert_called_with([
         "gzr",
         "dashboard",
         "import",
@@ -128,9 +130,9 @@ def test_import_content_debug(mocker):
     mocker.patch("looker_deployer.commands.deploy_content.get_gzr_creds")
     deploy_content.get_gzr_creds.return_value = ("foobar.com", "1234", "abc", "xyz", "True")
 
-    mocker.patch("subprocess.run")
+    mocker.patch("looker_deployer.commands.deploy_content.stream_command", return_value=OK)
     deploy_content.import_content("dashboard", "tacocat.json", "42", "env", "ini", True)
-    subprocess.run.assert_called_with([
+    deploy_content.stream_command.assert_called_with([
         "gzr",
         "dashboard",
         "import",
@@ -153,9 +155,9 @@ def test_import_content_no_verify_ssl(mocker):
     mocker.patch("looker_deployer.commands.deploy_content.get_gzr_creds")
     deploy_content.get_gzr_creds.return_value = ("foobar.com", "1234", "abc", "xyz", "False")
 
-    mocker.patch("subprocess.run")
+    mocker.patch("looker_deployer.commands.deploy_content.stream_command", return_value=OK)
     deploy_content.import_content("dashboard", "tacocat.json", "42", "env", "ini", False)
-    subprocess.run.assert_called_with([
+    deploy_content.stream_command.assert_called_with([
         "gzr",
         "dashboard",
         "import",
@@ -180,9 +182,9 @@ def test_import_content_win(mocker):
 
     mocker.patch("os.name", "nt")
 
-    mocker.patch("subprocess.run")
+    mocker.patch("looker_deployer.commands.deploy_content.stream_command", return_value=OK)
     deploy_content.import_content("dashboard", "tacocat.json", "42", "env", "ini", False)
-    subprocess.run.assert_called_with([
+    deploy_content.stream_command.assert_called_with([
         "cmd.exe",
         "/c",
         "gzr",
@@ -209,6 +211,48 @@ def test_build_spaces(mocker):
     assert space_id == "42"
 
 
+def test_folder_index_resolve_existing(mocker):
+    mocker.patch.object(sdk, "all_folders")
+    mocker.patch.object(sdk, "create_folder")
+    sdk.all_folders.return_value = [
+        models.Folder(name="Shared", parent_id=None, id="1"),
+        models.Folder(name="Taco", parent_id="1", id="42"),
+        models.Folder(name="Burrito", parent_id="42", id="43")
+    ]
+    folder_index = deploy_content.FolderIndex(sdk)
+    assert folder_index.resolve(["Shared", "Taco", "Burrito"]) == "43"
+    assert folder_index.resolve(["Shared", "taco"]) == "42"
+    sdk.all_folders.assert_called_once()
+    sdk.create_folder.assert_not_called()
+
+
+def test_folder_index_resolve_creates_once(mocker):
+    mocker.patch.object(sdk, "all_folders")
+    mocker.patch.object(sdk, "create_folder")
+    sdk.all_folders.return_value = [models.Folder(name="Shared", parent_id=None, id="1")]
+    sdk.create_folder.return_value = models.Folder(name="Taco", parent_id="1", id="42")
+    folder_index = deploy_content.FolderIndex(sdk)
+    assert folder_index.resolve(["Shared", "Taco"]) == "42"
+    assert folder_index.resolve(["Shared", "Taco"]) == "42"
+    sdk.create_folder.assert_called_once_with(models.CreateFolder(name="Taco", parent_id="1"))
+
+
+def test_folder_index_resolve_multi_found(mocker):
+    mocker.patch.object(sdk, "all_folders")
+    sdk.all_folders.return_value = [
+        models.Folder(name="Taco", parent_id="1", id="42"),
+        models.Folder(name="Taco", parent_id="1", id="43")
+    ]
+    with pytest.raises(AssertionError):
+        deploy_content.FolderIndex(sdk).resolve(["Shared", "Taco"])
+
+
+def test_build_spaces_folder_index(mocker):
+    folder_index = mocker.Mock()
+    folder_index.resolve.return_value = "42"
+    assert deploy_content.build_spaces(["Shared", "taco"], sdk, folder_index) == "42"
+
+
 def test_deploy_space_build_call(mocker):
 
     mocker.patch("os.listdir")
@@ -222,7 +266,7 @@ def test_deploy_space_build_call(mocker):
     mocker.patch("looker_deployer.commands.deploy_content.build_spaces")
     mocker.patch("looker_deployer.commands.deploy_content.import_content")
     deploy_content.deploy_space("Foo/Shared/Bar/", "sdk", "env", "ini", False, "Shared", False)
-    deploy_content.build_spaces.assert_called_with(["Shared", "Bar"], "sdk")
+    deploy_content.build_spaces.assert_called_with(["Shared", "Bar"], "sdk", None)
 
 
 def test_deploy_space_look_call(mocker):
@@ -266,7 +310,7 @@ def test_deploy_content_build_call(mocker):
     mocker.patch("looker_deployer.commands.deploy_content.build_spaces")
     mocker.patch("looker_deployer.commands.deploy_content.import_content")
     deploy_content.deploy_content("look", "Foo/Shared/Bar/Baz/Dashboard_test.json", "sdk", "env", "ini", "Shared")
-    deploy_content.build_spaces.assert_called_with(["Shared", "Bar", "Baz"], "sdk")
+    deploy_content.build_spaces.assert_called_with(["Shared", "Bar", "Baz"], "sdk", None)
 
 
 def test_deploy_content_import_content_call(mocker):
@@ -276,3 +320,111 @@ def test_deploy_content_import_content_call(mocker):
     mocker.patch("looker_deployer.commands.deploy_content.import_content")
     deploy_content.deploy_content("look", "Foo/Shared/Bar/Look_test.json", "sdk", "env", "ini", "Shared")
     deploy_content.import_content.assert_called_with("look", "Foo/Shared/Bar/Look_test.json", "42", "env", "ini", False)
+
+
+def test_content_import_pool_submit(mocker):
+    mocker.patch("looker_deployer.commands.deploy_content.import_content")
+    with deploy_content.ContentImportPool("env", "ini") as pool:
+        pool.submit("look", "Foo/Shared/Look_test", "42")
+    deploy_content.import_content.assert_called_once_with("look", "Foo/Shared/Look_test", "42", "env", "ini", False)
+
+
+def test_content_import_pool_failure(mocker):
+    mocker.patch("looker_deployer.commands.deploy_content.import_content", side_effect=KeyError("taco"))
+    with pytest.raises(KeyError):
+        with deploy_content.ContentImportPool("env", "ini") as pool:
+            pool.submit("look", "Foo/Shared/Look_test", "42")
+
+
+def test_deploy_space_shared_pool(mocker):
+
+    mocker.patch("os.listdir")
+    mocker.patch("os.path.isfile")
+    mocker.patch("os.path.isdir")
+
+    os.listdir.return_value = ["Dashboard_test"]
+    os.path.isfile.return_value = True
+    os.path.isdir.return_value = True
+
+    mocker.patch("looker_deployer.commands.deploy_content.build_spaces")
+    deploy_content.build_spaces.return_value = "42"
+
+    pool = mocker.Mock()
+    deploy_content.deploy_space("Foo/Shared/Bar", "sdk", "env", "ini", False, "Shared", False, pool)
+    pool.submit_folder.assert_called_once_with([], ["Foo/Shared/Bar/Dashboard_test"], "42")
+
+
+def test_content_import_pool_dashboards_after_looks(mocker):
+    calls = []
+    mocker.patch(
+        "looker_deployer.commands.deploy_content.import_content",
+        side_effect=lambda content_type, content_json, *args: calls.append(content_type)
+    )
+    with deploy_content.ContentImportPool("env", "ini", workers=4) as pool:
+        pool.submit_folder(["Look_1", "Look_2", "Look_3"], ["Dashboard_1", "Dashboard_2"], "42")
+    assert calls == ["look", "look", "look", "dashboard", "dashboard"]
+
+
+def test_deploy_space_recursive_children(mocker):
+    mocker.patch("os.listdir")
+    mocker.patch("os.path.isfile")
+    mocker.patch("os.path.isdir")
+
+    os.listdir.side_effect = lambda s: ["Taco"] if s.count("Taco") < 2 else ["Look_test"]
+    os.path.isfile.side_effect = lambda s: s.endswith("Look_test")
+    os.path.isdir.side_effect = lambda s: not s.endswith("Look_test")
+
+    mocker.patch("looker_deployer.commands.deploy_content.build_spaces")
+    deploy_content.build_spaces.return_value = "42"
+    mocker.patch("looker_deployer.commands.deploy_content.import_content")
+
+    deploy_content.deploy_space("Foo/Shared/", "sdk", "env", "ini", True, "Shared", False)
+    deploy_content.import_content.assert_called_once_with("look", "Foo/Shared/Taco/Taco/Look_test", "42", "env", "ini", False)
+
+
+def test_content_import_pool_native(mocker):
+    mocker.patch("looker_deployer.utils.native_content.import_content")
+    with deploy_content.ContentImportPool("env", "ini", sdk="sdk", engine="native") as pool:
+        pool.submit("dashboard", "Foo/Shared/Dashboard_test", "42")
+    deploy_content.native_content.import_content.assert_called_once_with("dashboard", "Foo/Shared/Dashboard_test", "42", "sdk")
+
+
+def test_content_import_pool_ledger_skips_unchanged(mocker, tmp_path):
+    look = tmp_path / "Look_1_Taco.json"
+    dash = tmp_path / "Dashboard_2_Taco.json"
+    look.write_text("{}")
+    dash.write_text("{}")
+    mocker.patch("looker_deployer.utils.native_content.import_content", return_value="9")
+
+    ledger = deploy_content.DeployLedger(tmp_path / "prod.json")
+    ledger.record("look", str(look), "42", "8")
+
+    with deploy_content.ContentImportPool("env", "ini", sdk="sdk", engine="native", ledger=ledger) as pool:
+        pool.submit_folder([str(look)], [str(dash)], "42")
+
+    deploy_content.native_content.import_content.assert_called_once_with("dashboard", str(dash), "42", "sdk")
+    assert pool.skipped == 1
+    assert ledger.entries["dashboard:42:Dashboard_2_Taco.json"]["target_id"] == "9"
+
+
+def test_import_content_result(mocker):
+    mocker.patch("looker_deployer.commands.deploy_content.get_gzr_creds")
+    deploy_content.get_gzr_creds.return_value = ("foobar.com", "1234", "abc", "xyz", "True")
+    mocker.patch(
+        "looker_deployer.commands.deploy_content.stream_command",
+        return_value=CommandOutput(0, ["Imported dashboard 77"], 0)
+    )
+
+    assert deploy_content.import_content("dashboard", "tacocat.json", "42", "env", "ini") == "77"
+
+
+def test_import_content_failure(mocker):
+    mocker.patch("looker_deployer.commands.deploy_content.get_gzr_creds")
+    deploy_content.get_gzr_creds.return_value = ("foobar.com", "1234", "abc", "xyz", "True")
+    mocker.patch(
+        "looker_deployer.commands.deploy_content.stream_command",
+        return_value=CommandOutput(1, ["Error: folder not found"], 0)
+    )
+
+    with pytest.raises(deploy_content.GzrError):
+        deploy_content.import_content("dashboard", "tacocat.json", "42", "env", "ini")
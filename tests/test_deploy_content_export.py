@@ -14,9 +14,12 @@
 
 from unittest.mock import patch, mock_open
 from pathlib import Path
-import subprocess
-from looker_sdk import methods40 as methods
+import threading
+import pytest
+from looker_sdk.error import SDKError
+from looker_sdk import methods40 as methods, models40 as models
 from looker_deployer.commands import deploy_content_export
+from looker_deployer.utils.content_results import CommandOutput
 
 
 class mockSpace:
@@ -34,14 +37,16 @@ class mockAuth:
 
 sdk = methods.Looker40SDK(mockAuth(), "bar", "baz", "bosh", "bizz")
 
+OK = CommandOutput(0, [], 0)
+
 
 def test_export_space(mocker):
     mocker.patch("looker_deployer.commands.deploy_content_export.get_gzr_creds")
     deploy_content_export.get_gzr_creds.return_value = ("foobar.com", "1234", "abc", "xyz", "True")
 
-    mocker.patch("subprocess.run")
+    mocker.patch("looker_deployer.commands.deploy_content_export.stream_command", return_value=OK)
     deploy_content_export.export_spaces("1", "env", "ini", "foo/bar", False)
-    subprocess.run.assert_called_with([
+    deploy_content_export.stream_command.assert_called_with([
         "gzr",
         "space",
         "export",
@@ -63,9 +68,9 @@ def test_export_space_debug(mocker):
     mocker.patch("looker_deployer.commands.deploy_content_export.get_gzr_creds")
     deploy_content_export.get_gzr_creds.return_value = ("foobar.com", "1234", "abc", "xyz", "True")
 
-    mocker.patch("subprocess.run")
+    mocker.patch("looker_deployer.commands.deploy_content_export.stream_command", return_value=OK)
     deploy_content_export.export_spaces("1", "env", "ini", "foo/bar", True)
-    subprocess.run.assert_called_with([
+    deploy_content_export.stream_command.assert_called_with([
         "gzr",
         "space",
         "export",
@@ -88,9 +93,9 @@ def test_export_space_no_verify_ssl(mocker):
     mocker.patch("looker_deployer.commands.deploy_content_export.get_gzr_creds")
     deploy_content_export.get_gzr_creds.return_value = ("foobar.com", "1234", "abc", "xyz", "False")
 
-    mocker.patch("subprocess.run")
+    mocker.patch("looker_deployer.commands.deploy_content_export.stream_command", return_value=OK)
     deploy_content_export.export_spaces("1", "env", "ini", "foo/bar", False)
-    subprocess.run.assert_called_with([
+    deploy_content_export.stream_command.assert_called_with([
         "gzr",
         "space",
         "export",
@@ -115,9 +120,9 @@ def test_export_space_win(mocker):
 
     mocker.patch("os.name", "nt")
 
-    mocker.patch("subprocess.run")
+    mocker.patch("looker_deployer.commands.deploy_content_export.stream_command", return_value=OK)
     deploy_content_export.export_spaces("1", "env", "ini", "foo/bar", False)
-    subprocess.run.assert_called_with([
+    deploy_content_export.stream_command.assert_called_with([
         "cmd.exe",
         "/c",
         "gzr",
@@ -162,11 +167,11 @@ def test_export_dashboard(mocker):
 
     fake_file_path = Path("foo/bar/dashboard_1.json")
     with patch('looker_deployer.commands.deploy_content_export.open', mock_open()) as mocked_file:
-        mocker.patch("subprocess.run")
+        mocker.patch("looker_deployer.commands.deploy_content_export.stream_command", return_value=OK)
         deploy_content_export.export_content("dashboard", "1", "env", "ini", "foo/bar", False)
 
-        # assert "foo/bar/dashboard_1.json" opened and on write mode 'w'
-        mocked_file.assert_called_once_with(fake_file_path, 'w')
+        # assert "foo/bar/dashboard_1.json" opened and on write mode 'wb'
+        mocked_file.assert_called_once_with(fake_file_path, 'wb')
 
 
 def test_export_look(mocker):
@@ -175,8 +180,160 @@ def test_export_look(mocker):
 
     fake_file_path = Path("foo/bar/look_1.json")
     with patch('looker_deployer.commands.deploy_content_export.open', mock_open()) as mocked_file:
-        mocker.patch("subprocess.run")
+        mocker.patch("looker_deployer.commands.deploy_content_export.stream_command", return_value=OK)
         deploy_content_export.export_content("look", "1", "env", "ini", "foo/bar", False)
 
-        # assert "foo/bar/look_1.json" opened and on write mode 'w'
-        mocked_file.assert_called_once_with(fake_file_path, 'w')
+        # assert "foo/bar/look_1.json" opened and on write mode 'wb'
+        mocked_file.assert_called_once_with(fake_file_path, 'wb')
+
+
+def test_send_export_native(mocker):
+    mocker.patch("pathlib.Path.mkdir")
+    mocker.patch("looker_deployer.utils.native_content.export_content")
+    mocker.patch("looker_deployer.commands.deploy_content_export.export_content")
+    deploy_content_export.send_export("sdk", "env", "ini", "./foo/bar", dashboards=["1"], engine="native")
+    deploy_content_export.native_content.export_content.assert_called_once_with("dashboard", "1", "foo/bar", "sdk")
+    deploy_content_export.export_content.assert_not_called()
+
+
+def test_folder_tree_lists_once(mocker):
+    mocker.patch.object(sdk, "all_folders")
+    mocker.patch.object(sdk, "folder")
+    sdk.all_folders.return_value = [
+        models.Folder(id="1", name="Shared", parent_id=None),
+        models.Folder(id="5", name="Taco", parent_id="1"),
+        models.Folder(id="6", name="Burrito", parent_id="5")
+    ]
+
+    folder_tree = deploy_content_export.FolderTree(sdk)
+    assert deploy_content_export.recurse_folders("6", [], folder_tree) == ["Burrito", "Taco", "Shared"]
+    assert deploy_content_export.recurse_folders("5", [], folder_tree) == ["Taco", "Shared"]
+
+    sdk.all_folders.assert_called_once_with(fields="id,name,parent_id")
+    sdk.folder.assert_not_called()
+
+
+def test_folder_tree_subtree(mocker):
+    mocker.patch.object(sdk, "all_folders")
+    sdk.all_folders.return_value = [
+        models.Folder(id="1", name="Shared", parent_id=None),
+        models.Folder(id="5", name="Taco", parent_id="1"),
+        models.Folder(id="6", name="Burrito", parent_id="5"),
+        models.Folder(id="7", name="Salsa", parent_id="1"),
+        models.Folder(id="8", name="Other", parent_id=None)
+    ]
+
+    folder_tree = deploy_content_export.FolderTree(sdk)
+    assert folder_tree.subtree("1") == ["1", "5", "7", "6"]
+    assert [i.id for i in folder_tree.children("5")] == ["6"]
+    assert folder_tree.children("6") == []
+
+
+def test_send_export_concurrent(mocker):
+    mocker.patch("pathlib.Path.mkdir")
+    barrier = threading.Barrier(3, timeout=5)
+    mocker.patch("looker_deployer.commands.deploy_content_export.export_content", side_effect=lambda *args: barrier.wait())
+
+    deploy_content_export.send_export("sdk", "env", "ini", "./foo/bar", dashboards=["1", "2"], looks=["3"], workers=3)
+
+    assert deploy_content_export.export_content.call_count == 3
+
+
+def test_send_export_incremental(mocker, tmp_path):
+    mocker.patch.object(sdk, "all_folders")
+    mocker.patch.object(sdk, "folder_dashboards")
+    mocker.patch.object(sdk, "folder_looks", return_value=[])
+    mocker.patch("looker_deployer.utils.native_content.cat_content", return_value={"title": "new"})
+    sdk.all_folders.return_value = [
+        models.Folder(id="1", name="Shared", parent_id=None),
+        models.Folder(id="5", name="Taco", parent_id="1")
+    ]
+    sdk.folder_dashboards.side_effect = lambda folder_id, fields: [
+        models.Dashboard(id="7", title="Same", folder_id="5", updated_at="2021-01-01"),
+        models.Dashboard(id="8", title="Changed", folder_id="5", updated_at="2021-02-02")
+    ] if folder_id == "5" else []
+
+    local_target = str(tmp_path)
+    same = tmp_path / "Shared" / "Taco" / "Dashboard_7_Same.json"
+    changed = tmp_path / "Shared" / "Taco" / "Dashboard_8_Changed.json"
+    removed = tmp_path / "Shared" / "Taco" / "Look_9_Removed.json"
+    for path in [same, changed, removed]:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("{}")
+
+    manifest = deploy_content_export.ExportManifest(local_target)
+    manifest.record("dashboard", "7", same, "2021-01-01", "5")
+    manifest.record("dashboard", "8", changed, "2021-01-01", "5")
+    manifest.record("look", "9", removed, "2021-01-01", "5")
+    manifest.save()
+
+    deploy_content_export.send_export(
+        sdk, "env", "ini", local_target, folders=["1"], engine="native",
+        manifest=deploy_content_export.ExportManifest.load(local_target), incremental=True
+    )
+
+    deploy_content_export.native_content.cat_content.assert_called_once_with("dashboard", "8", sdk)
+    assert same.read_text() == "{}"
+    assert not removed.exists()
+
+    saved = deploy_content_export.ExportManifest.load(local_target)
+    assert saved.entries["dashboard:8"]["updated_at"] == "2021-02-02"
+    assert saved.entries["look:9"]["deleted"]
+
+
+def test_content_updated_at_not_found(mocker):
+    mocker.patch.object(sdk, "dashboard", side_effect=SDKError("Not found"))
+    assert deploy_content_export.content_updated_at("dashboard", "1", sdk) is None
+
+
+def test_content_updated_at_other_errors_raise(mocker):
+    mocker.patch.object(sdk, "look", side_effect=SDKError("Internal server error"))
+    with pytest.raises(SDKError):
+        deploy_content_export.content_updated_at("look", "1", sdk)
+
+
+def test_send_export_manifest_without_incremental(mocker, tmp_path):
+    mocker.patch.object(sdk, "dashboard")
+    mocker.patch("looker_deployer.utils.native_content.cat_content", return_value={"title": "new"})
+
+    manifest = deploy_content_export.ExportManifest(str(tmp_path))
+    deploy_content_export.send_export(sdk, "env", "ini", str(tmp_path), dashboards=["1"], engine="native", manifest=manifest)
+
+    # INFO: Only incremental exports look up updated_at
+    sdk.dashboard.assert_not_called()
+    assert (tmp_path / "dashboard_1.json").exists()
+    assert manifest.entries["dashboard:1"]["updated_at"] is None
+
+
+def test_send_export_incremental_keeps_files_on_api_errors(mocker, tmp_path):
+    mocker.patch.object(sdk, "dashboard", side_effect=SDKError("Internal server error"))
+    exported = tmp_path / "dashboard_1.json"
+    exported.write_text("{}")
+    manifest = deploy_content_export.ExportManifest(str(tmp_path))
+    manifest.record("dashboard", "1", exported, "2021-01-01")
+
+    with pytest.raises(SDKError):
+        deploy_content_export.send_export(
+            sdk, "env", "ini", str(tmp_path), dashboards=["1"], engine="native", manifest=manifest, incremental=True
+        )
+
+    assert exported.exists()
+    assert not manifest.entries["dashboard:1"].get("deleted")
+
+
+def test_send_export_manifest_lists_exported_folders_only(mocker, tmp_path):
+    mocker.patch.object(sdk, "all_folders", return_value=[
+        models.Folder(id="1", name="Shared", parent_id=None),
+        models.Folder(id="5", name="Taco", parent_id="1"),
+        models.Folder(id="8", name="Other", parent_id=None)
+    ])
+    mocker.patch.object(sdk, "folder_dashboards", return_value=[])
+    mocker.patch.object(sdk, "folder_looks", return_value=[])
+    mocker.patch.object(sdk, "search_dashboards")
+    mocker.patch("looker_deployer.utils.native_content.export_space")
+
+    manifest = deploy_content_export.ExportManifest(str(tmp_path))
+    deploy_content_export.send_export(sdk, "env", "ini", str(tmp_path), folders=["1"], engine="native", manifest=manifest)
+
+    assert sorted(i[0][0] for i in sdk.folder_dashboards.call_args_list) == ["1", "5"]
+    sdk.search_dashboards.assert_not_called()
@@ -105,3 +105,26 @@ def test_write_groups_in_group_change(mocker):
         group_id=group_2.id, deleting_group_id=1)
     target_sdk.add_group_group.assert_called_once_with(
         group_id=group_3.id, body=models.GroupIdForGroupInclusion(group_id=1))
+
+
+def test_write_groups_in_group_unchanged(mocker):
+    group_1 = models.Group(name="Taco", id=1)
+    group_2 = models.Group(name="Taco Supreme", id=2)
+    target_group_1 = models.Group(name="Taco", id=11)
+    target_group_2 = models.Group(name="Taco Supreme", id=12)
+
+    mocker.patch.object(source_sdk, "all_groups")
+    mocker.patch.object(source_sdk, "all_group_groups")
+    mocker.patch.object(target_sdk, "all_groups")
+    mocker.patch.object(target_sdk, "all_group_groups")
+    mocker.patch.object(target_sdk, "add_group_group")
+    mocker.patch.object(target_sdk, "delete_group_from_group")
+
+    source_sdk.all_groups.return_value = [group_1, group_2]
+    target_sdk.all_groups.return_value = [target_group_1, target_group_2]
+    source_sdk.all_group_groups.side_effect = mock_responses({1: [], 2: [group_1]})
+    target_sdk.all_group_groups.side_effect = mock_responses({11: [], 12: [target_group_1]})
+
+    deploy_group_in_group.write_groups_in_group(source_sdk, target_sdk)
+    target_sdk.add_group_group.assert_not_called()
+    target_sdk.delete_group_from_group.assert_not_called()
@@ -1,4 +1,6 @@
 from looker_deployer.commands import deploy_groups
+from looker_deployer.utils.executor import WriteExecutor
+from looker_deployer.utils.plan import Plan
 from looker_sdk import methods40 as methods, models40 as models
 
 
@@ -50,12 +52,57 @@ def test_write_groups_new(mocker):
 
 
 def test_write_groups_existing(mocker):
-    group_list = [models.WriteGroup(name="Taco")]
+    group_list = [models.WriteGroup(name="Taco", can_add_to_content_metadata=True)]
 
     mocker.patch.object(sdk, "all_groups")
     mocker.patch.object(sdk, "update_group")
 
-    sdk.all_groups.return_value = [models.Group(name="Taco", id=1)]
+    sdk.all_groups.return_value = [models.Group(name="Taco", id=1, can_add_to_content_metadata=False)]
+
+    deploy_groups.write_groups(group_list, sdk)
+    sdk.update_group.assert_called_once_with(1, group_list[0])
+
+
+def test_write_groups_unchanged(mocker):
+    group_list = [models.WriteGroup(name="Taco", can_add_to_content_metadata=True)]
+
+    mocker.patch.object(sdk, "all_groups")
+    mocker.patch.object(sdk, "update_group")
+
+    sdk.all_groups.return_value = [models.Group(name="Taco", id=1, can_add_to_content_metadata=True)]
 
     deploy_groups.write_groups(group_list, sdk)
+    sdk.update_group.assert_not_called()
+
+
+def test_write_groups_plan(mocker):
+    group_list = [models.WriteGroup(name="Taco", can_add_to_content_metadata=True), models.WriteGroup(name="Burrito")]
+
+    mocker.patch.object(sdk, "all_groups")
+    mocker.patch.object(sdk, "create_group")
+    mocker.patch.object(sdk, "update_group")
+    mocker.patch.object(sdk, "delete_group")
+
+    sdk.all_groups.return_value = [models.Group(name="Taco", id=1), models.Group(name="Nacho", id=2)]
+
+    plan = Plan(apply=False)
+    deploy_groups.write_groups(group_list, sdk, allow_delete=True, plan=plan)
+    sdk.create_group.assert_not_called()
+    sdk.update_group.assert_not_called()
+    sdk.delete_group.assert_not_called()
+    assert plan.summary() == {"create": 1, "update": 1, "delete": 1, "unchanged": 0}
+
+
+def test_write_groups_concurrent(mocker):
+    group_list = [models.WriteGroup(name="Taco", can_add_to_content_metadata=True), models.WriteGroup(name="Burrito")]
+
+    mocker.patch.object(sdk, "all_groups")
+    mocker.patch.object(sdk, "create_group")
+    mocker.patch.object(sdk, "update_group")
+
+    sdk.all_groups.return_value = [models.Group(name="Taco", id=1)]
+
+    executor = WriteExecutor(concurrency=2)
+    deploy_groups.write_groups(group_list, sdk, executor=executor)
     sdk.update_group.assert_called_once_with(1, group_list[0])
+    sdk.create_group.assert_called_once_with(group_list[1])
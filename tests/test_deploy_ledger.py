@@ -0,0 +1,37 @@
+from looker_deployer.utils import deploy_ledger
+
+
+def test_ledger_unchanged(tmp_path):
+    content = tmp_path / "Look_1_Taco.json"
+    content.write_text("{}")
+    ledger = deploy_ledger.DeployLedger(tmp_path / "prod.json")
+
+    assert not ledger.unchanged("look", str(content), "42")
+    ledger.record("look", str(content), "42", "7")
+
+    assert ledger.unchanged("look", str(content), "42")
+    assert not ledger.unchanged("look", str(content), "43")
+
+    content.write_text('{"title": "Burrito"}')
+    assert not ledger.unchanged("look", str(content), "42")
+
+
+def test_ledger_force(tmp_path):
+    content = tmp_path / "Look_1_Taco.json"
+    content.write_text("{}")
+    ledger = deploy_ledger.DeployLedger(tmp_path / "prod.json", force=True)
+    ledger.record("look", str(content), "42")
+
+    assert not ledger.unchanged("look", str(content), "42")
+
+
+def test_ledger_save_and_load(tmp_path):
+    content = tmp_path / "Dashboard_1_Taco.json"
+    content.write_text("{}")
+    ledger = deploy_ledger.DeployLedger.load("prod", str(tmp_path / "ledgers"))
+    ledger.record("dashboard", str(content), "42", "9")
+    ledger.save()
+
+    loaded = deploy_ledger.DeployLedger.load("prod", str(tmp_path / "ledgers"))
+    assert loaded.entries == ledger.entries
+    assert loaded.unchanged("dashboard", str(content), "42")
@@ -50,12 +50,24 @@ def test_write_model_sets_new(mocker):
 
 
 def test_write_model_sets_existing(mocker):
-    model_set_list = [models.WriteModelSet(name="Taco")]
+    model_set_list = [models.WriteModelSet(name="Taco", models=["a", "b"])]
 
     mocker.patch.object(sdk, "all_model_sets")
     mocker.patch.object(sdk, "update_model_set")
 
-    sdk.all_model_sets.return_value = [models.ModelSet(name="Taco", id=1)]
+    sdk.all_model_sets.return_value = [models.ModelSet(name="Taco", id=1, models=["a"])]
 
     deploy_model_sets.write_model_sets(model_set_list, sdk)
     sdk.update_model_set.assert_called_once_with(1, model_set_list[0])
+
+
+def test_write_model_sets_unchanged(mocker):
+    model_set_list = [models.WriteModelSet(name="Taco", models=["a", "b"])]
+
+    mocker.patch.object(sdk, "all_model_sets")
+    mocker.patch.object(sdk, "update_model_set")
+
+    sdk.all_model_sets.return_value = [models.ModelSet(name="Taco", id=1, models=["b", "a"])]
+
+    deploy_model_sets.write_model_sets(model_set_list, sdk)
+    sdk.update_model_set.assert_not_called()
@@ -51,13 +51,14 @@ def test_write_permission_sets_new(mocker):
 
 
 def test_write_permission_sets_existing(mocker):
-    permission_set_list = [models.WritePermissionSet(name="Taco")]
+    permission_set_list = [models.WritePermissionSet(
+        name="Taco", permissions=["access_data"])]
 
     mocker.patch.object(sdk, "all_permission_sets")
     mocker.patch.object(sdk, "update_permission_set")
 
     sdk.all_permission_sets.return_value = [models.PermissionSet(
-        name="Taco", id=1)]
+        name="Taco", id=1, permissions=[])]
 
     deploy_permission_sets.write_permission_sets(permission_set_list, sdk)
     sdk.update_permission_set.assert_called_once_with(
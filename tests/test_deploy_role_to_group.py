@@ -53,6 +53,7 @@ def test_write_role_to_group_new(mocker):
     mocker.patch.object(source_sdk, "role_groups")
     mocker.patch.object(target_sdk, "all_roles")
     mocker.patch.object(target_sdk, "all_groups")
+    mocker.patch.object(target_sdk, "role_groups")
     mocker.patch.object(target_sdk, "set_role_groups")
 
     source_sdk.all_roles.return_value = role
@@ -60,7 +61,36 @@ def test_write_role_to_group_new(mocker):
     source_sdk.all_groups.return_value = groups_list
     target_sdk.all_groups.return_value = groups_list
     source_sdk.role_groups.return_value = role_group
+    target_sdk.role_groups.return_value = []
 
     deploy_role_to_group.write_role_to_group(source_sdk, target_sdk)
     target_sdk.set_role_groups.assert_called_once_with(
         role_id=role[0].id, body=[group_1.id])
+
+
+def test_write_role_to_group_unchanged(mocker):
+    group_1 = models.Group(name="Taco", id=1)
+    group_2 = models.Group(name="Taco Supreme", id=2)
+    target_group_1 = models.Group(name="Taco", id=11)
+    target_group_2 = models.Group(name="Taco Supreme", id=12)
+    role = [models.Role(name="Explorer", id=1)]
+    target_role = [models.Role(name="Explorer", id=5)]
+
+    mocker.patch.object(source_sdk, "all_roles")
+    mocker.patch.object(source_sdk, "role_groups")
+    mocker.patch.object(target_sdk, "all_roles")
+    mocker.patch.object(target_sdk, "all_groups")
+    mocker.patch.object(target_sdk, "role_groups")
+    mocker.patch.object(target_sdk, "set_role_groups")
+    measure = mocker.patch.object(deploy_role_to_group.logger, "measure")
+
+    source_sdk.all_roles.return_value = role
+    target_sdk.all_roles.return_value = target_role
+    target_sdk.all_groups.return_value = [target_group_1, target_group_2]
+    source_sdk.role_groups.return_value = [group_2, group_1]
+    target_sdk.role_groups.return_value = [target_group_1, target_group_2]
+
+    deploy_role_to_group.write_role_to_group(source_sdk, target_sdk)
+    target_sdk.role_groups.assert_called_once_with(5)
+    target_sdk.set_role_groups.assert_not_called()
+    measure.assert_called_once_with("role_to_group_writes_avoided", 1, "COUNT")
@@ -1,4 +1,6 @@
+import pytest
 from looker_deployer.commands import deploy_roles
+from looker_deployer.utils.plan import Plan
 from looker_sdk import methods40 as methods, models40 as models
 
 
@@ -75,7 +77,7 @@ def test_write_roles_existing(mocker):
 
     sdk.all_roles.return_value = [models.Role(
         name="Taco", permission_set=permission_set, model_set=model_set,
-        permission_set_id=1, model_set_id=1, id=1)]
+        permission_set_id=1, model_set_id=2, id=1)]
     sdk.all_permission_sets.return_value = [models.PermissionSet(
         name="P1", id=1)]
     sdk.all_model_sets.return_value = [models.ModelSet(
@@ -83,3 +85,63 @@ def test_write_roles_existing(mocker):
 
     deploy_roles.write_roles(role_list, sdk)
     sdk.update_role.assert_called_once_with(1, role_list[0])
+
+
+def test_write_roles_unchanged(mocker):
+    role_list = [models.WriteRole(name="Taco",
+                                  permission_set=models.PermissionSet(
+                                      name="P1", id=7),
+                                  model_set=models.ModelSet(name="M1", id=8),
+                                  permission_set_id=7,
+                                  model_set_id=8)]
+
+    mocker.patch.object(sdk, "all_roles")
+    mocker.patch.object(sdk, "update_role")
+    mocker.patch.object(sdk, "all_permission_sets")
+    mocker.patch.object(sdk, "all_model_sets")
+
+    sdk.all_roles.return_value = [models.Role(
+        name="Taco", permission_set=models.PermissionSet(name="P1", id=1),
+        model_set=models.ModelSet(name="M1", id=1),
+        permission_set_id=1, model_set_id=1, id=1)]
+    sdk.all_permission_sets.return_value = [models.PermissionSet(
+        name="P1", id=1)]
+    sdk.all_model_sets.return_value = [models.ModelSet(
+        name="M1", id=1)]
+
+    deploy_roles.write_roles(role_list, sdk)
+    sdk.update_role.assert_not_called()
+
+
+def test_write_roles_plan_with_planned_sets(mocker):
+    role_list = [models.WriteRole(name="Taco",
+                                  permission_set=models.PermissionSet(
+                                      name="P1", id=7),
+                                  model_set=models.ModelSet(name="M1", id=8))]
+
+    mocker.patch.object(sdk, "all_roles", return_value=[])
+    mocker.patch.object(sdk, "create_role")
+    mocker.patch.object(sdk, "all_permission_sets", return_value=[])
+    mocker.patch.object(sdk, "all_model_sets", return_value=[
+        models.ModelSet(name="M1", id=1)])
+
+    plan = Plan(apply=False)
+    deploy_roles.write_roles(role_list, sdk, plan=plan)
+    sdk.create_role.assert_not_called()
+    assert plan.summary()["create"] == 1
+
+
+def test_write_roles_missing_set_applying(mocker):
+    role_list = [models.WriteRole(name="Taco",
+                                  permission_set=models.PermissionSet(
+                                      name="P1", id=7),
+                                  model_set=models.ModelSet(name="M1", id=8))]
+
+    mocker.patch.object(sdk, "all_roles", return_value=[])
+    mocker.patch.object(sdk, "create_role")
+    mocker.patch.object(sdk, "all_permission_sets", return_value=[])
+    mocker.patch.object(sdk, "all_model_sets", return_value=[])
+
+    with pytest.raises(AssertionError):
+        deploy_roles.write_roles(role_list, sdk)
+    sdk.create_role.assert_not_called()
@@ -0,0 +1,77 @@
+import threading
+from argparse import Namespace
+import pytest
+from looker_deployer.commands import deploy_sync
+
+
+def test_run_stages_respects_dependencies():
+    finished = []
+    lock = threading.Lock()
+
+    def run_stage(name):
+        with lock:
+            for dependency in deploy_sync.STAGES[name][0]:
+                assert dependency in finished
+            finished.append(name)
+
+    status = deploy_sync.run_stages(list(deploy_sync.STAGES), run_stage, 3)
+
+    assert sorted(finished) == sorted(deploy_sync.STAGES)
+    assert set(status.values()) == {"ok"}
+
+
+def test_run_stages_runs_independent_stages_together():
+    # INFO: The three root stages only finish once all of them have started
+    roots = ["permission_sets", "model_sets", "groups"]
+    started = threading.Barrier(len(roots), timeout=5)
+
+    status = deploy_sync.run_stages(roots, lambda name: started.wait(), 3)
+
+    assert status == {i: "ok" for i in roots}
+
+
+def test_run_stages_skips_dependents_of_failed_stage():
+    ran = []
+
+    def run_stage(name):
+        ran.append(name)
+        if name == "permission_sets":
+            raise ValueError("boom")
+
+    status = deploy_sync.run_stages(list(deploy_sync.STAGES), run_stage)
+
+    assert status["permission_sets"] == "failed"
+    assert status["roles"] == "skipped"
+    assert status["role_to_group"] == "skipped"
+    assert status["groups"] == "ok"
+    assert status["user_attributes"] == "ok"
+    assert "roles" not in ran
+    assert "role_to_group" not in ran
+
+
+def test_run_stages_ignores_unselected_dependencies():
+    ran = []
+
+    status = deploy_sync.run_stages(["role_to_group"], ran.append)
+
+    assert ran == ["role_to_group"]
+    assert status == {"role_to_group": "ok"}
+
+
+def test_sync_target_raises_on_failed_stage(mocker):
+    mocker.patch("looker_deployer.commands.deploy_sync.get_executor")
+    mocker.patch("looker_deployer.commands.deploy_sync.instance_key",
+                 return_value="prod")
+    mocker.patch.object(deploy_sync, "STAGES", {
+        "groups": ([], mocker.Mock(side_effect=ValueError("boom"))),
+        "group_in_group": (["groups"], mocker.Mock()),
+    })
+    args = Namespace(concurrency=1, max_requests_per_second=None, plan=False,
+                     stages=["groups", "group_in_group"], parallel_stages=2)
+
+    with pytest.raises(deploy_sync.StageFailedError) as e:
+        deploy_sync.sync_target("source", "target", args)
+
+    assert e.value.failed_stages == ["groups"]
+    assert e.value.skipped_stages == ["group_in_group"]
+    deploy_sync.STAGES["group_in_group"][1].assert_not_called()
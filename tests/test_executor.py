@@ -0,0 +1,125 @@
+import threading
+import time
+import pytest
+from looker_deployer.utils import executor as write_executor
+
+
+class mockSettings:
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+
+class mockAuth:
+    def __init__(self, base_url):
+        self.settings = mockSettings(base_url)
+
+
+class mockSDK:
+    def __init__(self, base_url):
+        self.auth = mockAuth(base_url)
+
+
+def test_token_bucket_burst_then_throttle(mocker):
+    sleep = mocker.patch("looker_deployer.utils.executor.time.sleep")
+    clock = mocker.patch("looker_deployer.utils.executor.time.monotonic")
+    clock.return_value = 100.0
+
+    bucket = write_executor.TokenBucket(2)
+    bucket.acquire()
+    bucket.acquire()
+    sleep.assert_not_called()
+
+    def advance(delay):
+        clock.return_value += delay
+
+    sleep.side_effect = advance
+    bucket.acquire()
+    sleep.assert_called_once_with(0.5)
+
+
+def test_inline_executor_runs_in_order():
+    calls = []
+    executor = write_executor.WriteExecutor()
+    with executor.batch() as batch:
+        for i in range(3):
+            batch.submit(calls.append, i)
+    assert calls == [0, 1, 2]
+    assert executor.pool is None
+
+
+def test_inline_executor_fails_fast():
+    calls = []
+
+    def write(i):
+        if i == 1:
+            raise ValueError("nope")
+        calls.append(i)
+
+    executor = write_executor.WriteExecutor()
+    with pytest.raises(ValueError):
+        with executor.batch() as batch:
+            for i in range(3):
+                batch.run(write, i)
+    assert calls == [0]
+
+
+def test_concurrent_executor_overlaps_writes():
+    executor = write_executor.WriteExecutor(concurrency=4)
+    barrier = threading.Barrier(4, timeout=5)
+
+    with executor.batch() as batch:
+        for i in range(4):
+            batch.submit(barrier.wait)
+
+    assert len(batch.futures) == 4
+
+
+def test_concurrent_executor_finishes_batch_then_raises():
+    calls = []
+
+    def write(i):
+        time.sleep(0.01)
+        if i == 0:
+            raise ValueError("nope")
+        calls.append(i)
+
+    executor = write_executor.WriteExecutor(concurrency=2)
+    with pytest.raises(ValueError):
+        with executor.batch() as batch:
+            for i in range(4):
+                batch.run(write, i)
+    assert sorted(calls) == [1, 2, 3]
+
+
+def test_get_executor_shares_limiter_per_instance():
+    first = write_executor.get_executor(mockSDK("https://one"), 2, 5)
+    again = write_executor.get_executor(mockSDK("https://one"), 2, 5)
+    wider = write_executor.get_executor(mockSDK("https://one"), 4, 5)
+    other = write_executor.get_executor(mockSDK("https://two"), 2, 5)
+
+    assert first is again
+    assert wider is not first
+    assert wider.limiter is first.limiter
+    assert other.limiter is not first.limiter
+
+
+def test_get_executor_without_rate():
+    executor = write_executor.get_executor(mockSDK("https://three"))
+    assert executor.limiter is None
+    assert executor.pool is None
+
+
+def test_rate_limited_draws_from_instance_limiter(mocker):
+    sdk = mockSDK("https://four")
+    limiter = write_executor.get_executor(sdk, 1, 5).limiter
+    mocker.patch.object(limiter, "acquire")
+    read = mocker.Mock(return_value="groups")
+
+    assert write_executor.rate_limited(sdk, read)(1) == "groups"
+    limiter.acquire.assert_called_once_with()
+    read.assert_called_once_with(1)
+
+
+def test_rate_limited_without_rate():
+    read = lambda group_id: group_id  # noqa: E731
+    assert write_executor.rate_limited(mockSDK("https://five"), read) is read
@@ -0,0 +1,59 @@
+import os
+from looker_deployer.utils import export_manifest
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def test_manifest_is_current(tmp_path):
+    path = write(tmp_path / "dashboard_1.json", "{}")
+    manifest = export_manifest.ExportManifest(str(tmp_path))
+    manifest.record("dashboard", "1", path, "2021-01-01")
+
+    assert manifest.is_current("dashboard", "1", "2021-01-01", path)
+    assert not manifest.is_current("dashboard", "1", "2021-01-02", path)
+    assert not manifest.is_current("dashboard", "2", "2021-01-01", path)
+
+    # a file edited since it was exported is stale too
+    path.write_text('{"title": "edited"}')
+    assert not manifest.is_current("dashboard", "1", "2021-01-01", path)
+
+
+def test_manifest_save_and_load(tmp_path):
+    assert export_manifest.ExportManifest.load(str(tmp_path)) is None
+
+    path = write(tmp_path / "look_2.json", "{}")
+    manifest = export_manifest.ExportManifest(str(tmp_path))
+    manifest.record("look", "2", path, "2021-01-01", "5")
+    manifest.save()
+
+    loaded = export_manifest.ExportManifest.load(str(tmp_path))
+    assert loaded.exported_at == manifest.exported_at
+    assert loaded.entries == manifest.entries
+
+
+def test_manifest_tombstone(tmp_path):
+    path = write(tmp_path / "look_2.json", "{}")
+    manifest = export_manifest.ExportManifest(str(tmp_path))
+    manifest.record("look", "2", path, "2021-01-01")
+
+    manifest.tombstone("look:2")
+
+    assert not os.path.exists(path)
+    assert manifest.entries["look:2"]["deleted"]
+    assert manifest.live() == {}
+
+
+def test_scan_content_files(tmp_path):
+    write(tmp_path / "Shared" / "Taco" / "Dashboard_3_My Dash.json", "{}")
+    write(tmp_path / "Shared" / "Look_4_My Look.json", "{}")
+    write(tmp_path / "look_5.json", "{}")
+    write(tmp_path / "notes.txt", "")
+
+    found = export_manifest.scan_content_files(str(tmp_path))
+
+    assert sorted(found) == ["dashboard:3", "look:4", "look:5"]
+    assert found["dashboard:3"] == str(tmp_path / "Shared" / "Taco" / "Dashboard_3_My Dash.json")
@@ -0,0 +1,79 @@
+import threading
+import time
+from looker_sdk.rtl import auth_token
+from looker_deployer.utils import get_client
+
+INI = """
+[dev]
+base_url=https://dev.looker.com:19999
+client_id=abc
+client_secret=xyz
+
+[prod]
+base_url=https://prod.looker.com:19999
+client_id=abc
+client_secret=xyz
+"""
+
+
+def test_registry_shares_clients(tmp_path):
+    ini = tmp_path / "looker.ini"
+    ini.write_text(INI)
+    registry = get_client.ClientRegistry()
+
+    dev = registry.get(str(ini), "dev")
+
+    assert registry.get(str(ini), "dev") is dev
+    assert registry.get(str(ini), "prod") is not dev
+    assert dev.auth.settings.base_url == "https://dev.looker.com:19999"
+
+
+def test_pooled_session():
+    session = get_client.pooled_session(pool_size=8)
+    adapter = session.get_adapter("https://dev.looker.com")
+    assert adapter._pool_maxsize == 8
+    assert adapter.max_retries.connect == get_client.RETRIES
+    assert adapter.max_retries.read is False
+
+
+def test_shared_auth_session_logs_in_once(mocker, tmp_path):
+    ini = tmp_path / "looker.ini"
+    ini.write_text(INI)
+    sdk = get_client.configure_sdk(str(ini), "dev")
+
+    def login(auth, transport_options):
+        time.sleep(0.05)
+        auth.token = auth_token.AuthToken(auth_token.AccessToken(access_token="taco", token_type="Bearer", expires_in=3600))
+
+    mocker.patch.object(get_client.SharedAuthSession, "_login", autospec=True, side_effect=login)
+    threads = [threading.Thread(target=sdk.auth._get_token, args=({},)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    get_client.SharedAuthSession._login.assert_called_once()
+    assert sdk.auth._get_token({}).access_token == "taco"
+
+
+def test_shared_auth_session_token_cache(mocker, tmp_path):
+    ini = tmp_path / "looker.ini"
+    ini.write_text(INI)
+    cache = mocker.Mock()
+    cache.load.return_value = None
+    sdk = get_client.configure_sdk(str(ini), "dev", token_cache=cache)
+
+    def login(auth, transport_options):
+        auth.token = auth_token.AuthToken(auth_token.AccessToken(access_token="taco", token_type="Bearer", expires_in=3600))
+
+    mocker.patch.object(get_client.SharedAuthSession, "_login", autospec=True, side_effect=login)
+    sdk.auth._get_token({})
+
+    cache.load.assert_called_once_with("https://dev.looker.com:19999", "abc", "xyz")
+    cache.save.assert_called_once_with("https://dev.looker.com:19999", "abc", "xyz", sdk.auth.token)
+
+    # a later run finds the saved token and skips the login
+    other = get_client.configure_sdk(str(ini), "dev", token_cache=cache)
+    cache.load.return_value = sdk.auth.token
+    assert other.auth._get_token({}) is sdk.auth.token
+    get_client.SharedAuthSession._login.assert_called_once()
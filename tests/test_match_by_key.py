@@ -0,0 +1,30 @@
+from looker_sdk import models40 as models
+from looker_deployer.utils.match_by_key import KeyIndex, match_by_key
+
+
+def test_key_index_match():
+    groups = [models.Group(id="1", name="Taco"), models.Group(id="2", name="Burrito")]
+    index = KeyIndex(groups, "name")
+
+    assert index.match(models.Group(name="Burrito")) == groups[1]
+    assert index.match(models.Group(name="Nacho")) is None
+    assert index.get("Taco") == groups[0]
+    assert "Taco" in index
+    assert len(index) == 2
+
+
+def test_key_index_agrees_with_match_by_key():
+    groups = [models.Group(id="1", name="Taco"), models.Group(id="2", name="Taco"), models.Group(id="3", name="Burrito")]
+    index = KeyIndex(groups, "name")
+
+    for name in ("Taco", "Burrito", "Nacho"):
+        probe = models.Group(name=name)
+        assert index.match(probe) == match_by_key(groups, probe, "name")
+    assert index.duplicates == {"Taco"}
+
+
+def test_key_index_other_key():
+    groups = [models.Group(id="1", name="Taco")]
+    index = KeyIndex(groups, "id")
+
+    assert index.match(models.Group(id="1", name="Burrito")) == groups[0]
@@ -0,0 +1,171 @@
+import json
+from looker_deployer.utils import native_content
+from looker_sdk import methods40 as methods, models40 as models
+
+
+class mockSettings:
+    base_url = "taco"
+
+
+class mockAuth:
+    settings = mockSettings()
+
+
+sdk = methods.Looker40SDK(mockAuth(), "bar", "baz", "bosh", "bizz")
+
+LOOK_JSON = {
+    "id": "7",
+    "title": "Taco Look",
+    "description": "spicy",
+    "folder_id": "99",
+    "query_id": "12",
+    "query": {"id": "12", "client_id": "abc", "model": "taco", "view": "orders", "fields": ["orders.count"]}
+}
+
+DASH_JSON = {
+    "id": "3",
+    "title": "Taco Dash",
+    "slug": "taco_slug",
+    "folder_id": "99",
+    "dashboard_filters": [{"id": "5", "dashboard_id": "3", "name": "Date", "title": "Date", "type": "date_filter"}],
+    "dashboard_elements": [
+        {"id": "20", "dashboard_id": "3", "type": "vis", "title": "Tile", "query": LOOK_JSON["query"]}
+    ],
+    "dashboard_layouts": [
+        {
+            "id": "8",
+            "active": True,
+            "type": "newspaper",
+            "dashboard_layout_components": [
+                {"id": "30", "dashboard_layout_id": "8", "dashboard_element_id": "20", "row": 2, "column": 4, "width": 8, "height": 6}
+            ]
+        }
+    ]
+}
+
+
+def test_to_write_model_drops_excluded():
+    query = native_content.to_write_model(LOOK_JSON["query"], models.WriteQuery, native_content.QUERY_EXCLUDE)
+    assert query == models.WriteQuery(model="taco", view="orders", fields=["orders.count"])
+
+
+def test_import_look_new(mocker):
+    mocker.patch.object(sdk, "create_query", return_value=models.Query(id="42", model="taco", view="orders"))
+    mocker.patch.object(sdk, "search_looks", return_value=[])
+    mocker.patch.object(sdk, "create_look", return_value=models.LookWithQuery(id="101"))
+
+    look_id = native_content.import_look(LOOK_JSON, "1", sdk)
+    assert look_id == "101"
+    sdk.create_look.assert_called_once_with(
+        models.WriteLookWithQuery(title="Taco Look", description="spicy", query_id="42", folder_id="1")
+    )
+
+
+def test_import_look_existing(mocker):
+    mocker.patch.object(sdk, "create_query", return_value=models.Query(id="42", model="taco", view="orders"))
+    mocker.patch.object(sdk, "search_looks", return_value=[models.Look(id="55")])
+    mocker.patch.object(sdk, "update_look", return_value=models.LookWithQuery(id="55"))
+
+    look_id = native_content.import_look(LOOK_JSON, "1", sdk)
+    assert look_id == "55"
+    sdk.update_look.assert_called_once()
+
+
+def test_import_dashboard_new(mocker):
+    mocker.patch.object(sdk, "search_dashboards", return_value=[])
+    mocker.patch.object(sdk, "create_dashboard", return_value=models.Dashboard(id="77"))
+    mocker.patch.object(sdk, "create_dashboard_filter")
+    mocker.patch.object(sdk, "create_query", return_value=models.Query(id="42", model="taco", view="orders"))
+    mocker.patch.object(sdk, "create_dashboard_element", return_value=models.DashboardElement(id="200"))
+    mocker.patch.object(sdk, "dashboard_dashboard_layouts", return_value=[models.DashboardLayout(id="80", active=True)])
+    mocker.patch.object(sdk, "update_dashboard_layout")
+    mocker.patch.object(
+        sdk,
+        "dashboard_layout_dashboard_layout_components",
+        return_value=[models.DashboardLayoutComponent(id="300", dashboard_element_id="200")]
+    )
+    mocker.patch.object(sdk, "update_dashboard_layout_component")
+
+    dash_id = native_content.import_dashboard(DASH_JSON, "1", sdk)
+    assert dash_id == "77"
+    sdk.create_dashboard.assert_called_once_with(models.WriteDashboard(title="Taco Dash", slug="taco_slug", folder_id="1"))
+    sdk.create_dashboard_filter.assert_called_once_with(
+        models.WriteCreateDashboardFilter(dashboard_id="77", name="Date", title="Date", type="date_filter")
+    )
+    sdk.create_dashboard_element.assert_called_once_with(
+        models.WriteDashboardElement(dashboard_id="77", type="vis", title="Tile", query_id="42")
+    )
+    sdk.update_dashboard_layout_component.assert_called_once_with(
+        "300", models.WriteDashboardLayoutComponent(row=2, column=4, width=8, height=6)
+    )
+
+
+def test_import_dashboard_new_slug_taken(mocker):
+    dash_json = dict(DASH_JSON, dashboard_elements=[], dashboard_filters=[], dashboard_layouts=[])
+    # INFO: Nothing with this title in the folder, but the slug belongs to a dashboard elsewhere
+    mocker.patch.object(sdk, "search_dashboards", side_effect=[[], [models.Dashboard(id="12")]])
+    mocker.patch.object(sdk, "create_dashboard", return_value=models.Dashboard(id="77"))
+
+    dash_id = native_content.import_dashboard(dash_json, "1", sdk)
+    assert dash_id == "77"
+    sdk.search_dashboards.assert_called_with(slug="taco_slug", fields="id")
+    sdk.create_dashboard.assert_called_once_with(models.WriteDashboard(title="Taco Dash", folder_id="1"))
+
+
+def test_import_dashboard_existing_clears_content(mocker):
+    dash_json = dict(DASH_JSON, dashboard_elements=[], dashboard_filters=[], dashboard_layouts=[])
+    mocker.patch.object(sdk, "search_dashboards", return_value=[models.Dashboard(id="77")])
+    mocker.patch.object(sdk, "update_dashboard")
+    mocker.patch.object(sdk, "dashboard_dashboard_elements", return_value=[models.DashboardElement(id="1")])
+    mocker.patch.object(sdk, "dashboard_dashboard_filters", return_value=[models.DashboardFilter(id="2")])
+    mocker.patch.object(sdk, "delete_dashboard_element")
+    mocker.patch.object(sdk, "delete_dashboard_filter")
+
+    dash_id = native_content.import_dashboard(dash_json, "1", sdk)
+    assert dash_id == "77"
+    sdk.update_dashboard.assert_called_once_with("77", models.WriteDashboard(title="Taco Dash", folder_id="1"))
+    sdk.delete_dashboard_element.assert_called_once_with("1")
+    sdk.delete_dashboard_filter.assert_called_once_with("2")
+
+
+def test_export_content(mocker, tmp_path):
+    mocker.patch.object(sdk, "look", return_value=models.LookWithQuery(id="7", title="Taco Look"))
+
+    filename = native_content.export_content("look", "7", str(tmp_path), sdk)
+    with open(filename) as f:
+        assert json.load(f) == {"id": "7", "title": "Taco Look"}
+    assert filename == str(tmp_path / "look_7.json")
+
+
+def test_merge_tile_round_trip(mocker, tmp_path):
+    mocker.patch.object(sdk, "dashboard", return_value=models.Dashboard(
+        id="3", title="Merge Dash", dashboard_elements=[models.DashboardElement(id="20", title="Merged", merge_result_id="m1")]
+    ))
+    mocker.patch.object(sdk, "merge_query", return_value=models.MergeQuery(id="m1", source_queries=[
+        models.MergeQuerySourceQuery(
+            name="first", query_id="12", merge_fields=[models.MergeFields(field_name="a.id", source_field_name="b.id")]
+        )
+    ]))
+    mocker.patch.object(sdk, "query", return_value=models.Query(id="12", model="taco", view="orders"))
+
+    filename = native_content.export_content("dashboard", "3", str(tmp_path), sdk)
+    with open(filename) as f:
+        exported = json.load(f)
+    merge_result = exported["dashboard_elements"][0]["merge_result"]
+    assert merge_result["source_queries"][0]["query"]["model"] == "taco"
+    sdk.merge_query.assert_called_once_with("m1")
+
+    mocker.patch.object(sdk, "search_dashboards", return_value=[])
+    mocker.patch.object(sdk, "create_dashboard", return_value=models.Dashboard(id="77"))
+    mocker.patch.object(sdk, "create_query", return_value=models.Query(id="42", model="taco", view="orders"))
+    mocker.patch.object(sdk, "create_merge_query", return_value=models.MergeQuery(id="m2"))
+    mocker.patch.object(sdk, "create_dashboard_element", return_value=models.DashboardElement(id="200"))
+
+    native_content.import_dashboard(exported, "1", sdk)
+    new_merge = sdk.create_merge_query.call_args[1]["body"]
+    assert new_merge.source_queries == [models.MergeQuerySourceQuery(
+        name="first", query_id="42", merge_fields=[models.MergeFields(field_name="a.id", source_field_name="b.id")]
+    )]
+    sdk.create_dashboard_element.assert_called_once_with(
+        models.WriteDashboardElement(dashboard_id="77", title="Merged", merge_result_id="m2")
+    )
@@ -0,0 +1,52 @@
+import os
+from looker_deployer.utils import parse_ini
+from looker_deployer.utils import get_client
+
+INI = """
+[dev]
+base_url=https://dev.looker.com:19999
+client_id=abc
+client_secret=xyz
+verify_ssl=True
+"""
+
+
+def test_read_ini_cached(mocker, tmp_path):
+    ini = tmp_path / "looker.ini"
+    ini.write_text(INI)
+    parse_ini.clear_cache()
+    read = mocker.spy(parse_ini.configparser.ConfigParser, "read")
+
+    first = parse_ini.read_ini(str(ini))
+    second = parse_ini.read_ini(str(ini))
+
+    assert first is second
+    assert first["dev"]["client_id"] == "abc"
+    read.assert_called_once()
+
+
+def test_read_ini_reloads_changed_file(tmp_path):
+    ini = tmp_path / "looker.ini"
+    ini.write_text(INI)
+    parse_ini.clear_cache()
+
+    assert parse_ini.read_ini(str(ini))["dev"]["client_id"] == "abc"
+    ini.write_text(INI.replace("abc", "def"))
+    stat = os.stat(ini)
+    os.utime(ini, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+
+    assert parse_ini.read_ini(str(ini))["dev"]["client_id"] == "def"
+
+
+def test_get_client_settings_from_cache(mocker, tmp_path):
+    ini = tmp_path / "looker.ini"
+    ini.write_text(INI)
+    parse_ini.clear_cache()
+    mocker.patch.dict(os.environ, {}, clear=True)
+
+    sdk = get_client.get_client(str(ini), "dev")
+    read = mocker.spy(parse_ini.configparser.ConfigParser, "read")
+
+    assert sdk.auth.settings.base_url == "https://dev.looker.com:19999"
+    assert sdk.auth.settings.read_config()["client_secret"] == "xyz"
+    read.assert_not_called()
@@ -0,0 +1,46 @@
+from looker_sdk import models40 as models
+from looker_deployer.utils import plan
+
+
+def test_diff_ignores_unset_and_read_only_fields():
+    new_group = models.WriteGroup(name="Taco")
+    target = models.Group(name="Taco", id="1", can_add_to_content_metadata=True, user_count=5)
+
+    assert plan.diff(new_group, target) == {}
+
+
+def test_diff_reports_changes():
+    new_group = models.WriteGroup(name="Taco", can_add_to_content_metadata=False)
+    target = models.Group(name="Taco", id="1", can_add_to_content_metadata=True)
+
+    assert plan.diff(new_group, target) == {"can_add_to_content_metadata": {"from": True, "to": False}}
+
+
+def test_diff_list_order_does_not_matter():
+    new_set = models.WritePermissionSet(name="Taco", permissions=["see_looks", "access_data"])
+    target = models.PermissionSet(name="Taco", id="1", permissions=["access_data", "see_looks"])
+
+    assert plan.diff(new_set, target) == {}
+
+
+def test_diff_exclude():
+    new_role = models.WriteRole(name="Taco", permission_set=models.PermissionSet(id="7"), permission_set_id="1")
+    target = models.Role(name="Taco", id="1", permission_set=models.PermissionSet(id="1"), permission_set_id="1")
+
+    assert plan.diff(new_role, target, exclude={"permission_set"}) == {}
+
+
+def test_plan_without_apply():
+    changes = plan.Plan(apply=False)
+
+    assert not changes.create("group", "Taco")
+    assert not changes.update_if_changed("group", "Burrito", {"name": {}})
+    assert not changes.update_if_changed("group", "Nacho", {})
+    assert changes.summary() == {"create": 1, "update": 1, "delete": 0, "unchanged": 1}
+
+
+def test_plan_apply():
+    changes = plan.Plan()
+
+    assert changes.delete("group", "Taco")
+    assert not changes.unchanged("group", "Burrito")
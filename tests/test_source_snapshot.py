@@ -0,0 +1,111 @@
+import threading
+import time
+import pytest
+from looker_sdk import methods40 as methods, models40 as models
+from looker_deployer.utils import source_snapshot
+
+
+class mockSettings:
+    base_url = "taco"
+
+
+class mockAuth:
+    settings = mockSettings()
+
+
+sdk = methods.Looker40SDK(mockAuth(), "bar", "baz", "bosh", "bizz")
+
+
+def test_snapshot_reads_once(mocker):
+    mocker.patch.object(sdk, "all_groups")
+    sdk.all_groups.return_value = [models.Group(id="1", name="Taco")]
+
+    snapshot = source_snapshot.SourceSnapshot(sdk)
+    first = snapshot.all_groups(fields="id,name")
+    second = snapshot.all_groups(fields="id,name")
+
+    sdk.all_groups.assert_called_once_with(fields="id,name")
+    assert first == second == [models.Group(id="1", name="Taco")]
+
+
+def test_snapshot_keys_on_arguments(mocker):
+    mocker.patch.object(sdk, "role_groups")
+    sdk.role_groups.return_value = []
+
+    snapshot = source_snapshot.SourceSnapshot(sdk)
+    snapshot.role_groups("1")
+    snapshot.role_groups("2")
+    snapshot.role_groups("1")
+
+    assert sdk.role_groups.call_count == 2
+
+
+def test_snapshot_returns_copies(mocker):
+    mocker.patch.object(sdk, "all_group_groups")
+    sdk.all_group_groups.return_value = [models.Group(id="1", name="Taco")]
+
+    snapshot = source_snapshot.SourceSnapshot(sdk)
+    groups = snapshot.all_group_groups("5")
+    groups[0].id = "99"
+    groups.pop()
+
+    assert snapshot.all_group_groups("5") == [models.Group(id="1", name="Taco")]
+
+
+def test_snapshot_does_not_record_writes(mocker):
+    mocker.patch.object(sdk, "create_group")
+
+    snapshot = source_snapshot.SourceSnapshot(sdk)
+    snapshot.create_group(models.WriteGroup(name="Taco"))
+    snapshot.create_group(models.WriteGroup(name="Taco"))
+
+    assert sdk.create_group.call_count == 2
+    assert snapshot.calls == {}
+
+
+def test_snapshot_does_not_record_failures(mocker):
+    mocker.patch.object(sdk, "group")
+    sdk.group.side_effect = [ValueError("boom"), models.Group(id="1", name="Taco")]
+
+    snapshot = source_snapshot.SourceSnapshot(sdk)
+    with pytest.raises(ValueError):
+        snapshot.group(group_id="1")
+
+    assert snapshot.group(group_id="1") == models.Group(id="1", name="Taco")
+
+
+def test_snapshot_concurrent_reads_share_one_call(mocker):
+    def slow_groups(**kwargs):
+        time.sleep(0.05)
+        return [models.Group(id="1", name="Taco")]
+
+    mocker.patch.object(sdk, "all_groups", side_effect=slow_groups)
+
+    snapshot = source_snapshot.SourceSnapshot(sdk)
+    threads = [threading.Thread(target=snapshot.all_groups) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    sdk.all_groups.assert_called_once()
+
+
+def test_snapshot_save_and_load(mocker, tmp_path):
+    mocker.patch.object(sdk, "all_groups")
+    mocker.patch.object(sdk, "group")
+    sdk.all_groups.return_value = [models.Group(id="1", name="Taco")]
+    sdk.group.return_value = models.Group(id="2", name="Burrito")
+
+    snapshot = source_snapshot.SourceSnapshot(sdk)
+    snapshot.all_groups()
+    snapshot.group(group_id="2")
+    path = str(tmp_path / "source.json")
+    snapshot.save(path)
+
+    offline = source_snapshot.SourceSnapshot.load(path)
+    assert offline.all_groups() == [models.Group(id="1", name="Taco")]
+    assert offline.group(group_id="2") == models.Group(id="2", name="Burrito")
+
+    with pytest.raises(source_snapshot.SourceSnapshotMiss):
+        offline.group(group_id="3")
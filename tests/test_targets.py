@@ -0,0 +1,47 @@
+import threading
+import pytest
+from looker_deployer.utils import targets
+
+
+def test_deploy_to_targets_calls_every_target(mocker):
+    mocker.patch("looker_deployer.utils.targets.get_client", side_effect=lambda ini, t: f"sdk-{t}")
+    deployed = []
+
+    results = targets.deploy_to_targets("looker.ini", ["us", "eu"], deployed.append)
+
+    assert deployed == ["sdk-us", "sdk-eu"]
+    assert [(r.target, r.ok) for r in results] == [("us", True), ("eu", True)]
+
+
+def test_deploy_to_targets_isolates_failures(mocker):
+    mocker.patch("looker_deployer.utils.targets.get_client", side_effect=lambda ini, t: t)
+    deployed = []
+
+    def deploy(target_sdk):
+        if target_sdk == "eu":
+            raise ValueError("boom")
+        deployed.append(target_sdk)
+
+    with pytest.raises(targets.TargetDeploymentError) as e:
+        targets.deploy_to_targets("looker.ini", ["us", "eu", "apac"], deploy)
+
+    assert deployed == ["us", "apac"]
+    assert e.value.failed_targets == ["eu"]
+
+
+def test_deploy_to_targets_client_failure(mocker):
+    mocker.patch("looker_deployer.utils.targets.get_client", side_effect=KeyError("missing section"))
+
+    with pytest.raises(targets.TargetDeploymentError) as e:
+        targets.deploy_to_targets("looker.ini", ["us"], lambda target_sdk: None)
+
+    assert e.value.failed_targets == ["us"]
+
+
+def test_deploy_to_targets_parallel(mocker):
+    mocker.patch("looker_deployer.utils.targets.get_client", side_effect=lambda ini, t: t)
+    barrier = threading.Barrier(3, timeout=5)
+
+    results = targets.deploy_to_targets("looker.ini", ["us", "eu", "apac"], lambda target_sdk: barrier.wait(), 3)
+
+    assert all(r.ok for r in results)
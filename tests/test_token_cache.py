@@ -0,0 +1,34 @@
+import os
+import pytest
+from looker_sdk.rtl import auth_token
+from looker_deployer.utils import token_cache
+
+pytest.importorskip("cryptography")
+
+
+def make_token(expires_in):
+    return auth_token.AuthToken(auth_token.AccessToken(access_token="taco", token_type="Bearer", expires_in=expires_in))
+
+
+def test_token_cache_round_trip(tmp_path):
+    cache = token_cache.TokenCache(tmp_path)
+    cache.save("https://dev.looker.com", "abc", "xyz", make_token(3600))
+
+    token = cache.load("https://dev.looker.com", "abc", "xyz")
+    assert token.access_token == "taco"
+    assert token.is_active
+    assert b"taco" not in cache.path("https://dev.looker.com", "abc").read_bytes()
+    assert oct(os.stat(cache.path("https://dev.looker.com", "abc")).st_mode & 0o777) == "0o600"
+
+
+def test_token_cache_misses(tmp_path):
+    cache = token_cache.TokenCache(tmp_path)
+    assert cache.load("https://dev.looker.com", "abc", "xyz") is None
+
+    cache.save("https://dev.looker.com", "abc", "xyz", make_token(60))
+    # too close to expiry to be worth handing out
+    assert cache.load("https://dev.looker.com", "abc", "xyz") is None
+
+    cache.save("https://dev.looker.com", "abc", "xyz", make_token(3600))
+    # a rotated secret can't read the old token
+    assert cache.load("https://dev.looker.com", "abc", "new-secret") is None
@@ -131,3 +131,29 @@ def test_write_user_attributes_update_group_value(mocker):
     deploy_user_attributes.write_user_attributes(source_sdk, target_sdk)
     target_sdk.set_user_attribute_group_values.assert_called_once_with(
         user_attribute_id="1", body=user_attribute_group_list)
+
+
+def test_get_all_user_attribute_group_values(mocker):
+    user_attribute_list = [
+        models.UserAttribute(name="Cheese", id="1", label="Cheese", type="string"),
+        models.UserAttribute(name="Sauce", id="2", label="Sauce", type="string")
+    ]
+    group_values = {
+        "1": [models.UserAttributeGroupValue(id="1", group_id="1", user_attribute_id="1"),
+              models.UserAttributeGroupValue(id="2", group_id="2", user_attribute_id="1")],
+        "2": [models.UserAttributeGroupValue(id="3", group_id="2", user_attribute_id="2")]
+    }
+
+    mocker.patch.object(source_sdk, "all_groups")
+    mocker.patch.object(source_sdk, "group")
+    mocker.patch.object(source_sdk, "all_user_attribute_group_values")
+
+    source_sdk.all_groups.return_value = [models.Group(name="Taco", id="1"), models.Group(name="Taco Supreme", id="2")]
+    source_sdk.all_user_attribute_group_values.side_effect = mock_responses(group_values)
+
+    values = deploy_user_attributes.get_all_user_attribute_group_values(source_sdk, user_attribute_list)
+
+    source_sdk.all_groups.assert_called_once_with(fields="id,name")
+    source_sdk.group.assert_not_called()
+    assert [i.name for i in values["1"]] == ["Taco", "Taco Supreme"]
+    assert [i.name for i in values["2"]] == ["Taco Supreme"]